@@ -0,0 +1,139 @@
+"""
+Приложение бота: инициализация БД, обработчики, фоновые задачи и polling.
+
+Запускается из main.py (run_with_restart).
+"""
+
+# ruff: noqa: I001 - порядок импортов handlers критичен для работы бота
+import asyncio
+import contextlib
+
+from aiogram.types import BotCommand
+
+import core.database as database
+from core.bot_instance import bot, dp
+from core.config import ADMIN_CHAT, add_telegram_handler, logger
+from core.middlewares import GroupTrafficMiddleware, SubscriptionMiddleware
+from core.utils import load_bot_identity
+from migrations.migration_manager import run_migrations
+from services.debug_mirror import debug_mirror_loop
+from services.maintenance_service import db_maintenance_loop
+from services.purge_service import wait_for_purges
+from services.stats_service import shutdown_chart_pool
+from services.subscription_service import subscription_check_loop
+
+# Импортируем все обработчики (чтобы они зарегистрировались)
+# ВАЖНО: порядок имеет значение! Сначала специфичные (команды), потом общие
+# isort: off - не сортировать этот блок, порядок критичен!
+from handlers import user_handlers  # noqa: F401
+from handlers import subscription_handlers  # noqa: F401
+from handlers import admin_handlers  # noqa: F401
+from handlers import message_handlers  # noqa: F401
+# isort: on
+
+
+async def set_bot_commands():
+    """Устанавливает список команд бота в меню Telegram."""
+    commands = [
+        BotCommand(command="start", description="🚀 Информация о боте"),
+        BotCommand(command="help", description="💡 Справка по командам"),
+        BotCommand(
+            command="forget",
+            description="🔄 Сбросить историю диалога и начать общение с чистого листа",
+        ),
+    ]
+
+    await bot.set_my_commands(commands)
+    logger.info("Команды бота установлены в меню Telegram")
+
+
+async def main():
+    """Главная функция запуска бота."""
+    # Инициализация базы данных
+    db_status = await database.check_db()
+
+    # Применяем миграции
+    await run_migrations()
+
+    # Загружаем индекс верификации подписок в память (для SubscriptionMiddleware)
+    conversations_count, verified_chats_count = await database.load_verification_index()
+    logger.info(
+        f"Индекс верификации загружен: {conversations_count} бесед, "
+        f"{verified_chats_count} верифицированных чатов"
+    )
+
+    # Устанавливаем команды бота в меню Telegram
+    await set_bot_commands()
+
+    # Загружаем ID и username бота один раз (для проверки упоминаний в группах)
+    bot_info = await load_bot_identity()
+    logger.info(f"Бот: @{bot_info.username} (ID: {bot_info.id})")
+
+    # Отсеиваем сообщения в группах, не обращенные к боту, до фильтров и обработчиков
+    dp.message.outer_middleware(GroupTrafficMiddleware())
+
+    # Добавляем middleware для проверки подписки
+    dp.message.middleware(SubscriptionMiddleware())
+
+    # Добавляем Telegram handler после инициализации бота
+    telegram_handler = add_telegram_handler(logger, bot)
+
+    # Простые сообщения для docker logs (в консоль)
+    print("=" * 50)
+    print("🤖 БОТ ЗАПУЩЕН")
+    print("=" * 50)
+    print(f"Database: {db_status}")
+    print(f"Admin chat: {ADMIN_CHAT}")
+    print("Нажмите Ctrl-C для остановки бота")
+    print("=" * 50 + "\n")
+
+    # Создаем задачу для проверки подписок
+    subscription_task = asyncio.create_task(subscription_check_loop(bot))
+
+    # Создаем задачу пересылки сообщений в ADMIN чат
+    debug_mirror_task = asyncio.create_task(debug_mirror_loop(bot))
+
+    # Создаем задачу обслуживания БД (incremental_vacuum, ANALYZE, чекпоинт WAL)
+    maintenance_task = asyncio.create_task(db_maintenance_loop())
+
+    try:
+        # Запускаем polling - он сам обрабатывает сигналы
+        await dp.start_polling(bot)
+    except (KeyboardInterrupt, SystemExit):
+        print("\n🛑 Получен сигнал остановки")
+    except Exception as e:
+        logger.critical(f"CRITICAL_ERROR: {e}", exc_info=True)
+    finally:
+        print("Останавливаем бота...")
+        subscription_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await subscription_task
+        maintenance_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await maintenance_task
+        # Дожидаемся фонового удаления бесед (например, после рассылки)
+        await wait_for_purges()
+        # Досылаем накопленные сообщения до закрытия сессии бота
+        debug_mirror_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await debug_mirror_task
+        # Отправляем накопленные логи до закрытия сессии бота
+        if telegram_handler:
+            await telegram_handler.stop()
+        await bot.session.close()
+        shutdown_chart_pool()
+        print("✅ Бот остановлен")
+
+
+async def run_with_restart():
+    """Запуск с автоматическим перезапуском при ошибках."""
+    while True:
+        try:
+            await main()
+            break  # Нормальное завершение - выходим из цикла
+        except (KeyboardInterrupt, SystemExit):
+            print("👋 Завершение работы")
+            break
+        except Exception as e:
+            print(f"main() завершился с ошибкой: {e}. Перезапуск через 5 секунд...")
+            await asyncio.sleep(5)
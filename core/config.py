@@ -39,6 +39,36 @@ SYSTEM_PROMPT = os.environ.get(
 )
 DEFAULT_PROMPT = os.environ.get("DEFAULT_PROMPT", "")
 
+# Обработка медиа
+# Количество потоков для декодирования видео и изображений (вне event loop)
+MEDIA_WORKERS = int(os.environ.get("MEDIA_WORKERS") or "2")
+# Максимальный размер видео (в мегабайтах) и длительность (в секундах)
+MAX_VIDEO_SIZE_MB = int(os.environ.get("MAX_VIDEO_SIZE_MB") or "50")
+MAX_VIDEO_DURATION = int(os.environ.get("MAX_VIDEO_DURATION") or "600")
+# Максимальный размер изображения (в мегабайтах)
+MAX_IMAGE_SIZE_MB = int(os.environ.get("MAX_IMAGE_SIZE_MB") or "10")
+# Подготовка изображений для vision модели: максимальная сторона в пикселях
+# и качество JPEG при перекодировании (1-100)
+VISION_MAX_EDGE = int(os.environ.get("VISION_MAX_EDGE") or "1024")
+VISION_JPEG_QUALITY = int(os.environ.get("VISION_JPEG_QUALITY") or "85")
+# Выбор ключевых кадров видео: один кадр на VIDEO_SECONDS_PER_FRAME секунд,
+# но не меньше VIDEO_MIN_FRAMES и не больше VIDEO_MAX_FRAMES
+VIDEO_MIN_FRAMES = int(os.environ.get("VIDEO_MIN_FRAMES") or "3")
+VIDEO_MAX_FRAMES = int(os.environ.get("VIDEO_MAX_FRAMES") or "6")
+VIDEO_SECONDS_PER_FRAME = int(os.environ.get("VIDEO_SECONDS_PER_FRAME") or "10")
+# Сколько кадров в секунду анализировать и максимальное время анализа (в секундах)
+VIDEO_SAMPLE_FPS = float(os.environ.get("VIDEO_SAMPLE_FPS") or "2")
+VIDEO_SAMPLING_BUDGET = float(os.environ.get("VIDEO_SAMPLING_BUDGET") or "10")
+# Как описывать кадры видео: "parallel" - отдельный запрос на каждый кадр
+# (запросы идут одновременно), "batch" - все кадры одним запросом к vision модели
+VIDEO_VISION_MODE = os.environ.get("VIDEO_VISION_MODE") or "parallel"
+
+# Статистика (/stats): количество процессов для построения графиков (запускаются
+# при первом /stats) и сколько наборов графиков (пользователь или все
+# пользователи) держать в кэше
+STATS_RENDER_WORKERS = int(os.environ.get("STATS_RENDER_WORKERS") or "1")
+STATS_CHART_CACHE_SIZE = int(os.environ.get("STATS_CHART_CACHE_SIZE") or "32")
+
 # Временная зона (смещение от UTC в часах)
 TIMEZONE_OFFSET = int(os.environ.get("TIMEZONE_OFFSET", "3"))
 
@@ -47,9 +77,31 @@ DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
 MAX_CONTEXT = int(os.environ.get("MAX_CONTEXT") or "10")
 MAX_STORAGE = int(os.environ.get("MAX_STORAGE", "100"))  # Количество сообщений в БД
 
+# Фоновое обслуживание БД: как часто запускать (в секундах), сколько секунд без
+# новых сообщений считать паузой в нагрузке и сколько свободных страниц
+# возвращать в файловую систему за один шаг incremental_vacuum
+DB_MAINTENANCE_INTERVAL = int(os.environ.get("DB_MAINTENANCE_INTERVAL") or "21600")
+DB_MAINTENANCE_IDLE = int(os.environ.get("DB_MAINTENANCE_IDLE") or "60")
+DB_VACUUM_STEP_PAGES = int(os.environ.get("DB_VACUUM_STEP_PAGES") or "256")
+
 # Интервал проверки подписки (в секундах)
 SUBSCRIPTION_CHECK_INTERVAL = int(os.environ.get("SUBSCRIPTION_CHECK_INTERVAL") or "1800")  # По умолчанию 30 минут
 
+# Интервал сверки подписок (в секундах), когда статусы обновляются по событиям
+# chat_member (бот - администратор всех REQUIRED_CHANNELS). В этом режиме
+# периодическая проверка только подстраховывает от пропущенных событий
+SUBSCRIPTION_RECONCILE_INTERVAL = int(os.environ.get("SUBSCRIPTION_RECONCILE_INTERVAL") or "86400")  # По умолчанию сутки
+
+# Шаг планировщика проверки подписок (в секундах): проверки идут небольшими
+# порциями каждые N секунд, равномерно распределяясь по SUBSCRIPTION_CHECK_INTERVAL
+SUBSCRIPTION_SCHEDULER_TICK = int(os.environ.get("SUBSCRIPTION_SCHEDULER_TICK") or "10")
+
+# Максимум одновременных запросов get_chat_member при проверке подписок
+SUBSCRIPTION_CHECK_CONCURRENCY = int(os.environ.get("SUBSCRIPTION_CHECK_CONCURRENCY") or "10")
+
+# Время жизни кэша членства (канал, пользователь) в секундах
+SUBSCRIPTION_CACHE_TTL = int(os.environ.get("SUBSCRIPTION_CACHE_TTL") or "600")  # По умолчанию 10 минут
+
 # Ссылка на форму обратной связи (опционально)
 FEEDBACK_FORM_URL = os.environ.get("FEEDBACK_FORM_URL", "")
 
@@ -59,32 +111,151 @@ with open("config/messages.json", encoding="utf-8") as f:
     MESSAGES = json.load(f)
 
 
-class TelegramLogsHandler(logging.Handler):
-    """Handler для отправки логов в Telegram чат."""
+# Отправка логов в Telegram: как часто отправлять накопленные записи (в секундах)
+# и сколько разных записей держать в очереди (лишние отбрасываются)
+TELEGRAM_LOG_FLUSH_INTERVAL = float(
+    os.environ.get("TELEGRAM_LOG_FLUSH_INTERVAL") or "5"
+)
+TELEGRAM_LOG_QUEUE_SIZE = int(os.environ.get("TELEGRAM_LOG_QUEUE_SIZE") or "200")
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Пересылка сообщений в ADMIN_CHAT (уровень MESSAGES и ниже): интервал, за который
+# сообщения собираются в одну пачку (в секундах), и размер очереди, после которого
+# пересылается только каждое DEBUG_MIRROR_SAMPLE_EVERY-е сообщение
+DEBUG_MIRROR_INTERVAL = float(os.environ.get("DEBUG_MIRROR_INTERVAL") or "3")
+DEBUG_MIRROR_MAX_PENDING = int(os.environ.get("DEBUG_MIRROR_MAX_PENDING") or "100")
+DEBUG_MIRROR_SAMPLE_EVERY = int(os.environ.get("DEBUG_MIRROR_SAMPLE_EVERY") or "10")
 
-    def __init__(self, bot, admin_chat_id):
+
+class TelegramLogsHandler(logging.Handler):
+    """
+    Handler для отправки логов в Telegram чат.
+
+    emit() только кладет запись в ограниченную очередь (без обращения к event
+    loop, поэтому его можно вызывать из любого потока). Фоновая задача раз
+    в TELEGRAM_LOG_FLUSH_INTERVAL секунд склеивает накопленные записи
+    в сообщения до 4096 символов. Одинаковые записи схлопываются в одну
+    с пометкой "×N", а записи сверх TELEGRAM_LOG_QUEUE_SIZE отбрасываются
+    и считаются.
+    """
+
+    def __init__(
+        self,
+        bot,
+        admin_chat_id,
+        flush_interval: float = TELEGRAM_LOG_FLUSH_INTERVAL,
+        queue_size: int = TELEGRAM_LOG_QUEUE_SIZE,
+    ):
         super().__init__()
         self.bot = bot
         self.admin_chat_id = admin_chat_id
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
         self._migration_warned = False  # Флаг для однократного предупреждения
+        self._pending: dict[str, int] = {}  # Текст записи -> количество повторов
+        self._dropped = 0  # Отброшено с последней отправки
+        self.dropped_total = 0  # Отброшено за все время
+        self._task = None
 
     def emit(self, record):
-        """Отправка лог-записи в Telegram."""
+        """Добавление лог-записи в очередь (вызывается под self.lock)."""
         try:
-            import asyncio
-
             log_entry = self.format(record)
-            # Отправляем асинхронно
-            asyncio.create_task(self._send_log(log_entry))
+            if log_entry in self._pending:
+                self._pending[log_entry] += 1
+            elif len(self._pending) < self.queue_size:
+                self._pending[log_entry] = 1
+            else:
+                self._dropped += 1
+                self.dropped_total += 1
         except Exception:
             self.handleError(record)
 
+    def start(self):
+        """Запускает фоновую отправку логов (нужен работающий event loop)."""
+        import asyncio
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновую отправку и отправляет оставшиеся записи."""
+        import asyncio
+
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush_pending()
+
+    async def _run(self):
+        """Фоновая задача: периодически отправляет накопленные записи."""
+        import asyncio
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_pending()
+
+    def _take_pending(self) -> list[str]:
+        """Забирает накопленные записи из очереди."""
+        self.acquire()
+        try:
+            pending, self._pending = self._pending, {}
+            dropped, self._dropped = self._dropped, 0
+        finally:
+            self.release()
+
+        lines = [
+            entry if count == 1 else f"{entry} ×{count}"
+            for entry, count in pending.items()
+        ]
+        if dropped:
+            lines.append(f"⚠️ Пропущено записей лога (переполнение очереди): {dropped}")
+        return lines
+
+    @staticmethod
+    def pack_messages(
+        lines: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT
+    ) -> list[str]:
+        """
+        Склеивает записи в сообщения не длиннее limit символов.
+
+        Слишком длинные записи (например, с traceback) разбиваются на части.
+        """
+        messages = []
+        current = ""
+        for line in lines:
+            for start in range(0, len(line), limit):
+                part = line[start : start + limit]
+                if current and len(current) + 1 + len(part) <= limit:
+                    current += "\n" + part
+                else:
+                    if current:
+                        messages.append(current)
+                    current = part
+        if current:
+            messages.append(current)
+        return messages
+
+    async def flush_pending(self):
+        """Отправляет все накопленные записи."""
+        for log_message in self.pack_messages(self._take_pending()):
+            await self._send_log(log_message)
+
     async def _send_log(self, log_entry):
         """Асинхронная отправка лога с обработкой ошибок."""
-        try:
-            from aiogram.exceptions import TelegramMigrateToChat
+        import asyncio
 
+        from aiogram.exceptions import TelegramMigrateToChat, TelegramRetryAfter
+
+        try:
             await self.bot.send_message(self.admin_chat_id, log_entry)
+        except TelegramRetryAfter as e:
+            # Упираемся в лимит чата - ждем и пробуем еще раз
+            await asyncio.sleep(e.retry_after)
+            with contextlib.suppress(Exception):
+                await self.bot.send_message(self.admin_chat_id, log_entry)
         except TelegramMigrateToChat as e:
             # Чат мигрирован, пробуем отправить в новый
             if not self._migration_warned:
@@ -174,16 +345,31 @@ def setup_logger():
 
 
 def add_telegram_handler(logger, bot):
-    """Добавляет Telegram handler к логгеру после инициализации бота."""
+    """
+    Добавляет Telegram handler к логгеру после инициализации бота.
+
+    Вызывается из работающего event loop. Handler от предыдущего запуска
+    (после перезапуска main) заменяется новым.
+
+    Returns:
+        Добавленный handler или None, если отправка логов в Telegram отключена
+    """
     telegram_level = getattr(logger, "_telegram_level", 100)
 
+    for handler in list(logger.handlers):
+        if isinstance(handler, TelegramLogsHandler):
+            logger.removeHandler(handler)
+
     if telegram_level < 100:  # Если не DISABLED
         th = TelegramLogsHandler(bot, ADMIN_CHAT)
         th.setLevel(telegram_level)
         formatter = logging.Formatter("%(levelname)s: %(message)s")
         th.setFormatter(formatter)
         logger.addHandler(th)
+        th.start()
         logger.info("Telegram logging handler enabled")
+        return th
+    return None
 
 
 # Настройка telegramify_markdown
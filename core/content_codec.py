@@ -0,0 +1,109 @@
+"""
+Сжатие текста сообщений (messages.content) для хранения в БД.
+
+Длинные ответы LLM и описания изображений сжимаются zlib с предустановленным
+словарем из таблицы content_dictionaries (обучается скриптом
+scripts/train_content_dict.py на сохраненных сообщениях). ID словаря - его
+Adler-32, который zlib записывает в заголовок сжатых данных, поэтому при
+распаковке словарь определяется по самим данным, а после обучения нового
+словаря старые сообщения остаются читаемыми.
+"""
+
+import re
+import zlib
+from collections import Counter
+from collections.abc import Iterable, Mapping
+
+# Значения messages.content_codec
+CODEC_TEXT = 0  # Текст без сжатия
+CODEC_ZLIB = 1  # zlib (со словарем или без)
+
+# Максимальный полезный размер словаря: окно zlib - 32 КБ
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+# Флаг FDICT во втором байте заголовка zlib (RFC 1950)
+_FDICT = 0x20
+
+# Слово вместе с пробелами и переносами строк после него
+_TOKEN_RE = re.compile(r"\S+\s*")
+
+
+def dictionary_id(dictionary: bytes) -> int:
+    """Возвращает ID словаря (Adler-32, как в заголовке zlib)."""
+    return zlib.adler32(dictionary)
+
+
+def stream_dictionary_id(data: bytes) -> int | None:
+    """Возвращает ID словаря, с которым сжаты данные, или None без словаря."""
+    if data[1] & _FDICT:
+        return int.from_bytes(data[2:6], "big")
+    return None
+
+
+def compress(text: str, dictionary: bytes | None = None) -> bytes:
+    """Сжимает текст zlib (со словарем, если он передан)."""
+    if dictionary:
+        compressor = zlib.compressobj(zdict=dictionary)
+    else:
+        compressor = zlib.compressobj()
+    return compressor.compress(text.encode()) + compressor.flush()
+
+
+def decompress(data: bytes, dictionaries: Mapping[int, bytes]) -> str:
+    """
+    Распаковывает текст, сжатый compress.
+
+    Args:
+        data: Сжатые данные.
+        dictionaries: Словари {ID словаря: словарь}.
+
+    Raises:
+        KeyError: Данные сжаты со словарем, которого нет в dictionaries.
+    """
+    dict_id = stream_dictionary_id(data)
+    if dict_id is None:
+        return zlib.decompress(data).decode()
+    decompressor = zlib.decompressobj(zdict=dictionaries[dict_id])
+    return (decompressor.decompress(data) + decompressor.flush()).decode()
+
+
+def train_dictionary(samples: Iterable[str], size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """
+    Строит словарь zlib по образцам текста.
+
+    Словарь - самые выгодные повторяющиеся фрагменты из 1-4 слов (выгода -
+    количество повторов, умноженное на длину в байтах). Самые выгодные
+    фрагменты ставятся в конец словаря: zlib кодирует ближние ссылки короче.
+
+    Args:
+        samples: Тексты сообщений.
+        size: Максимальный размер словаря в байтах.
+
+    Returns:
+        Словарь (пустой, если повторяющихся фрагментов нет).
+    """
+    counts = Counter()
+    for text in samples:
+        tokens = _TOKEN_RE.findall(text)
+        for n in range(1, 5):
+            for i in range(len(tokens) - n + 1):
+                counts["".join(tokens[i : i + n])] += 1
+
+    candidates = sorted(
+        (
+            (count * len(fragment.encode()), fragment.encode())
+            for fragment, count in counts.items()
+            if count > 1
+        ),
+        reverse=True,
+    )
+    chosen = []
+    total = 0
+    for _, fragment in candidates:
+        if total + len(fragment) > size:
+            continue
+        chosen.append(fragment)
+        total += len(fragment)
+        if total == size:
+            break
+    return b"".join(reversed(chosen))
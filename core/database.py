@@ -1,16 +1,63 @@
 import asyncio
 import os
-from datetime import UTC, datetime
+import time
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
 
 import aiosqlite
 from dotenv import load_dotenv
 
+from core import content_codec
+from core.verification_index import verification_index
+
 load_dotenv()
 LLM_TOKEN = os.environ.get("LLM_TOKEN")
 ADMIN_CHAT = int(os.environ.get("ADMIN_CHAT") or "0")
 DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
 MAX_CONTEXT = int(os.environ.get("MAX_CONTEXT") or "10")
 MAX_STORAGE = int(os.environ.get("MAX_STORAGE", "100"))
+# Размер страницы при постраничном обходе ID бесед
+ID_CHUNK_SIZE = int(os.environ.get("ID_CHUNK_SIZE") or "500")
+# Максимальное количество записей в кэше описаний изображений
+VISION_CACHE_SIZE = int(os.environ.get("VISION_CACHE_SIZE") or "10000")
+# user_id строк activity_rollup с суммой по всем беседам (ID 0 в Telegram не бывает)
+ACTIVITY_TOTAL_ID = 0
+# Смещение часового пояса относительно UTC, в котором считаются день и час
+# activity_rollup (графики /stats)
+TIMEZONE_OFFSET = int(os.environ.get("TIMEZONE_OFFSET", "3"))
+# Сжатие текста сообщений: off - без сжатия, zlib - сообщения не короче
+# CONTENT_COMPRESS_MIN_SIZE байт сжимаются zlib с последним обученным словарем
+CONTENT_COMPRESSION = os.environ.get("CONTENT_COMPRESSION") or "off"
+CONTENT_COMPRESS_MIN_SIZE = int(os.environ.get("CONTENT_COMPRESS_MIN_SIZE") or "512")
+# Значение PRAGMA auto_vacuum, при котором свободные страницы возвращаются
+# в файловую систему через PRAGMA incremental_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Время записи последнего сообщения (time.monotonic()): по нему фоновое
+# обслуживание БД (services/maintenance_service.py) находит паузы в нагрузке
+last_message_at = 0.0
+
+# Словари сжатия {ID: словарь} в порядке обучения, загружаются из
+# content_dictionaries при первом сжатии или распаковке
+_content_dictionaries: dict[int, bytes] | None = None
+
+
+async def _get_content_dictionaries(
+    db: aiosqlite.Connection, required_id: int | None = None
+) -> dict[int, bytes]:
+    """
+    Возвращает словари сжатия, загружая их при первом обращении или если
+    нужного словаря еще нет (обучен скриптом после загрузки).
+    """
+    global _content_dictionaries
+    if _content_dictionaries is None or (
+        required_id is not None and required_id not in _content_dictionaries
+    ):
+        cursor = await db.execute(
+            "SELECT id, data FROM content_dictionaries ORDER BY created_at, rowid"
+        )
+        _content_dictionaries = dict(await cursor.fetchall())
+    return _content_dictionaries
 
 
 class Conversation:
@@ -84,6 +131,237 @@ class Conversation:
             rows = await cursor.fetchall()
         return [row[0] for row in rows]
 
+    @staticmethod
+    async def iter_id_chunks(min_id: int | None = None, chunk_size: int | None = None):
+        """
+        Постранично обходит ID бесед по возрастанию (keyset-пагинация).
+
+        Каждая страница читается отдельным коротким запросом
+        `WHERE id > ? ORDER BY id LIMIT ?`, поэтому память не растет с числом
+        пользователей и соединение с БД не удерживается между страницами.
+
+        Args:
+            min_id: Нижняя граница (не включительно). Например, 0 - только личные
+                пользователи (id > 0). None - все беседы, включая чаты.
+            chunk_size: Размер страницы (по умолчанию ID_CHUNK_SIZE)
+
+        Yields:
+            Списки ID размером не больше chunk_size
+        """
+        chunk_size = chunk_size or ID_CHUNK_SIZE
+        last_id = min_id
+
+        while True:
+            async with aiosqlite.connect(DATABASE_NAME) as db:
+                if last_id is None:
+                    cursor = await db.execute(
+                        "SELECT id FROM conversations ORDER BY id LIMIT ?",
+                        (chunk_size,),
+                    )
+                else:
+                    cursor = await db.execute(
+                        "SELECT id FROM conversations WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, chunk_size),
+                    )
+                rows = await cursor.fetchall()
+
+            if not rows:
+                return
+
+            chunk = [row[0] for row in rows]
+            yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1]
+
+    @staticmethod
+    async def iter_ids(min_id: int | None = None, chunk_size: int | None = None):
+        """
+        Обходит ID бесед по одному, читая их из БД страницами.
+
+        Args:
+            min_id: Нижняя граница (не включительно), см. iter_id_chunks()
+            chunk_size: Размер страницы (по умолчанию ID_CHUNK_SIZE)
+
+        Yields:
+            ID бесед по возрастанию
+        """
+        async for chunk in Conversation.iter_id_chunks(min_id, chunk_size):
+            for conversation_id in chunk:
+                yield conversation_id
+
+    @staticmethod
+    async def get_many_from_db(ids: list[int]) -> dict[int, "Conversation"]:
+        """
+        Загружает несколько бесед одним запросом.
+
+        Args:
+            ids: Список ID бесед (не больше ID_CHUNK_SIZE за раз)
+
+        Returns:
+            Словарь {id: Conversation} только для найденных бесед
+        """
+        if not ids:
+            return {}
+
+        placeholders = ", ".join("?" for _ in ids)
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                f"""
+                SELECT id, name, active_messages_count, subscription_verified, referral_code
+                FROM conversations WHERE id IN ({placeholders})
+                """,
+                list(ids),
+            )
+            rows = await cursor.fetchall()
+
+        return {
+            row[0]: Conversation(
+                id=row[0],
+                name=row[1],
+                active_messages_count=row[2],
+                subscription_verified=row[3],
+                referral_code=row[4],
+            )
+            for row in rows
+        }
+
+    @staticmethod
+    async def update_subscription_statuses(statuses: dict[int, int]):
+        """
+        Записывает статусы подписки для нескольких бесед одной транзакцией.
+
+        Args:
+            statuses: Словарь {id: subscription_verified}
+        """
+        if not statuses:
+            return
+
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            await db.executemany(
+                "UPDATE conversations SET subscription_verified = ? WHERE id = ?",
+                [(status, conversation_id) for conversation_id, status in statuses.items()],
+            )
+            await db.commit()
+
+        for conversation_id, status in statuses.items():
+            verification_index.set_status(conversation_id, status)
+
+    @staticmethod
+    async def count_ids(min_id: int | None = None) -> int:
+        """
+        Считает беседы в БД.
+
+        Args:
+            min_id: Нижняя граница ID (не включительно), например 0 - только личные пользователи
+        """
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            if min_id is None:
+                cursor = await db.execute("SELECT COUNT(*) FROM conversations")
+            else:
+                cursor = await db.execute(
+                    "SELECT COUNT(*) FROM conversations WHERE id > ?", (min_id,)
+                )
+            return (await cursor.fetchone())[0]
+
+    @staticmethod
+    async def get_due_for_subscription_check(now: int, limit: int) -> list["Conversation"]:
+        """
+        Возвращает личных пользователей, которым пора проверить подписку.
+
+        Сначала идут никогда не проверявшиеся (next_check_at IS NULL),
+        затем самые просроченные.
+
+        Args:
+            now: Текущее unix-время
+            limit: Максимальное количество пользователей
+        """
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                """
+                SELECT id, name, active_messages_count, subscription_verified, referral_code
+                FROM conversations
+                WHERE id > 0 AND (next_check_at IS NULL OR next_check_at <= ?)
+                ORDER BY next_check_at
+                LIMIT ?
+                """,
+                (now, limit),
+            )
+            rows = await cursor.fetchall()
+
+        return [
+            Conversation(
+                id=row[0],
+                name=row[1],
+                active_messages_count=row[2],
+                subscription_verified=row[3],
+                referral_code=row[4],
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    async def get_last_activity(ids: list[int]) -> dict[int, int]:
+        """
+        Возвращает время последнего сообщения пользователя для нескольких бесед.
+
+        Args:
+            ids: Список ID бесед
+
+        Returns:
+            Словарь {id: unix-время последнего сообщения от пользователя}
+        """
+        if not ids:
+            return {}
+
+        placeholders = ", ".join("?" for _ in ids)
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                f"""
+                SELECT user_id, MAX(created_at) FROM messages
+                WHERE user_id IN ({placeholders}) AND role = 'user'
+                GROUP BY user_id
+                """,
+                list(ids),
+            )
+            rows = await cursor.fetchall()
+
+        # MAX(created_at) = NULL, если у всех сообщений некорректный timestamp
+        return {
+            user_id: created_at
+            for user_id, created_at in rows
+            if created_at is not None
+        }
+
+    @staticmethod
+    async def update_subscription_schedule(checks: dict[int, tuple[int | None, int]]):
+        """
+        Записывает результаты проверки подписки и время следующей проверки
+        для нескольких бесед одной транзакцией.
+
+        Args:
+            checks: Словарь {id: (subscription_verified, next_check_at)}
+        """
+        if not checks:
+            return
+
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            await db.executemany(
+                """
+                UPDATE conversations SET subscription_verified = ?, next_check_at = ?
+                WHERE id = ?
+                """,
+                [
+                    (status, next_check_at, conversation_id)
+                    for conversation_id, (status, next_check_at) in checks.items()
+                ],
+            )
+            await db.commit()
+
+        for conversation_id, (status, _) in checks.items():
+            verification_index.set_status(conversation_id, status)
+
     async def save_for_db(self):
         async with aiosqlite.connect(DATABASE_NAME) as db:
             cursor = await db.cursor()
@@ -102,24 +380,63 @@ class Conversation:
             await db.commit()
             await cursor.close()
 
+        verification_index.set_status(self.id, self.subscription_verified)
+
     async def update_prompt(self, role, new_request):
         """
         Добавляет новое сообщение в таблицу messages.
         Старые сообщения (больше MAX_STORAGE) автоматически удаляются.
+        Сообщения пользователя учитываются в activity_rollup.
+        Длинные сообщения сжимаются, если включено CONTENT_COMPRESSION.
         """
+        global last_message_at
+        last_message_at = time.monotonic()
+
         # Получаем текущее время в UTC
         current_time = datetime.now(UTC)
         timestamp = current_time.strftime("%Y-%m-%d %H:%M:%S")
 
         async with aiosqlite.connect(DATABASE_NAME) as db:
+            content, codec = new_request, content_codec.CODEC_TEXT
+            if (
+                CONTENT_COMPRESSION == "zlib"
+                and len(new_request.encode()) >= CONTENT_COMPRESS_MIN_SIZE
+            ):
+                dictionaries = await _get_content_dictionaries(db)
+                content = content_codec.compress(
+                    new_request, next(reversed(dictionaries.values()), None)
+                )
+                codec = content_codec.CODEC_ZLIB
+
             # Добавляем новое сообщение
             await db.execute(
                 """
-                INSERT INTO messages (user_id, role, content, timestamp)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO messages
+                    (user_id, role, content, content_codec, timestamp, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (self.id, role, new_request, timestamp),
+                (
+                    self.id,
+                    role,
+                    content,
+                    codec,
+                    timestamp,
+                    int(current_time.timestamp()),
+                ),
             )
+            if role == "user":
+                # Счетчики активности для /stats (беседы и общий) в часовом
+                # поясе TIMEZONE_OFFSET: не зависят от удаления старых сообщений ниже
+                local_time = current_time + timedelta(hours=TIMEZONE_OFFSET)
+                day, hour = local_time.strftime("%Y-%m-%d"), local_time.hour
+                await db.execute(
+                    """
+                    INSERT INTO activity_rollup (user_id, day, hour, count)
+                    VALUES (?, ?, ?, 1), (?, ?, ?, 1)
+                    ON CONFLICT (user_id, day, hour) DO UPDATE SET count = count + 1
+                    """,
+                    (self.id, day, hour, ACTIVITY_TOTAL_ID, day, hour),
+                )
 
             # Проверяем количество сообщений и удаляем старые, если превышен лимит
             async with db.execute(
@@ -151,6 +468,9 @@ class Conversation:
         - NULL: возвращает последние MAX_CONTEXT сообщений
         - 0: возвращает пустой список (забыть всё)
         - N: возвращает последние N сообщений (но не больше MAX_CONTEXT)
+
+        Сжатые сообщения распаковываются после выборки, только попавшие
+        в контекст; словари сжатия загружаются при первом сжатом сообщении.
         """
         async with aiosqlite.connect(DATABASE_NAME) as db:
             # Определяем сколько сообщений нужно получить
@@ -167,7 +487,7 @@ class Conversation:
             # Получаем сообщения
             async with db.execute(
                 """
-                SELECT role, content, timestamp
+                SELECT role, content, content_codec, timestamp
                 FROM messages
                 WHERE user_id = ?
                 ORDER BY id DESC
@@ -178,10 +498,17 @@ class Conversation:
                 rows = await cursor.fetchall()
 
             # Переворачиваем список (самые старые сначала)
-            return [
-                {"role": row[0], "content": row[1], "timestamp": row[2]}
-                for row in reversed(rows)
-            ]
+            messages = []
+            for role, content, codec, timestamp in reversed(rows):
+                if codec == content_codec.CODEC_ZLIB:
+                    dictionaries = await _get_content_dictionaries(
+                        db, content_codec.stream_dictionary_id(content)
+                    )
+                    content = content_codec.decompress(content, dictionaries)
+                messages.append(
+                    {"role": role, "content": content, "timestamp": timestamp}
+                )
+            return messages
 
     async def update_in_db(self):
         async with aiosqlite.connect(DATABASE_NAME) as db:
@@ -199,22 +526,70 @@ class Conversation:
                 self.id,
             )
             await cursor.execute(sql_query, values)
+            updated = cursor.rowcount
             await db.commit()
             await cursor.close()
 
+        if updated:
+            verification_index.set_status(self.id, self.subscription_verified)
+
     async def delete_from_db(self):
         """Удаляет беседу и все её сообщения из базы данных."""
+        await Conversation.delete_many([self.id])
+
+    @staticmethod
+    async def delete_many(ids: Iterable[int], chunk_size: int | None = None) -> int:
+        """
+        Удаляет беседы и все их данные: сообщения, счетчики activity_rollup
+        (общие счетчики бота остаются) и верификацию чата.
+
+        Удаление идет пачками по chunk_size ID, каждая пачка - отдельная
+        транзакция: ID пачки записываются во временную таблицу, и каждая
+        таблица очищается одним запросом по ней. В соединении включен
+        PRAGMA foreign_keys, поэтому удаление из conversations каскадно
+        удаляет messages и chat_verifications (ON DELETE CASCADE); запросы
+        по остальным таблицам удаляют строки бесед без записи в conversations.
+
+        Args:
+            ids: ID бесед
+            chunk_size: Размер пачки (по умолчанию ID_CHUNK_SIZE)
+
+        Returns:
+            Количество удаленных записей conversations
+        """
+        chunk_size = chunk_size or ID_CHUNK_SIZE
+        ids = sorted(set(ids) - {ACTIVITY_TOTAL_ID})
+        deleted = 0
         async with aiosqlite.connect(DATABASE_NAME) as db:
-            cursor = await db.cursor()
+            await db.execute("PRAGMA foreign_keys = ON")
+            await db.execute("CREATE TEMP TABLE purge_ids (id INTEGER PRIMARY KEY)")
 
-            # Удаляем сообщения беседы
-            await cursor.execute("DELETE FROM messages WHERE user_id = ?", (self.id,))
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start : start + chunk_size]
+                await db.execute("DELETE FROM purge_ids")
+                await db.executemany(
+                    "INSERT INTO purge_ids (id) VALUES (?)",
+                    [(conversation_id,) for conversation_id in chunk],
+                )
+                cursor = await db.execute(
+                    "DELETE FROM conversations WHERE id IN (SELECT id FROM purge_ids)"
+                )
+                deleted += cursor.rowcount
+                for table, column in (
+                    ("messages", "user_id"),
+                    ("chat_verifications", "chat_id"),
+                    ("activity_rollup", "user_id"),
+                ):
+                    await db.execute(
+                        f"DELETE FROM {table} WHERE {column} IN (SELECT id FROM purge_ids)"
+                    )
+                await db.commit()
 
-            # Удаляем саму беседу
-            await cursor.execute("DELETE FROM conversations WHERE id = ?", (self.id,))
+                for conversation_id in chunk:
+                    verification_index.set_chat_verified(conversation_id, False)
+                    verification_index.remove_conversation(conversation_id)
 
-            await db.commit()
-            await cursor.close()
+        return deleted
 
 
 class ChatVerification:
@@ -276,6 +651,8 @@ class ChatVerification:
             await db.commit()
             await cursor.close()
 
+        verification_index.set_chat_verified(self.chat_id, True)
+
     async def delete_from_db(self):
         """Удаляет информацию о верификации чата из БД."""
         async with aiosqlite.connect(DATABASE_NAME) as db:
@@ -286,6 +663,55 @@ class ChatVerification:
             await db.commit()
             await cursor.close()
 
+        verification_index.set_chat_verified(self.chat_id, False)
+
+    @staticmethod
+    async def get_all_from_db() -> list["ChatVerification"]:
+        """Загружает все верификации чатов из БД."""
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                "SELECT chat_id, verified_by_user_id, verified_at, user_name FROM chat_verifications"
+            )
+            rows = await cursor.fetchall()
+
+        return [
+            ChatVerification(
+                chat_id=row[0],
+                verified_by_user_id=row[1],
+                verified_at=row[2],
+                user_name=row[3],
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    async def delete_by_verifier(user_id: int) -> list[int]:
+        """
+        Удаляет верификации всех чатов, подтвержденных указанным пользователем.
+
+        Args:
+            user_id: ID пользователя-верификатора
+
+        Returns:
+            Список ID чатов, у которых удалена верификация
+        """
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                "SELECT chat_id FROM chat_verifications WHERE verified_by_user_id = ?",
+                (user_id,),
+            )
+            chat_ids = [row[0] for row in await cursor.fetchall()]
+            if chat_ids:
+                await db.execute(
+                    "DELETE FROM chat_verifications WHERE verified_by_user_id = ?",
+                    (user_id,),
+                )
+                await db.commit()
+
+        for chat_id in chat_ids:
+            verification_index.set_chat_verified(chat_id, False)
+        return chat_ids
+
     @staticmethod
     async def is_chat_verified(chat_id: int) -> bool:
         """
@@ -308,40 +734,179 @@ class ChatVerification:
         return bool(result)
 
 
-async def delete_chat_data(chat_id: int):
+class VisionCache:
     """
-    Удаляет все данные чата из БД (верификацию, сообщения, пользователя).
+    Кэш описаний изображений от vision модели.
 
-    Args:
-        chat_id: ID чата (отрицательное число)
+    Запись находится по file_unique_id из Telegram (до скачивания файла,
+    в любом чате) или по перцептивному хэшу изображения вместе с его
+    размерами (тот же мем, загруженный заново), но только в том чате,
+    откуда пришло изображение: одинаковый хэш бывает и у разных картинок
+    (скриншоты текста, документы, однотонные изображения).
+    Размер ограничен VISION_CACHE_SIZE записями: при переполнении удаляются
+    дольше всего не использовавшиеся (LRU по last_used_at).
     """
-    from config import logger
 
-    async with aiosqlite.connect(DATABASE_NAME) as db:
-        cursor = await db.cursor()
+    @staticmethod
+    async def _use(db: aiosqlite.Connection, row: tuple | None) -> str | None:
+        """
+        Обновляет last_used_at и счетчик hits найденной записи (id, description).
 
-        # Удаляем верификацию чата
-        await cursor.execute(
-            "DELETE FROM chat_verifications WHERE chat_id = ?", (chat_id,)
+        Returns:
+            Описание изображения или None, если запись не найдена
+        """
+        if row is None:
+            return None
+
+        await db.execute(
+            "UPDATE vision_cache SET last_used_at = ?, hits = hits + 1 WHERE id = ?",
+            (int(datetime.now(UTC).timestamp()), row[0]),
         )
-        logger.debug(f"CHAT{chat_id}: верификация удалена из БД")
+        await db.commit()
+        return row[1]
+
+    @staticmethod
+    async def get(file_unique_id: str) -> str | None:
+        """
+        Ищет описание по file_unique_id.
 
-        # Удаляем все сообщения чата
-        await cursor.execute("DELETE FROM messages WHERE user_id = ?", (chat_id,))
-        logger.debug(f"CHAT{chat_id}: сообщения удалены из БД")
+        При попадании обновляет last_used_at и счетчик hits записи.
 
-        # Удаляем запись о чате из таблицы conversations (если есть)
-        await cursor.execute("DELETE FROM conversations WHERE id = ?", (chat_id,))
-        logger.debug(f"CHAT{chat_id}: запись беседы удалена из БД")
+        Args:
+            file_unique_id: Уникальный ID файла в Telegram
 
-        await db.commit()
-        await cursor.close()
+        Returns:
+            Описание изображения или None, если в кэше его нет
+        """
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                "SELECT id, description FROM vision_cache WHERE file_unique_id = ?",
+                (file_unique_id,),
+            )
+            return await VisionCache._use(db, await cursor.fetchone())
+
+    @staticmethod
+    async def get_by_hash(
+        chat_id: int, image_hash: int, width: int, height: int
+    ) -> str | None:
+        """
+        Ищет описание изображения того же размера с тем же хэшем в чате.
+
+        При попадании обновляет last_used_at и счетчик hits записи.
+
+        Args:
+            chat_id: ID чата, откуда пришло изображение
+            image_hash: Перцептивный хэш изображения (64 бита со знаком)
+            width: Ширина изображения
+            height: Высота изображения
+
+        Returns:
+            Описание изображения или None, если в кэше его нет
+        """
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                """
+                SELECT id, description FROM vision_cache
+                WHERE chat_id = ? AND image_hash = ? AND width = ? AND height = ?
+                ORDER BY last_used_at DESC LIMIT 1
+                """,
+                (chat_id, image_hash, width, height),
+            )
+            return await VisionCache._use(db, await cursor.fetchone())
+
+    @staticmethod
+    async def save(
+        file_unique_id: str | None,
+        description: str,
+        chat_id: int | None = None,
+        image_key: tuple[int, int, int] | None = None,
+    ):
+        """
+        Сохраняет описание изображения и удаляет лишние старые записи.
+
+        Args:
+            file_unique_id: Уникальный ID файла в Telegram
+            description: Описание от vision модели
+            chat_id: ID чата, откуда пришло изображение
+            image_key: (перцептивный хэш, ширина, высота) изображения
+        """
+        image_hash, width, height = image_key or (None, None, None)
+        now = int(datetime.now(UTC).timestamp())
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            await db.execute(
+                """
+                INSERT INTO vision_cache (
+                    file_unique_id, chat_id, image_hash, width, height,
+                    description, created_at, last_used_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_unique_id) DO UPDATE SET
+                    chat_id = excluded.chat_id,
+                    image_hash = excluded.image_hash,
+                    width = excluded.width,
+                    height = excluded.height,
+                    description = excluded.description,
+                    last_used_at = excluded.last_used_at
+                """,
+                (
+                    file_unique_id,
+                    chat_id,
+                    image_hash,
+                    width,
+                    height,
+                    description,
+                    now,
+                    now,
+                ),
+            )
+            await db.execute(
+                """
+                DELETE FROM vision_cache WHERE id IN (
+                    SELECT id FROM vision_cache
+                    ORDER BY last_used_at DESC, id DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (VISION_CACHE_SIZE,),
+            )
+            await db.commit()
+
+    @staticmethod
+    async def get_stats() -> dict:
+        """
+        Возвращает статистику кэша.
+
+        Returns:
+            Словарь:
+            - entries: количество записей
+            - saved_calls: сколько раз описание взято из кэша вместо vision модели
+        """
+        async with aiosqlite.connect(DATABASE_NAME) as db:
+            cursor = await db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM vision_cache"
+            )
+            entries, saved_calls = await cursor.fetchone()
+
+        return {"entries": entries, "saved_calls": saved_calls}
+
+
+async def delete_chat_data(chat_id: int):
+    """
+    Удаляет все данные чата из БД (верификацию, сообщения, пользователя).
 
+    Args:
+        chat_id: ID чата (отрицательное число)
+    """
+    from core.config import logger
+
+    await Conversation.delete_many([chat_id])
     logger.info(f"CHAT{chat_id}: все данные удалены из БД")
 
 
 async def check_db():
     async with aiosqlite.connect(DATABASE_NAME) as db:
+        # Действует только для новой (пустой) БД, существующие переводит миграция 016
+        await db.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
         async with db.cursor() as cursor:
             # Таблица conversations - основная таблица с пользователями и чатами
             await cursor.execute(
@@ -351,7 +916,8 @@ async def check_db():
                     name TEXT,
                     active_messages_count INTEGER,
                     subscription_verified INTEGER,
-                    referral_code TEXT DEFAULT NULL
+                    referral_code TEXT DEFAULT NULL,
+                    next_check_at INTEGER DEFAULT NULL
                 )
                 """
             )
@@ -365,11 +931,40 @@ async def check_db():
                     role TEXT NOT NULL,
                     content TEXT NOT NULL,
                     timestamp TEXT NOT NULL,
+                    created_at INTEGER,
+                    content_codec INTEGER NOT NULL DEFAULT 0,
                     FOREIGN KEY (user_id) REFERENCES conversations (id) ON DELETE CASCADE
                 )
                 """
             )
             
+            # Таблица content_dictionaries - словари сжатия messages.content
+            # (ID - Adler-32 словаря из заголовка сжатых данных)
+            await cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS content_dictionaries (
+                    id INTEGER PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    created_at INTEGER NOT NULL
+                )
+                """
+            )
+
+            # Таблица activity_rollup - сообщения пользователей по часам для /stats
+            # (не очищается при удалении старых сообщений по MAX_STORAGE);
+            # строки с user_id = ACTIVITY_TOTAL_ID - сумма по всем беседам
+            await cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity_rollup (
+                    user_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, day, hour)
+                ) WITHOUT ROWID
+                """
+            )
+
             # Таблица chat_verifications - верификация подписки для чатов
             await cursor.execute(
                 """
@@ -382,10 +977,121 @@ async def check_db():
                 )
                 """
             )
+
+            # Таблица vision_cache - кэш описаний изображений от vision модели
+            await cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vision_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_unique_id TEXT UNIQUE,
+                    chat_id INTEGER,
+                    image_hash INTEGER,
+                    width INTEGER,
+                    height INTEGER,
+                    description TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    last_used_at INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            await cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_vision_cache_chat_id_image_hash "
+                "ON vision_cache (chat_id, image_hash)"
+            )
+            await cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_vision_cache_last_used_at ON vision_cache (last_used_at)"
+            )
         await db.commit()
         return "Бд подгружена успешно"
 
 
+async def load_verification_index():
+    """
+    Загружает индекс верификации (core.verification_index) из БД.
+
+    Вызывается при старте бота, после применения миграций.
+    """
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        cursor = await db.execute("SELECT id, subscription_verified FROM conversations")
+        statuses = {row[0]: row[1] for row in await cursor.fetchall()}
+
+        cursor = await db.execute("SELECT chat_id FROM chat_verifications")
+        verified_chats = {row[0] for row in await cursor.fetchall()}
+
+    verification_index.replace(statuses, verified_chats)
+    return len(statuses), len(verified_chats)
+
+
+async def get_db_stats() -> dict[str, int | str]:
+    """
+    Возвращает статистику файла БД.
+
+    Returns:
+        {"page_size", "page_count", "freelist_count" (свободные страницы),
+        "auto_vacuum" (0 - NONE, 1 - FULL, 2 - INCREMENTAL), "journal_mode"}
+    """
+    stats = {}
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        for pragma in (
+            "page_size",
+            "page_count",
+            "freelist_count",
+            "auto_vacuum",
+            "journal_mode",
+        ):
+            cursor = await db.execute(f"PRAGMA {pragma}")
+            stats[pragma] = (await cursor.fetchone())[0]
+    return stats
+
+
+async def incremental_vacuum(pages: int) -> int:
+    """
+    Возвращает в файловую систему до pages свободных страниц одной короткой
+    транзакцией (при auto_vacuum = INCREMENTAL).
+
+    Returns:
+        Количество оставшихся свободных страниц
+    """
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        # execute() выполняет один шаг прагмы (освобождает одну страницу),
+        # executescript() - прагму целиком
+        await db.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        cursor = await db.execute("PRAGMA freelist_count")
+        return (await cursor.fetchone())[0]
+
+
+async def analyze_db(analysis_limit: int):
+    """
+    Обновляет статистику планировщика запросов (sqlite_stat1).
+
+    Args:
+        analysis_limit: Сколько строк каждого индекса просматривать
+            (приблизительная статистика за ограниченное время)
+    """
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        await db.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+        await db.execute("ANALYZE")
+        await db.commit()
+
+
+async def checkpoint_wal() -> tuple[int, int, int] | None:
+    """
+    Переносит страницы из WAL в файл БД без ожидания читателей и писателей
+    (PRAGMA wal_checkpoint(PASSIVE)).
+
+    Returns:
+        (1 если чекпоинт не выполнен из-за блокировки, страниц в WAL,
+        перенесено страниц) или None, если БД не в режиме WAL
+    """
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        cursor = await db.execute("PRAGMA journal_mode")
+        if (await cursor.fetchone())[0] != "wal":
+            return None
+        cursor = await db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        return tuple(await cursor.fetchone())
+
+
 async def user_exists(user_id):
     async with aiosqlite.connect(DATABASE_NAME) as db:
         cursor = await db.cursor()
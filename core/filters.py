@@ -9,6 +9,7 @@ from aiogram.filters import Filter
 
 import core.database as database
 from core.config import ADMIN_CHAT, FULL_LEVEL, logger
+from core.verification_index import verification_index
 
 
 class UserNotInDB(Filter):
@@ -16,6 +17,9 @@ class UserNotInDB(Filter):
 
     async def __call__(self, message: types.Message) -> bool:
         user_id = message.chat.id
+        # Зарегистрированных отсекаем по индексу в памяти без запроса к БД
+        if verification_index.conversation_exists(user_id):
+            return False
         return not await database.user_exists(user_id)
 
 
@@ -9,11 +9,53 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message
 
 from core.config import ADMIN_CHAT, REQUIRED_CHANNELS, logger
-from core.database import ChatVerification, Conversation, user_exists
-from core.utils import is_private_chat
+from core.database import load_verification_index
+from core.utils import is_private_chat, should_respond_in_chat
+from core.verification_index import verification_index
 from handlers.subscription_handlers import send_subscription_request
 
 
+class GroupTrafficMiddleware(BaseMiddleware):
+    """
+    Outer middleware для отсева сообщений в групповых чатах, не обращенных к боту.
+
+    Выполняется до фильтров, других middleware и обработчиков, поэтому
+    для такой болтовни в группах не делается ни запросов к БД, ни к Bot API.
+    Пропускает ответы на сообщения бота, упоминания бота, команды и сообщения
+    о добавлении/удалении участников.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: dict[str, Any],
+    ) -> Any:
+        """
+        Пропускает сообщение дальше или молча отбрасывает его.
+
+        Args:
+            handler: Следующий обработчик в цепочке
+            event: Сообщение от пользователя
+            data: Дополнительные данные
+        """
+        if (
+            not isinstance(event, Message)
+            or is_private_chat(event)
+            or event.chat.id == ADMIN_CHAT
+            # Добавление/удаление участников (в том числе самого бота)
+            or event.new_chat_members
+            or event.left_chat_member
+            # Команды (/start, /help, /forget)
+            or (event.text and event.text.startswith("/"))
+            or await should_respond_in_chat(event)
+        ):
+            return await handler(event, data)
+
+        # Сообщение в группе не обращено к боту - дальше не обрабатываем
+        return None
+
+
 class SubscriptionMiddleware(BaseMiddleware):
     """
     Middleware для проверки подписки пользователя на обязательные каналы.
@@ -31,6 +73,9 @@ class SubscriptionMiddleware(BaseMiddleware):
         Для личных чатов: проверяет subscription_verified пользователя.
         Для групповых чатов: проверяет наличие записи в chat_verifications.
 
+        Данные берутся из индекса верификации в памяти (core.verification_index),
+        поэтому проверка не обращается к БД.
+
         Args:
             handler: Следующий обработчик в цепочке
             event: Сообщение от пользователя
@@ -62,22 +107,22 @@ class SubscriptionMiddleware(BaseMiddleware):
         ):
             return await handler(event, data)
 
+        # Индекс загружается при старте бота, здесь - страховка на случай его отсутствия
+        if not verification_index.loaded:
+            await load_verification_index()
+
         # Различаем личные чаты и групповые
         if is_private_chat(event):
             # === ЛИЧНЫЙ ЧАТ ===
             # Проверяем, существует ли пользователь в БД
             user_id = event.from_user.id
-            if not await user_exists(user_id):
+            if not verification_index.conversation_exists(user_id):
                 # Пользователь еще не зарегистрирован, пропускаем проверку
                 # (регистрация покажет сообщение о подписке)
                 return await handler(event, data)
 
-            # Получаем пользователя из БД
-            conversation = Conversation(user_id)
-            await conversation.get_from_db()
-
             # Проверяем статус подписки
-            if conversation.subscription_verified == 0:
+            if verification_index.is_unsubscribed(user_id):
                 # Пользователь не подписан
                 logger.info(
                     f"USER{user_id}: попытка использования бота без подписки (ЛС)"
@@ -97,7 +142,7 @@ class SubscriptionMiddleware(BaseMiddleware):
         chat_id = event.chat.id
 
         # Проверяем, верифицирован ли чат
-        is_verified = await ChatVerification.is_chat_verified(chat_id)
+        is_verified = verification_index.is_chat_verified(chat_id)
 
         if not is_verified:
             # Чат не верифицирован
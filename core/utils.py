@@ -3,17 +3,20 @@
 """
 
 import asyncio
+import re
 
 from aiogram import types
 from aiogram.enums import ParseMode
-from aiogram.exceptions import (
-    TelegramBadRequest,
-    TelegramForbiddenError,
-    TelegramMigrateToChat,
-)
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 from core.bot_instance import bot
-from core.config import ADMIN_CHAT, MESSAGES_LEVEL, logger
+from core.config import ADMIN_CHAT, logger
+
+# ID и username бота: загружаются один раз при запуске (load_bot_identity в main())
+_bot_id: int | None = None
+_bot_username: str | None = None
+# Упоминание @username бота целиком (username в Telegram не зависит от регистра)
+_mention_pattern: re.Pattern | None = None
 
 
 async def keep_typing(chat_id: int, duration: int = 30):
@@ -30,71 +33,91 @@ async def keep_typing(chat_id: int, duration: int = 30):
         await asyncio.sleep(3)
 
 
-async def forward_to_debug(message_chat_id: int, message_id: int):
+def is_private_chat(message: types.Message) -> bool:
     """
-    Пересылает сообщение в отладочный чат с меткой USER ID.
-    Пересылка происходит только если TELEGRAM_LOG_LEVEL <= MESSAGES (25).
+    Проверяет, является ли сообщение из личного чата.
 
     Args:
-        message_chat_id: ID чата с сообщением
-        message_id: ID сообщения
+        message: Сообщение от пользователя
+
+    Returns:
+        True если это личный чат, False если группа/супергруппа/канал
     """
-    # Проверяем уровень Telegram логирования
-    telegram_level = getattr(logger, "_telegram_level", 100)
+    return message.chat.type == "private"
 
-    # Пересылаем только если уровень <= MESSAGES (включая INFO, DEBUG, FULL)
-    if telegram_level > MESSAGES_LEVEL:
-        return
 
-    try:
-        # Отправляем метку с USER ID перед пересылкой
-        await bot.send_message(ADMIN_CHAT, f"USER{message_chat_id}")
-        # Пересылаем сообщение
-        await bot.forward_message(
-            chat_id=ADMIN_CHAT, from_chat_id=message_chat_id, message_id=message_id
-        )
-    except TelegramMigrateToChat as e:
-        # Чат был преобразован в супергруппу
-        new_chat_id = e.migrate_to_chat_id
-        logger.warning(
-            f"⚠️ ADMIN чат был преобразован в супергруппу!\n"
-            f"Старый ID: {ADMIN_CHAT}\n"
-            f"Новый ID: {new_chat_id}\n"
-            f"❗ Обновите переменную ADMIN_CHAT в .env или GitHub Secrets"
-        )
-        # Пытаемся отправить в новый чат
-        try:
-            await bot.send_message(new_chat_id, f"USER{message_chat_id}")
-            await bot.forward_message(
-                chat_id=new_chat_id, from_chat_id=message_chat_id, message_id=message_id
-            )
-            logger.info(f"✅ Сообщение успешно отправлено в новый чат {new_chat_id}")
-        except Exception as e2:
-            logger.error(
-                f"❌ Не удалось отправить сообщение в новый чат {new_chat_id}: {e2}"
-            )
-    except Exception as e:
-        # Любые другие ошибки (бот не добавлен в чат, чат не существует и т.д.)
-        logger.warning(
-            f"⚠️ Не удалось переслать сообщение в ADMIN чат (ID: {ADMIN_CHAT}): {e}\n"
-            f"Проверьте:\n"
-            f"1. Бот добавлен в ADMIN чат\n"
-            f"2. ADMIN_CHAT ID корректный\n"
-            f"3. У бота есть права на отправку сообщений"
-        )
+async def load_bot_identity() -> types.User:
+    """
+    Загружает ID и username бота и готовит поиск упоминаний бота.
 
+    Вызывается один раз при запуске в main(), чтобы не запрашивать get_me
+    на каждое сообщение в группах.
 
-def is_private_chat(message: types.Message) -> bool:
+    Returns:
+        Информация о боте
     """
-    Проверяет, является ли сообщение из личного чата.
+    global _bot_id, _bot_username, _mention_pattern
+
+    bot_info = await bot.get_me()
+    _bot_id = bot_info.id
+    _bot_username = bot_info.username
+    _mention_pattern = re.compile(
+        rf"@{re.escape(bot_info.username)}(?![A-Za-z0-9_])", re.IGNORECASE
+    )
+    return bot_info
+
+
+async def get_bot_identity() -> tuple[int, str]:
+    """
+    Возвращает ID и username бота (загружает их, если еще не загружены).
+
+    Returns:
+        Кортеж (ID бота, username бота)
+    """
+    if _bot_id is None:
+        await load_bot_identity()
+    return _bot_id, _bot_username
+
+
+def is_bot_addressed(message: types.Message) -> bool:
+    """
+    Проверяет, обращено ли сообщение к боту: ответ на сообщение бота,
+    упоминание @username в тексте или подписи, упоминание через text_mention.
+
+    Требует загруженных данных бота (load_bot_identity).
 
     Args:
         message: Сообщение от пользователя
 
     Returns:
-        True если это личный чат, False если группа/супергруппа/канал
+        True если сообщение обращено к боту, False иначе
     """
-    return message.chat.type == "private"
+    # Проверяем, является ли сообщение ответом на сообщение бота
+    reply = message.reply_to_message
+    if reply and reply.from_user and reply.from_user.id == _bot_id:
+        return True
+
+    # Проверяем упоминание бота в тексте и в caption (для фото/видео).
+    # Упоминания через entities типа mention совпадают с @username в тексте
+    for text, entities in (
+        (message.text, message.entities),
+        (message.caption, message.caption_entities),
+    ):
+        if not text:
+            continue
+        if _mention_pattern.search(text):
+            return True
+        # Прямое упоминание пользователя (может быть и ботом)
+        if entities:
+            for entity in entities:
+                if (
+                    entity.type == "text_mention"
+                    and entity.user
+                    and entity.user.id == _bot_id
+                ):
+                    return True
+
+    return False
 
 
 async def should_respond_in_chat(message: types.Message) -> bool:
@@ -115,55 +138,10 @@ async def should_respond_in_chat(message: types.Message) -> bool:
     if is_private_chat(message):
         return True
 
-    # Получаем информацию о боте
-    bot_info = await bot.get_me()
-    bot_username = bot_info.username
+    if _bot_id is None:
+        await load_bot_identity()
 
-    # Проверяем, является ли сообщение ответом на сообщение бота
-    if (
-        message.reply_to_message
-        and message.reply_to_message.from_user
-        and message.reply_to_message.from_user.is_bot
-        and message.reply_to_message.from_user.id == bot_info.id
-    ):
-        return True
-
-    # Проверяем упоминание бота в тексте
-    if message.text and f"@{bot_username}" in message.text:
-        return True
-
-    # Проверяем упоминание через entities
-    if message.entities:
-        for entity in message.entities:
-            if entity.type == "mention":
-                # Извлекаем упомянутое имя
-                mentioned = message.text[entity.offset : entity.offset + entity.length]
-                if mentioned == f"@{bot_username}":
-                    return True
-            elif entity.type == "text_mention":
-                # Прямое упоминание пользователя (может быть и ботом)
-                if entity.user and entity.user.id == bot_info.id:
-                    return True
-
-    # Проверяем упоминание в caption (для фото/видео)
-    if message.caption:
-        if f"@{bot_username}" in message.caption:
-            return True
-
-        # Проверяем entities в caption
-        if message.caption_entities:
-            for entity in message.caption_entities:
-                if entity.type == "mention":
-                    mentioned = message.caption[
-                        entity.offset : entity.offset + entity.length
-                    ]
-                    if mentioned == f"@{bot_username}":
-                        return True
-                elif entity.type == "text_mention":
-                    if entity.user and entity.user.id == bot_info.id:
-                        return True
-
-    return False
+    return is_bot_addressed(message)
 
 
 def parse_telegram_error(error_message: str) -> tuple[str | None, int | None]:
@@ -181,8 +159,6 @@ def parse_telegram_error(error_message: str) -> tuple[str | None, int | None]:
     Returns:
         Кортеж (символ, byte_offset) или (None, None) если не удалось распарсить
     """
-    import re
-    
     # Маппинг типов entity на символы markdown
     entity_to_char = {
         'underline': '__',
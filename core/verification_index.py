@@ -0,0 +1,93 @@
+"""
+Индекс верификации в памяти для проверки подписки без обращения к БД.
+"""
+
+
+class VerificationIndex:
+    """
+    Копия в памяти данных, которые нужны SubscriptionMiddleware на каждое сообщение.
+
+    Хранит:
+    - known_ids: ID всех бесед из conversations (пользователи и чаты)
+    - unsubscribed_ids: ID бесед с subscription_verified = 0
+    - verified_chats: ID чатов из chat_verifications
+
+    Загружается при старте (см. database.load_verification_index) и обновляется
+    всеми функциями записи в core/database.py, поэтому изменения, сделанные
+    в обход бота (например, scripts/add_user.sh), видны только после перезапуска.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.known_ids: set[int] = set()
+        self.unsubscribed_ids: set[int] = set()
+        self.verified_chats: set[int] = set()
+
+    def replace(
+        self,
+        statuses: dict[int, int | None],
+        verified_chats: set[int],
+    ):
+        """
+        Полностью заменяет содержимое индекса.
+
+        Args:
+            statuses: Словарь {id беседы: subscription_verified}
+            verified_chats: Множество ID верифицированных чатов
+        """
+        self.known_ids = set(statuses)
+        self.unsubscribed_ids = {
+            conversation_id
+            for conversation_id, status in statuses.items()
+            if status == 0
+        }
+        self.verified_chats = set(verified_chats)
+        self.loaded = True
+
+    def conversation_exists(self, conversation_id: int) -> bool:
+        """Проверяет, есть ли беседа в БД."""
+        return conversation_id in self.known_ids
+
+    def is_unsubscribed(self, conversation_id: int) -> bool:
+        """Проверяет, что у беседы subscription_verified = 0."""
+        return conversation_id in self.unsubscribed_ids
+
+    def is_chat_verified(self, chat_id: int) -> bool:
+        """Проверяет, верифицирован ли чат."""
+        return chat_id in self.verified_chats
+
+    def set_status(self, conversation_id: int, subscription_verified: int | None):
+        """
+        Отмечает беседу как существующую и обновляет ее статус подписки.
+
+        Args:
+            conversation_id: ID беседы
+            subscription_verified: Статус подписки (NULL/0/1)
+        """
+        self.known_ids.add(conversation_id)
+        if subscription_verified == 0:
+            self.unsubscribed_ids.add(conversation_id)
+        else:
+            self.unsubscribed_ids.discard(conversation_id)
+
+    def remove_conversation(self, conversation_id: int):
+        """Удаляет беседу из индекса."""
+        self.known_ids.discard(conversation_id)
+        self.unsubscribed_ids.discard(conversation_id)
+
+    def set_chat_verified(self, chat_id: int, verified: bool):
+        """
+        Обновляет статус верификации чата.
+
+        Args:
+            chat_id: ID чата
+            verified: True если чат верифицирован
+        """
+        if verified:
+            self.verified_chats.add(chat_id)
+        else:
+            self.verified_chats.discard(chat_id)
+
+
+# Глобальный экземпляр индекса
+verification_index = VerificationIndex()
@@ -13,11 +13,21 @@ from aiogram.types import BufferedInputFile, ReplyKeyboardRemove
 
 from core.bot_instance import bot, dp
 from core.config import ADMIN_CHAT, MESSAGES, logger
-from core.database import Conversation
+from core.database import ID_CHUNK_SIZE, Conversation, get_db_stats
 from core.filters import UserIsAdmin
 from core.states import AdminDispatch, AdminDispatchAll
-from services.stats_service import generate_user_stats, get_top_active_users
-from services.subscription_service import is_user_subscribed_to_all
+from services import vision_cache
+from services.maintenance_service import format_db_report, get_last_run
+from services.purge_service import schedule_purge
+from services.stats_service import (
+    generate_user_stats,
+    get_top_active_users,
+    get_total_users_count,
+)
+from services.subscription_service import (
+    sweep_chat_verifications,
+    sweep_user_subscriptions,
+)
 
 
 @dp.message(AdminDispatch.input_text)
@@ -67,25 +77,31 @@ async def cmd_dispatch_all_input_text(message: types.Message, state: FSMContext)
     from aiogram.exceptions import TelegramForbiddenError
 
     try:
-        all_ids = await Conversation.get_ids_from_table()
         success_dispatch = 0
-        blocked_users = 0
+        # Заблокировавшие бота удаляются из БД фоновыми задачами пачками
+        # по ID_CHUNK_SIZE, не задерживая рассылку
+        blocked_ids = []
+        purges = []
 
-        for user_id in all_ids:
+        async for user_id in Conversation.iter_ids():
             try:
                 await bot.send_message(user_id, message.text)
                 success_dispatch += 1
             except TelegramForbiddenError:
-                # Пользователь заблокировал бота - удаляем из БД
-                conversation = Conversation(user_id)
-                await conversation.delete_from_db()
-                blocked_users += 1
-                logger.info(f"USER{user_id} заблокировал бота, удален из БД")
+                blocked_ids.append(user_id)
+                logger.info(f"USER{user_id} заблокировал бота, будет удален из БД")
+                if len(blocked_ids) >= ID_CHUNK_SIZE:
+                    purges.append(schedule_purge(blocked_ids, "Рассылка"))
+                    blocked_ids = []
             except Exception as e:
                 # Другие ошибки - просто логируем и продолжаем
                 logger.warning(f"Не удалось отправить сообщение USER{user_id}: {e}")
                 continue
 
+        if blocked_ids:
+            purges.append(schedule_purge(blocked_ids, "Рассылка"))
+        blocked_users = sum(await asyncio.gather(*purges))
+
         result_msg = f"Сообщение отправлено {success_dispatch} пользователям"
         if blocked_users > 0:
             result_msg += f"\nУдалено заблокировавших бота: {blocked_users}"
@@ -243,6 +259,30 @@ async def cmd_stats(message: types.Message):
                     f"❌ Ошибка при сборе топа пользователей: {top_error}"
                 )
 
+        # Статистика кэша описаний изображений (только если запрос по всем пользователям)
+        if not user_id:
+            try:
+                cache_stats = await vision_cache.get_stats()
+                lookups = (
+                    cache_stats["file_hits"]
+                    + cache_stats["hash_hits"]
+                    + cache_stats["misses"]
+                )
+                await message.answer(
+                    f"🖼 Кэш описаний изображений:\n\n"
+                    f"  📦 Записей: {cache_stats['entries']}\n"
+                    f"  💰 Сэкономлено запросов к vision модели: {cache_stats['saved_calls']}\n\n"
+                    f"С момента запуска ({lookups} изображений):\n"
+                    f"  🎯 Попаданий: {cache_stats['hit_rate']:.0%} "
+                    f"(по file_unique_id: {cache_stats['file_hits']}, "
+                    f"по хэшу: {cache_stats['hash_hits']})"
+                )
+            except Exception as cache_error:
+                logger.error(
+                    f"Ошибка при получении статистики кэша: {cache_error}",
+                    exc_info=True,
+                )
+
         # Проверка подписок пользователей и чатов (только если запрос по всем пользователям)
         if not user_id:
             sub_status_msg = await message.answer(
@@ -250,108 +290,19 @@ async def cmd_stats(message: types.Message):
             )
 
             try:
-                import aiosqlite
-
-                from core.database import DATABASE_NAME
-                all_user_ids = await Conversation.get_ids_from_table()
-                # Фильтруем только личных пользователей (положительные ID)
-                user_ids = [uid for uid in all_user_ids if uid > 0]
-
-                subscribed_count = 0
-                not_subscribed_count = 0
-                unsubscribed_count = 0  # Отписавшиеся (были подписаны, но теперь нет)
-
-                # ========== ПРОВЕРКА ЛИЧНЫХ ПОЛЬЗОВАТЕЛЕЙ ==========
-                for uid in user_ids:
-                    try:
-                        conversation = Conversation(uid)
-                        await conversation.get_from_db()
-
-                        # Сохраняем старый статус для определения отписавшихся
-                        old_status = conversation.subscription_verified
-
-                        # Проверяем подписку для ВСЕХ пользователей
-                        is_subscribed = await is_user_subscribed_to_all(bot, uid)
-
-                        # Обновляем статус в БД
-                        new_status = 1 if is_subscribed else 0
-
-                        # Обновляем счетчики
-                        if is_subscribed:
-                            subscribed_count += 1
-                        else:
-                            not_subscribed_count += 1
-                            # Проверяем, отписался ли пользователь
-                            if old_status == 1:
-                                unsubscribed_count += 1
-                                logger.info(f"USER{uid}: отписался от канала")
-
-                        # Обновляем в БД
-                        conversation.subscription_verified = new_status
-                        await conversation.update_in_db()
-
-                        # Логируем если статус изменился
-                        if old_status != new_status:
-                            logger.info(
-                                f"USER{uid}: статус подписки обновлен с {old_status} на {new_status}"
-                            )
-
-                        # Небольшая задержка между проверками
-                        await asyncio.sleep(0.05)
-
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка при проверке подписки USER{uid}: {e}",
-                            exc_info=True,
-                        )
-                        continue
+                # Проверяем актуальный статус в Telegram, минуя кэш членства
+                user_stats = await sweep_user_subscriptions(bot, use_cache=False)
+                chat_stats = await sweep_chat_verifications(bot, use_cache=False)
 
-                # ========== ПРОВЕРКА ГРУППОВЫХ ЧАТОВ ==========
-                from core.database import ChatVerification
-
-                async with aiosqlite.connect(DATABASE_NAME) as db:
-                    cursor = await db.execute(
-                        "SELECT chat_id, verified_by_user_id, user_name FROM chat_verifications"
-                    )
-                    chat_verifications = await cursor.fetchall()
-
-                chat_subscribed_count = 0
-                chat_not_subscribed_count = 0
-
-                for chat_id, verifier_user_id, verifier_name in chat_verifications:
-                    try:
-                        # Проверяем подписку пользователя-верификатора
-                        is_subscribed = await is_user_subscribed_to_all(
-                            bot, verifier_user_id
-                        )
-
-                        if is_subscribed:
-                            chat_subscribed_count += 1
-                            logger.debug(
-                                f"CHAT{chat_id}: верификатор {verifier_name} подписан"
-                            )
-                        else:
-                            chat_not_subscribed_count += 1
-                            # Верификатор отписался - удаляем верификацию чата
-                            logger.warning(
-                                f"CHAT{chat_id}: верификатор {verifier_name} (ID: {verifier_user_id}) "
-                                f"отписался от каналов. Удаляем верификацию чата."
-                            )
-                            chat_verification = ChatVerification(chat_id)
-                            await chat_verification.delete_from_db()
-
-                        # Небольшая задержка между проверками
-                        await asyncio.sleep(0.05)
-
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка при проверке верификации CHAT{chat_id}: {e}",
-                            exc_info=True,
-                        )
-                        continue
+                subscribed_count = user_stats["subscribed"]
+                not_subscribed_count = user_stats["not_subscribed"]
+                unsubscribed_count = user_stats["unsubscribed"]
+                chat_subscribed_count = chat_stats["verified"]
+                chat_not_subscribed_count = chat_stats["removed"]
 
                 # Формируем отчет по подпискам
-                total_checked = len(user_ids) + len(chat_verifications)
+                total_checked = user_stats["checked"] + chat_stats["checked"]
+                total_records = await get_total_users_count()
                 total_subscribed = subscribed_count + chat_subscribed_count
                 total_not_subscribed = not_subscribed_count + chat_not_subscribed_count
 
@@ -367,14 +318,14 @@ async def cmd_stats(message: types.Message):
                     f"📊 Итого:\n"
                     f"  ✅ Подписаны/верифицированы: {total_subscribed}\n"
                     f"  ❌ Не подписаны: {total_not_subscribed}\n"
-                    f"  📋 Всего проверено: {total_checked} (записей в БД: {len(all_user_ids)})"
+                    f"  📋 Всего проверено: {total_checked} (записей в БД: {total_records})"
                 )
 
                 await sub_status_msg.edit_text(subscription_report)
                 logger.info(
                     f"Проверка подписок завершена: "
-                    f"пользователей подписано {subscribed_count}/{len(user_ids)}, "
-                    f"чатов верифицировано {chat_subscribed_count}/{len(chat_verifications)}, "
+                    f"пользователей подписано {subscribed_count}/{user_stats['checked']}, "
+                    f"чатов верифицировано {chat_subscribed_count}/{chat_stats['checked']}, "
                     f"всего проверено {total_checked}"
                 )
 
@@ -472,3 +423,20 @@ async def cmd_referral_stats(message: types.Message):
 
         with contextlib.suppress(Exception):
             await bot.send_message(ADMIN_CHAT, error_msg)
+
+
+@dp.message(UserIsAdmin(), Command("db_stats"))
+async def cmd_db_stats(message: types.Message):
+    """
+    Команда /db_stats - размер БД, свободные страницы и последнее обслуживание.
+    Доступна только администратору.
+    """
+    logger.info(f"Команда /db_stats получена от администратора {message.chat.id}")
+
+    try:
+        report = format_db_report(await get_db_stats(), get_last_run())
+        await message.answer(report)
+    except Exception as e:
+        error_msg = f"❌ Ошибка при получении статистики БД: {e}"
+        logger.error(error_msg, exc_info=True)
+        await message.answer(error_msg)
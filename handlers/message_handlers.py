@@ -8,20 +8,28 @@ from aiogram import F, types
 from aiogram.exceptions import TelegramForbiddenError
 
 from core.bot_instance import bot, dp
-from core.config import ADMIN_CHAT, MESSAGES, logger
+from core.config import ADMIN_CHAT, MESSAGES, VISION_MAX_EDGE, logger
 from core.database import Conversation
 from core.utils import (
-    forward_to_debug,
     keep_typing,
     send_message_with_fallback,
     should_respond_in_chat,
 )
+from services import vision_cache
+from services.debug_mirror import forward_to_debug
 from services.llm_service import (
     get_llm_response,
     process_user_image,
     process_user_video,
     save_to_context_and_format,
 )
+from services.media_service import (
+    MAX_IMAGE_SIZE,
+    MAX_VIDEO_SIZE,
+    MediaTooLargeError,
+    check_video_limits,
+    download_media,
+)
 from services.message_buffer import message_buffer
 
 
@@ -59,7 +67,7 @@ async def handle_text_message(message: types.Message):
         return
 
     logger.info(f"USER{message.chat.id}TOLLM:{message.text}")
-    await forward_to_debug(message.chat.id, message.message_id)
+    forward_to_debug(message.chat.id, message.message_id)
 
     # Обновляем имя пользователя/чата в базе данных (если изменилось)
     conversation = Conversation(message.chat.id)
@@ -180,7 +188,7 @@ async def handle_text_message(message: types.Message):
                                 chat_id=message.chat.id,
                                 text=chunk,
                             )
-                            await forward_to_debug(
+                            forward_to_debug(
                                 message.chat.id, generated_message.message_id
                             )
                         except TelegramForbiddenError:
@@ -233,7 +241,7 @@ async def handle_photo_message(message: types.Message):
         return
 
     logger.info(f"USER{message.chat.id} отправил изображение")
-    await forward_to_debug(message.chat.id, message.message_id)
+    forward_to_debug(message.chat.id, message.message_id)
 
     # Получаем conversation из БД (имя не обновляем для медиа-сообщений)
     conversation = Conversation(message.chat.id)
@@ -250,19 +258,41 @@ async def handle_photo_message(message: types.Message):
     typing_task = asyncio.create_task(keep_typing(message.chat.id))
 
     try:
-        # Получаем самое большое фото (последнее в списке)
-        photo = message.photo[-1]
+        # Берем самый маленький размер, которого хватает для vision модели
+        # (размеры идут по возрастанию), иначе самый большой
+        photo = next(
+            (
+                size
+                for size in message.photo
+                if max(size.width, size.height) >= VISION_MAX_EDGE
+            ),
+            message.photo[-1],
+        )
 
-        # Скачиваем файл
-        file = await bot.get_file(photo.file_id)
-        image_bytes = await bot.download_file(file.file_path)
+        # Если это изображение уже описывалось, не скачиваем его
+        image_description = await vision_cache.lookup_by_file_id(photo.file_unique_id)
+        image_bytes = None
+        if image_description is None:
+            try:
+                image_bytes = await download_media(bot, photo.file_id, MAX_IMAGE_SIZE)
+            except MediaTooLargeError as e:
+                logger.warning(f"USER{message.chat.id} - изображение отклонено: {e}")
+                await message.answer(
+                    f"Прости, не могу обработать это изображение: {e}."
+                )
+                return
 
         # Определяем MIME-тип (Telegram обычно отправляет в JPEG)
         image_mime_type = "image/jpeg"
 
         # Обрабатываем изображение через vision модель и LLM
         converted_response = await process_user_image(
-            message.chat.id, image_bytes.read(), image_mime_type, user_name_prefix
+            message.chat.id,
+            image_bytes,
+            image_mime_type,
+            user_name_prefix,
+            file_unique_id=photo.file_unique_id,
+            image_description=image_description,
         )
 
         if converted_response is None:
@@ -281,7 +311,7 @@ async def handle_photo_message(message: types.Message):
                     chat_id=message.chat.id,
                     text=chunk,
                 )
-                await forward_to_debug(message.chat.id, generated_message.message_id)
+                forward_to_debug(message.chat.id, generated_message.message_id)
             except TelegramForbiddenError:
                 conversation = Conversation(message.chat.id)
                 await conversation.get_from_db()
@@ -312,7 +342,7 @@ async def handle_video_message(message: types.Message):
     logger.info(f"USER{message.chat.id} отправил видео (тип: {message.content_type})")
 
     # Пересылаем в чат админов
-    await forward_to_debug(message.chat.id, message.message_id)
+    forward_to_debug(message.chat.id, message.message_id)
 
     # Получаем conversation из БД (имя не обновляем для медиа-сообщений)
     conversation = Conversation(message.chat.id)
@@ -339,16 +369,31 @@ async def handle_video_message(message: types.Message):
             )
             return
 
-        # Скачиваем файл
-        file = await bot.get_file(video.file_id)
-        video_bytes = await bot.download_file(file.file_path)
-
         # Получаем длительность видео (если доступна)
         video_duration = getattr(video, "duration", None)
 
+        # Отклоняем слишком большие и длинные видео до скачивания
+        reject_reason = check_video_limits(
+            getattr(video, "file_size", None), video_duration
+        )
+        if reject_reason:
+            logger.warning(f"USER{message.chat.id} - видео отклонено: {reject_reason}")
+            await message.answer(
+                f"Прости, не могу обработать это видео: {reject_reason}."
+            )
+            return
+
+        # Скачиваем файл в память (без лишних копий)
+        try:
+            video_bytes = await download_media(bot, video.file_id, MAX_VIDEO_SIZE)
+        except MediaTooLargeError as e:
+            logger.warning(f"USER{message.chat.id} - видео отклонено: {e}")
+            await message.answer(f"Прости, не могу обработать это видео: {e}.")
+            return
+
         # Обрабатываем видео через vision модель и LLM
         converted_response = await process_user_video(
-            message.chat.id, video_bytes.read(), video_duration, user_name_prefix
+            message.chat.id, video_bytes, video_duration, user_name_prefix
         )
 
         if converted_response is None:
@@ -366,7 +411,7 @@ async def handle_video_message(message: types.Message):
                     chat_id=message.chat.id,
                     text=chunk,
                 )
-                await forward_to_debug(message.chat.id, generated_message.message_id)
+                forward_to_debug(message.chat.id, generated_message.message_id)
             except TelegramForbiddenError:
                 conversation = Conversation(message.chat.id)
                 await conversation.get_from_db()
@@ -12,7 +12,12 @@ from core.bot_instance import bot, dp
 from core.config import MESSAGES, REQUIRED_CHANNELS, logger
 from core.database import ChatVerification, Conversation
 from core.utils import is_private_chat
-from services.subscription_service import is_user_subscribed_to_all
+from services.subscription_service import (
+    SUBSCRIBED_STATUSES,
+    apply_membership_change,
+    is_user_subscribed_to_all,
+    match_required_channel,
+)
 
 
 def get_subscription_keyboard() -> InlineKeyboardMarkup:
@@ -91,8 +96,8 @@ async def process_subscription_check(callback_query: types.CallbackQuery):
     await callback_query.answer("Проверяю подписку...", show_alert=False)
 
     try:
-        # Проверяем подписку
-        is_subscribed = await is_user_subscribed_to_all(bot, user_id)
+        # Проверяем подписку (минуя кэш - пользователь мог только что подписаться)
+        is_subscribed = await is_user_subscribed_to_all(bot, user_id, use_cache=False)
 
         if is_subscribed:
             # Пользователь подписан на все каналы
@@ -177,3 +182,38 @@ async def process_subscription_check(callback_query: types.CallbackQuery):
             "⚠️ Произошла ошибка при проверке подписки. Попробуйте позже.",
             show_alert=True,
         )
+
+
+@dp.chat_member()
+async def process_channel_member_update(event: types.ChatMemberUpdated):
+    """
+    Обработчик событий chat_member в обязательных каналах.
+
+    Telegram присылает их, когда бот - администратор канала. Позволяет
+    обновлять subscription_verified и chat_verifications сразу при подписке
+    или отписке, без опроса get_chat_member.
+    """
+    channel = match_required_channel(event.chat.id, event.chat.username)
+    if channel is None:
+        return
+
+    user_id = event.new_chat_member.user.id
+    was_subscribed = event.old_chat_member.status in SUBSCRIBED_STATUSES
+    subscribed = event.new_chat_member.status in SUBSCRIBED_STATUSES
+
+    if was_subscribed == subscribed:
+        # Например, смена прав администратора - членство не изменилось
+        return
+
+    logger.debug(
+        f"USER{user_id}: событие chat_member в {channel}: "
+        f"{event.old_chat_member.status} -> {event.new_chat_member.status}"
+    )
+
+    try:
+        await apply_membership_change(bot, channel, user_id, subscribed)
+    except Exception as e:
+        logger.error(
+            f"Ошибка при обработке события chat_member USER{user_id} в {channel}: {e}",
+            exc_info=True,
+        )
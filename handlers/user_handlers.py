@@ -7,12 +7,13 @@ from aiogram.filters.command import Command
 from aiogram.types import ReplyKeyboardRemove
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
-from core.bot_instance import bot, dp
+from core.bot_instance import dp
 from core.config import ADMIN_CHAT, MESSAGES, REQUIRED_CHANNELS, logger
 from core.database import Conversation, delete_chat_data
 from core.filters import OldMessage, UserNotInDB
-from core.utils import forward_to_debug
+from core.utils import get_bot_identity
 from handlers.subscription_handlers import send_subscription_request
+from services.debug_mirror import forward_to_debug
 
 
 @dp.message(OldMessage())
@@ -24,8 +25,8 @@ async def spam(message: types.Message):
 async def bot_added_to_chat(message: types.Message):
     """Обработчик добавления бота в групповой чат."""
     # Проверяем, что бот был добавлен в чат
-    bot_info = await bot.get_me()
-    bot_added = any(member.id == bot_info.id for member in message.new_chat_members)
+    bot_id, bot_username = await get_bot_identity()
+    bot_added = any(member.id == bot_id for member in message.new_chat_members)
 
     if bot_added:
         chat_id = message.chat.id
@@ -39,7 +40,7 @@ async def bot_added_to_chat(message: types.Message):
 
         # Отправляем приветственное сообщение
         welcome_text = MESSAGES["msg_bot_added_to_chat"].format(
-            chat_title=chat_title, bot_username=bot_info.username
+            chat_title=chat_title, bot_username=bot_username
         )
 
         await message.answer(welcome_text)
@@ -54,8 +55,8 @@ async def bot_added_to_chat(message: types.Message):
 async def bot_removed_from_chat(message: types.Message):
     """Обработчик удаления бота из группового чата."""
     # Проверяем, что бот был удален из чата
-    bot_info = await bot.get_me()
-    bot_removed = message.left_chat_member.id == bot_info.id
+    bot_id, _ = await get_bot_identity()
+    bot_removed = message.left_chat_member.id == bot_id
 
     if bot_removed:
         chat_id = message.chat.id
@@ -120,8 +121,8 @@ async def registration(message: types.Message):
 
     # Не пересылаем сообщения из админ-чата в админ-чат
     if message.chat.id != ADMIN_CHAT:
-        await forward_to_debug(message.chat.id, message.message_id)
-        await forward_to_debug(message.chat.id, sent_msg.message_id)
+        forward_to_debug(message.chat.id, message.message_id)
+        forward_to_debug(message.chat.id, sent_msg.message_id)
 
 
 @dp.message(Command("start"))
@@ -142,8 +143,8 @@ async def cmd_start(message: types.Message):
 
     # Не пересылаем сообщения из админ-чата в админ-чат
     if message.chat.id != ADMIN_CHAT:
-        await forward_to_debug(message.chat.id, message.message_id)
-        await forward_to_debug(message.chat.id, sent_msg.message_id)
+        forward_to_debug(message.chat.id, message.message_id)
+        forward_to_debug(message.chat.id, sent_msg.message_id)
 
 
 @dp.message(Command("help"))
@@ -196,8 +197,8 @@ async def cmd_help(message: types.Message):
 
     # Не пересылаем сообщения из админ-чата в админ-чат
     if not is_admin:
-        await forward_to_debug(message.chat.id, message.message_id)
-        await forward_to_debug(message.chat.id, sent_msg.message_id)
+        forward_to_debug(message.chat.id, message.message_id)
+        forward_to_debug(message.chat.id, sent_msg.message_id)
 
 
 @dp.message(Command("forget"))
@@ -216,5 +217,5 @@ async def cmd_forget(message: types.Message):
 
     # Не пересылаем сообщения из админ-чата в админ-чат
     if message.chat.id != ADMIN_CHAT:
-        await forward_to_debug(message.chat.id, message.message_id)
-        await forward_to_debug(message.chat.id, sent_msg.message_id)
+        forward_to_debug(message.chat.id, message.message_id)
+        forward_to_debug(message.chat.id, sent_msg.message_id)
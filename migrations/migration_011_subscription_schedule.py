@@ -0,0 +1,38 @@
+"""
+Миграция 011: расписание проверки подписок.
+
+Добавляет в conversations поле next_check_at (unix-время следующей проверки
+подписки), чтобы фоновая проверка шла равномерно и не начиналась заново
+после перезапуска бота. Также создает индекс для выборки пользователей,
+которых пора проверить. Индекс для поиска последней активности пользователя
+создает миграция 014 (по unix-времени created_at).
+"""
+
+import os
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
+
+
+async def upgrade():
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        cursor = await db.execute("PRAGMA table_info(conversations)")
+        columns = {row[1] for row in await cursor.fetchall()}
+
+        if "next_check_at" not in columns:
+            await db.execute(
+                "ALTER TABLE conversations ADD COLUMN next_check_at INTEGER DEFAULT NULL"
+            )
+
+        await db.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_conversations_next_check_at
+            ON conversations (next_check_at)
+            """
+        )
+        await db.commit()
+
+    return "Добавлено поле next_check_at и индекс для расписания проверок"
@@ -0,0 +1,51 @@
+"""
+Миграция 012: кэш описаний изображений.
+
+Создает таблицу vision_cache для описаний от vision модели, найденных
+по file_unique_id из Telegram или по перцептивному хэшу и размерам
+изображения в том же чате, и индексы для поиска по хэшу и вытеснения
+давно не использованных записей.
+"""
+
+import os
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
+
+
+async def upgrade():
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vision_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_unique_id TEXT UNIQUE,
+                chat_id INTEGER,
+                image_hash INTEGER,
+                width INTEGER,
+                height INTEGER,
+                description TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                last_used_at INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        await db.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_vision_cache_chat_id_image_hash
+            ON vision_cache (chat_id, image_hash)
+            """
+        )
+        await db.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_vision_cache_last_used_at
+            ON vision_cache (last_used_at)
+            """
+        )
+        await db.commit()
+
+    return "Создана таблица vision_cache"
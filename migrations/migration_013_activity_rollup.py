@@ -0,0 +1,65 @@
+"""
+Миграция 013: счетчики активности для статистики.
+
+Создает таблицу activity_rollup (user_id, day, hour, count) - количество
+сообщений пользователей по часам, которое обновляется при каждой записи
+сообщения, и заполняет ее по уже сохраненной истории messages. Строки
+с user_id = 0 хранят сумму по всем беседам. День и час считаются
+в часовом поясе TIMEZONE_OFFSET (timestamp сообщений хранится в UTC).
+Статистика (/stats) читает только эту таблицу, поэтому не зависит от
+объема истории и от удаления старых сообщений по MAX_STORAGE.
+"""
+
+import os
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
+TIMEZONE_OFFSET = int(os.environ.get("TIMEZONE_OFFSET", "3"))
+
+
+async def upgrade():
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS activity_rollup (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day, hour)
+            ) WITHOUT ROWID
+            """
+        )
+        # Переносим сохраненную историю: счетчики бесед и общий счетчик
+        # (user_id = 0); сообщения с некорректным timestamp пропускаются,
+        # как и раньше при построении графиков
+        rows = 0
+        for user_column, group_by in (("user_id", "user_id, "), ("0", "")):
+            cursor = await db.execute(
+                f"""
+                INSERT INTO activity_rollup (user_id, day, hour, count)
+                SELECT
+                    {user_column},
+                    substr(local_time, 1, 10),
+                    CAST(substr(local_time, 12, 2) AS INTEGER),
+                    COUNT(*)
+                FROM (
+                    SELECT user_id, datetime(timestamp, ?) AS local_time
+                    FROM messages
+                    WHERE role = 'user'
+                        AND timestamp GLOB
+                            '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-2][0-9]:*'
+                )
+                WHERE local_time IS NOT NULL
+                GROUP BY {group_by}substr(local_time, 1, 13)
+                ON CONFLICT (user_id, day, hour) DO UPDATE SET count = excluded.count
+                """,
+                (f"{TIMEZONE_OFFSET:+d} hours",),
+            )
+            rows += cursor.rowcount
+        await db.commit()
+
+    return f"Создана таблица activity_rollup ({rows} записей из истории сообщений)"
@@ -0,0 +1,63 @@
+"""
+Миграция 014: время сообщений в unix-формате.
+
+Добавляет в messages поле created_at (unix-время, INTEGER) рядом с текстовым
+timestamp и заполняет его по истории пачками по CHUNK_SIZE строк, фиксируя
+каждую пачку отдельной транзакцией, чтобы не держать блокировку записи на
+все время заполнения. Сообщения с некорректным timestamp остаются с NULL.
+
+Создает покрывающий индекс messages (user_id, role, created_at) для поиска
+последней активности.
+"""
+
+import os
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
+
+# Количество строк messages, заполняемых одной транзакцией
+CHUNK_SIZE = 10000
+
+
+async def upgrade():
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        cursor = await db.execute("PRAGMA table_info(messages)")
+        columns = {row[1] for row in await cursor.fetchall()}
+
+        if "created_at" not in columns:
+            await db.execute("ALTER TABLE messages ADD COLUMN created_at INTEGER")
+            await db.commit()
+
+        cursor = await db.execute("SELECT MIN(id), MAX(id) FROM messages")
+        min_id, max_id = await cursor.fetchone()
+
+        # timestamp хранится в UTC, strftime('%s') возвращает NULL для
+        # некорректных значений
+        rows = 0
+        if min_id is not None:
+            for start in range(min_id, max_id + 1, CHUNK_SIZE):
+                cursor = await db.execute(
+                    """
+                    UPDATE messages
+                    SET created_at = CAST(strftime('%s', timestamp) AS INTEGER)
+                    WHERE id >= ? AND id < ? AND created_at IS NULL
+                    """,
+                    (start, start + CHUNK_SIZE),
+                )
+                await db.commit()
+                rows += cursor.rowcount
+
+        await db.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_messages_user_id_role_created_at
+            ON messages (user_id, role, created_at)
+            """
+        )
+        await db.commit()
+
+    return (
+        f"Добавлено поле messages.created_at (обработано {rows} сообщений из истории)"
+    )
@@ -0,0 +1,40 @@
+"""
+Миграция 015: сжатие текста сообщений.
+
+Добавляет в messages поле content_codec (0 - текст, 1 - zlib, см.
+core/content_codec.py) и создает таблицу content_dictionaries со словарями
+сжатия. Сохраненные сообщения не меняются: историю можно сжать скриптом
+scripts/train_content_dict.py --compress.
+"""
+
+import os
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
+
+
+async def upgrade():
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        cursor = await db.execute("PRAGMA table_info(messages)")
+        columns = {row[1] for row in await cursor.fetchall()}
+
+        if "content_codec" not in columns:
+            await db.execute(
+                "ALTER TABLE messages ADD COLUMN content_codec INTEGER NOT NULL DEFAULT 0"
+            )
+
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_dictionaries (
+                id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+            """
+        )
+        await db.commit()
+
+    return "Добавлено поле messages.content_codec и таблица content_dictionaries"
@@ -0,0 +1,34 @@
+"""
+Миграция 016: auto_vacuum = INCREMENTAL.
+
+Удаленные сообщения и беседы оставляют в файле БД свободные страницы,
+и без auto_vacuum файл не уменьшается. В режиме INCREMENTAL фоновое
+обслуживание (services/maintenance_service.py) возвращает их в файловую
+систему небольшими шагами через PRAGMA incremental_vacuum.
+
+Для существующей БД режим применяется только полным VACUUM: он
+перестраивает файл (нужно свободное место на диске размером с БД) и
+выполняется один раз при запуске бота, до начала обработки сообщений.
+"""
+
+import os
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+DATABASE_NAME = os.environ.get("DATABASE_NAME", "users.db")
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+async def upgrade():
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] == AUTO_VACUUM_INCREMENTAL:
+            return "auto_vacuum = INCREMENTAL уже включен"
+
+        await db.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        await db.execute("VACUUM")
+
+    return "Включен auto_vacuum = INCREMENTAL (БД перестроена VACUUM)"
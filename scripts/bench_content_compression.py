@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сжатия текста сообщений (messages.content): размер БД без сжатия,
+с zlib и с zlib со словарем, а также время и CPU на выборку контекста
+(Conversation.get_context_for_llm) с распаковкой.
+
+История - синтетические русскоязычные вопросы и ответы в markdown:
+--users бесед по --per-user сообщений (как при MAX_STORAGE). Словарь
+обучается на отдельной выборке ответов (как scripts/train_content_dict.py).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+
+import core.database as database  # noqa: E402
+from core import content_codec  # noqa: E402
+
+QUESTIONS = [
+    "Как настроить {topic}?",
+    "Объясни, пожалуйста, что такое {topic}",
+    "Почему не работает {topic}, если я все сделал по инструкции?",
+    "Что лучше выбрать для {topic}?",
+    "Опиши, что на картинке",
+]
+TOPICS = [
+    "резервное копирование",
+    "домашний роутер",
+    "кредит на квартиру",
+    "рецепт борща",
+    "подготовка к собеседованию",
+    "обучение нейросети",
+    "перевод текста на английский",
+    "ремонт велосипеда",
+    "план тренировок",
+    "налоговый вычет",
+]
+OPENINGS = [
+    "Отличный вопрос! Давайте разберемся по порядку.",
+    "Конечно, помогу. Вот подробный ответ.",
+    "Коротко: это зависит от нескольких факторов, но есть общие правила.",
+    "На изображении видно следующее:",
+]
+SENTENCES = [
+    "Прежде всего стоит обратить внимание на {topic}, потому что от этого зависит результат.",
+    "Если у вас возникнут дополнительные вопросы, не стесняйтесь спрашивать.",
+    "Важно понимать, что {topic} требует времени и регулярной практики.",
+    "В большинстве случаев достаточно выполнить несколько простых шагов.",
+    "Обратите внимание, что настройки могут отличаться в зависимости от версии.",
+    "Например, можно начать с малого и постепенно увеличивать нагрузку.",
+    "Это поможет избежать типичных ошибок и сэкономит время.",
+    "На переднем плане находится человек, который держит в руках {topic}.",
+    "Фон размыт, поэтому основное внимание привлекает центральный объект.",
+    "Рекомендую проверить результат через {number} дней и при необходимости скорректировать план.",
+    "Стоимость обычно составляет от {number} до {number2} рублей.",
+    "Таким образом, {topic} - это не так сложно, как кажется на первый взгляд.",
+]
+ITEMS = [
+    "**Шаг {n}.** Откройте настройки и найдите раздел «{topic}».",
+    "**{n}. Проверьте параметры** - убедитесь, что все значения указаны верно.",
+    "- Сохраните изменения и перезапустите приложение.",
+    "- Сделайте резервную копию перед началом работы.",
+    "- Не забудьте про {topic}: это важный пункт.",
+]
+CLOSINGS = [
+    "Надеюсь, это поможет! Если нужно, могу объяснить подробнее.",
+    "Удачи! Если что-то не получится, напишите, разберемся вместе.",
+    "### Итог\n\nСледуйте этим шагам, и у вас все получится.",
+]
+
+
+def generate_question(rng: random.Random) -> str:
+    return rng.choice(QUESTIONS).format(topic=rng.choice(TOPICS))
+
+
+def generate_reply(rng: random.Random) -> str:
+    """Генерирует ответ LLM: вступление, абзацы, список и заключение."""
+
+    def sentence(template: str, n: int = 0) -> str:
+        number = rng.randint(2, 50)
+        return template.format(
+            topic=rng.choice(TOPICS),
+            number=number,
+            number2=number * rng.randint(2, 10) * 100,
+            n=n,
+        )
+
+    parts = [rng.choice(OPENINGS)]
+    for _ in range(rng.randint(1, 4)):
+        parts.append(
+            " ".join(sentence(rng.choice(SENTENCES)) for _ in range(rng.randint(2, 5)))
+        )
+    if rng.random() < 0.7:
+        parts.append(
+            "\n".join(
+                sentence(rng.choice(ITEMS), n) for n in range(1, rng.randint(3, 7))
+            )
+        )
+    parts.append(rng.choice(CLOSINGS))
+    return "\n\n".join(parts)
+
+
+def create_db(path: str, users: int, per_user: int):
+    """Создает БД со схемой бота и историей бесед без сжатия."""
+    asyncio.run(database.check_db())
+    rng = random.Random(0)
+    db = sqlite3.connect(path)
+    db.executemany(
+        "INSERT INTO conversations (id, name) VALUES (?, ?)",
+        ((user_id, f"user{user_id}") for user_id in range(1, users + 1)),
+    )
+
+    def rows():
+        for user_id in range(1, users + 1):
+            for i in range(per_user):
+                if i % 2 == 0:
+                    yield user_id, "user", generate_question(rng)
+                else:
+                    yield user_id, "assistant", generate_reply(rng)
+
+    db.executemany(
+        """
+        INSERT INTO messages (user_id, role, content, timestamp, created_at)
+        VALUES (?, ?, ?, '2025-01-01 00:00:00', 1735689600)
+        """,
+        rows(),
+    )
+    # Индекс из миграции 014
+    db.execute(
+        "CREATE INDEX idx_messages_user_id_role_created_at "
+        "ON messages (user_id, role, created_at)"
+    )
+    db.commit()
+    db.close()
+
+
+def compress_db(path: str, dictionary: bytes | None, min_size: int):
+    """Сжимает сообщения не короче min_size байт (как train_content_dict.py)."""
+    db = sqlite3.connect(path)
+    if dictionary:
+        db.execute(
+            "INSERT INTO content_dictionaries (id, data, created_at) VALUES (?, ?, 0)",
+            (content_codec.dictionary_id(dictionary), dictionary),
+        )
+    rows = db.execute(
+        "SELECT id, content FROM messages WHERE length(CAST(content AS BLOB)) >= ?",
+        (min_size,),
+    ).fetchall()
+    db.executemany(
+        "UPDATE messages SET content = ?, content_codec = ? WHERE id = ?",
+        [
+            (
+                content_codec.compress(content, dictionary),
+                content_codec.CODEC_ZLIB,
+                message_id,
+            )
+            for message_id, content in rows
+        ],
+    )
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+
+
+async def measure_fetch(path: str, users: int, fetches: int) -> tuple[float, float]:
+    """
+    Returns:
+        (медиана времени выборки контекста в мс, CPU процесса на выборку в мс)
+    """
+    database.DATABASE_NAME = path
+    database._content_dictionaries = None
+    rng = random.Random(1)
+    times = []
+    cpu_started = time.process_time()
+    for _ in range(fetches):
+        conversation = database.Conversation(rng.randint(1, users))
+        started = time.perf_counter()
+        await conversation.get_context_for_llm()
+        times.append((time.perf_counter() - started) * 1000)
+    cpu = (time.process_time() - cpu_started) * 1000 / fetches
+    return statistics.median(times), cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="бесед")
+    parser.add_argument("--per-user", type=int, default=100, help="сообщений в беседе")
+    parser.add_argument("--context", type=int, default=10, help="MAX_CONTEXT")
+    parser.add_argument("--fetches", type=int, default=2000, help="выборок контекста")
+    args = parser.parse_args()
+
+    database.MAX_CONTEXT = args.context
+    min_size = database.CONTENT_COMPRESS_MIN_SIZE
+    rng = random.Random(42)
+    dictionary = content_codec.train_dictionary(
+        generate_reply(rng) for _ in range(2000)
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path = os.path.join(tmp, "plain.db")
+        database.DATABASE_NAME = plain_path
+        create_db(plain_path, args.users, args.per_user)
+        sqlite3.connect(plain_path).execute("VACUUM")
+
+        variants = [("без сжатия", plain_path)]
+        for title, name, variant_dictionary in (
+            ("zlib", "zlib.db", None),
+            ("zlib + словарь", "zlib_dict.db", dictionary),
+        ):
+            path = os.path.join(tmp, name)
+            shutil.copy(plain_path, path)
+            compress_db(path, variant_dictionary, min_size)
+            variants.append((title, path))
+
+        print(
+            f"{args.users} бесед по {args.per_user} сообщений, сжатие от {min_size} "
+            f"байт, словарь {len(dictionary)} байт, контекст {args.context} сообщений\n"
+        )
+        print(f"{'':>16}  {'размер БД':>10}  {'выборка':>9}  {'CPU/выборка':>12}")
+        plain_size = os.path.getsize(plain_path)
+        for title, path in variants:
+            size = os.path.getsize(path)
+            fetch_ms, cpu_ms = asyncio.run(
+                measure_fetch(path, args.users, args.fetches)
+            )
+            print(
+                f"{title:>16}  {size / 2**20:7.1f} МБ  {fetch_ms:6.2f} мс  "
+                f"{cpu_ms:9.2f} мс   ({plain_size / size:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
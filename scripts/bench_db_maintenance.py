@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк освобождения места в БД: полный VACUUM и фоновое обслуживание
+(services/maintenance_service.py: incremental_vacuum шагами и ANALYZE).
+
+БД - временный файл со схемой бота (auto_vacuum = INCREMENTAL): --users
+бесед по --per-user сообщений, у каждой беседы удалена старая половина
+сообщений (как при обрезке по MAX_STORAGE). Во время освобождения места
+фоновая задача каждые --interval-ms мс выбирает контекст случайной беседы
+(Conversation.get_context_for_llm), измеряется время этих запросов.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+
+import aiosqlite  # noqa: E402
+
+import core.database as database  # noqa: E402
+from services import maintenance_service  # noqa: E402
+
+
+def create_db(path: str, users: int, per_user: int):
+    """Создает БД с сообщениями и удаляет старую половину сообщений каждой беседы."""
+    database.DATABASE_NAME = path
+    asyncio.run(database.check_db())
+    rng = random.Random(0)
+    db = sqlite3.connect(path)
+    db.executemany(
+        """
+        INSERT INTO messages (user_id, role, content, timestamp, created_at)
+        VALUES (?, ?, ?, '2025-01-01 00:00:00', 1735689600)
+        """,
+        (
+            (
+                rng.randint(1, users),
+                "user" if i % 2 == 0 else "assistant",
+                "сообщение пользователя " * rng.randint(5, 60),
+            )
+            for i in range(users * per_user)
+        ),
+    )
+    # Индекс из миграции 014
+    db.execute(
+        "CREATE INDEX idx_messages_user_id_role_created_at "
+        "ON messages (user_id, role, created_at)"
+    )
+    db.execute(
+        """
+        DELETE FROM messages WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id ORDER BY id DESC
+                ) AS position
+                FROM messages
+            )
+            WHERE position > ?
+        )
+        """,
+        (per_user // 2,),
+    )
+    db.commit()
+    db.close()
+
+
+async def full_vacuum():
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        await db.execute("VACUUM")
+
+
+async def incremental_maintenance():
+    await maintenance_service.release_free_pages()
+    await database.analyze_db(maintenance_service.ANALYSIS_LIMIT)
+
+
+async def measure(work, users: int, interval: float) -> tuple[float, list[float]]:
+    """
+    Returns:
+        (время work в секундах, время запросов контекста во время work в мс)
+    """
+    rng = random.Random(1)
+    times = []
+    done = asyncio.Event()
+
+    async def foreground():
+        while not done.is_set():
+            conversation = database.Conversation(rng.randint(1, users))
+            started = time.perf_counter()
+            await conversation.get_context_for_llm()
+            times.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(interval)
+
+    reader = asyncio.create_task(foreground())
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await reader
+    return elapsed, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000, help="бесед")
+    parser.add_argument("--per-user", type=int, default=100, help="сообщений в беседе")
+    parser.add_argument(
+        "--interval-ms", type=float, default=5, help="пауза между запросами"
+    )
+    args = parser.parse_args()
+
+    # Паузы в нагрузке нет только из-за записи сообщений, запросы контекста
+    # обслуживание не прерывают
+    database.last_message_at = float("-inf")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.db")
+        create_db(source, args.users, args.per_user)
+        size = os.path.getsize(source)
+        stats = asyncio.run(database.get_db_stats())
+        print(
+            f"{args.users} бесед, удалена половина из {args.per_user} сообщений: "
+            f"{size / 2**20:.1f} МБ, свободных страниц {stats['freelist_count']} "
+            f"из {stats['page_count']}, шаг {maintenance_service.DB_VACUUM_STEP_PAGES}\n"
+        )
+        print(
+            f"{'':>18}  {'время':>7}  {'размер':>9}  {'запрос: медиана / p99 / max':>28}"
+        )
+
+        for title, work in (
+            ("VACUUM", full_vacuum),
+            ("incremental", incremental_maintenance),
+        ):
+            path = os.path.join(tmp, f"{work.__name__}.db")
+            shutil.copy(source, path)
+            database.DATABASE_NAME = path
+            elapsed, times = asyncio.run(
+                measure(work, args.users, args.interval_ms / 1000)
+            )
+            p99 = statistics.quantiles(times, n=100)[98] if len(times) > 1 else times[0]
+            print(
+                f"{title:>18}  {elapsed:5.2f} с  {os.path.getsize(path) / 2**20:6.1f} МБ  "
+                f"{statistics.median(times):8.2f} / {p99:6.2f} / {max(times):7.2f} мс"
+            )
+
+
+if __name__ == "__main__":
+    main()
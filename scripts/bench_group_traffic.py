@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк обработки сообщений в большой группе, не обращенных к боту:
+процессорное время на одно обновление, запросы к БД и к Bot API
+без GroupTrafficMiddleware и с ним.
+
+Обновления проходят через настоящий диспетчер со всеми обработчиками
+(dp.feed_update); Bot API имитируется без сети, БД - временный файл.
+Сценарии: верифицированная группа и группа без верификации
+(при REQUIRED_CHANNELS бот просит подписаться в ответ на сообщения).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+os.environ.setdefault("REQUIRED_CHANNELS", "@bench_channel")
+os.environ["DATABASE_NAME"] = os.path.join(tempfile.mkdtemp(), "bench_group.db")
+
+import aiosqlite  # noqa: E402
+from aiogram import Bot, types  # noqa: E402
+from aiogram.methods import GetMe  # noqa: E402
+
+import core.database as database  # noqa: E402
+from core.bot_instance import bot, dp  # noqa: E402
+from core.database import ChatVerification, Conversation  # noqa: E402
+from core.middlewares import (  # noqa: E402
+    GroupTrafficMiddleware,
+    SubscriptionMiddleware,
+)
+from core.utils import load_bot_identity  # noqa: E402
+
+# Обработчики регистрируются в том же порядке, что и в app.py
+# isort: off
+from handlers import user_handlers  # noqa: E402, F401
+from handlers import subscription_handlers  # noqa: E402, F401
+from handlers import admin_handlers  # noqa: E402, F401
+from handlers import message_handlers  # noqa: E402, F401
+# isort: on
+
+BOT = types.User(id=777, is_bot=True, first_name="Bot", username="TestChatBot")
+WORDS = ["привет", "как", "дела", "что", "нового", "в", "чате", "фото", "видео"]
+VERIFIED_CHAT = -1001
+UNVERIFIED_CHAT = -1002
+
+counters = {"db": 0, "api": 0}
+
+
+async def fake_bot_call(self, method, request_timeout=None):
+    """Имитация Bot API: get_me возвращает бота, остальные запросы считаются."""
+    if isinstance(method, GetMe):
+        return BOT
+    counters["api"] += 1
+    return True
+
+
+def counting_connect(connect):
+    """Оборачивает aiosqlite.connect, чтобы считать запросы к БД."""
+
+    def wrapper(*args, **kwargs):
+        counters["db"] += 1
+        return connect(*args, **kwargs)
+
+    return wrapper
+
+
+def make_updates(chat_id: int, count: int, members: int) -> list[types.Update]:
+    """Создает болтовню участников группы: текст, ответы, фото, стикеры."""
+    rng = random.Random(chat_id)
+    chat = types.Chat(id=chat_id, type="supergroup", title="Большая группа")
+    users = [
+        types.User(id=1000 + i, is_bot=False, first_name=f"user{i}")
+        for i in range(members)
+    ]
+    updates = []
+    for message_id in range(1, count + 1):
+        kwargs = {}
+        roll = rng.random()
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 30)))
+        if roll < 0.15:
+            kwargs["photo"] = [
+                types.PhotoSize(file_id="p", file_unique_id="p", width=1280, height=720)
+            ]
+            kwargs["caption"] = text
+        elif roll < 0.25:
+            kwargs["sticker"] = types.Sticker(
+                file_id="s",
+                file_unique_id="s",
+                type="regular",
+                width=512,
+                height=512,
+                is_animated=False,
+                is_video=False,
+            )
+        else:
+            kwargs["text"] = text
+            if roll < 0.5:
+                kwargs["reply_to_message"] = types.Message(
+                    message_id=message_id - 1,
+                    date=datetime.now(),
+                    chat=chat,
+                    from_user=rng.choice(users),
+                    text="...",
+                )
+        message = types.Message(
+            message_id=message_id,
+            date=datetime.now(),
+            chat=chat,
+            from_user=rng.choice(users),
+            **kwargs,
+        )
+        updates.append(types.Update(update_id=message_id, message=message))
+    return updates
+
+
+async def run_updates(updates: list[types.Update]) -> dict:
+    """Прогоняет обновления через диспетчер и возвращает затраты на одно."""
+    counters.update(db=0, api=0)
+    started = time.process_time()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    cpu = time.process_time() - started
+    return {
+        "cpu_us": cpu / len(updates) * 1e6,
+        "db": counters["db"] / len(updates),
+        "api": counters["api"] / len(updates),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=3000, help="сообщений")
+    parser.add_argument("--members", type=int, default=1000, help="участников")
+    args = parser.parse_args()
+
+    Bot.__call__ = fake_bot_call
+    aiosqlite.connect = counting_connect(aiosqlite.connect)
+
+    await database.check_db()
+    await Conversation(VERIFIED_CHAT, "Верифицированная").save_for_db()
+    await ChatVerification(VERIFIED_CHAT, 1000, "2025-01-01 00:00:00", "U").save_to_db()
+    await Conversation(UNVERIFIED_CHAT, "Без верификации").save_for_db()
+    await database.load_verification_index()
+    await load_bot_identity()
+    dp.message.middleware(SubscriptionMiddleware())
+
+    scenarios = {
+        "верифицированная группа": make_updates(
+            VERIFIED_CHAT, args.messages, args.members
+        ),
+        "группа без верификации": make_updates(
+            UNVERIFIED_CHAT, args.messages, args.members
+        ),
+    }
+
+    results = {}
+    for name, updates in scenarios.items():
+        results[name] = {"без middleware": await run_updates(updates)}
+    dp.message.outer_middleware(GroupTrafficMiddleware())
+    for name, updates in scenarios.items():
+        results[name]["с middleware"] = await run_updates(updates)
+
+    print(
+        f"{args.messages} сообщений от {args.members} участников, "
+        f"ни одно не обращено к боту\n"
+    )
+    for name, variants in results.items():
+        print(name)
+        for variant, result in variants.items():
+            print(
+                f"  {variant:>15}: {result['cpu_us']:7.1f} мкс CPU на обновление, "
+                f"БД {result['db']:.2f}, Bot API {result['api']:.2f} на обновление"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк отбора сообщений в групповых чатах (should_respond_in_chat):
+прежняя версия с запросом get_me на каждое сообщение и поиском упоминаний
+по entities и текущая версия с данными бота, загруженными при запуске,
+и заранее скомпилированным поиском упоминания.
+
+get_me имитируется без сети; задержку Bot API можно задать --api-latency-ms.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from aiogram import types
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+
+from core import utils  # noqa: E402
+
+BOT = types.User(id=777, is_bot=True, first_name="Bot", username="TestChatBot")
+USERS = [types.User(id=i, is_bot=False, first_name=f"user{i}") for i in range(50)]
+WORDS = ["привет", "как", "дела", "что", "нового", "в", "чате", "фото", "видео"]
+
+
+async def old_should_respond_in_chat(message: types.Message, get_me) -> bool:
+    """Прежняя версия: get_me на каждое сообщение, поиск по entities."""
+    if utils.is_private_chat(message):
+        return True
+
+    bot_info = await get_me()
+    bot_username = bot_info.username
+
+    if (
+        message.reply_to_message
+        and message.reply_to_message.from_user
+        and message.reply_to_message.from_user.is_bot
+        and message.reply_to_message.from_user.id == bot_info.id
+    ):
+        return True
+
+    if message.text and f"@{bot_username}" in message.text:
+        return True
+
+    if message.entities:
+        for entity in message.entities:
+            if entity.type == "mention":
+                mentioned = message.text[entity.offset : entity.offset + entity.length]
+                if mentioned == f"@{bot_username}":
+                    return True
+            elif entity.type == "text_mention":
+                if entity.user and entity.user.id == bot_info.id:
+                    return True
+
+    if message.caption:
+        if f"@{bot_username}" in message.caption:
+            return True
+        if message.caption_entities:
+            for entity in message.caption_entities:
+                if entity.type == "mention":
+                    mentioned = message.caption[
+                        entity.offset : entity.offset + entity.length
+                    ]
+                    if mentioned == f"@{bot_username}":
+                        return True
+                elif entity.type == "text_mention":
+                    if entity.user and entity.user.id == bot_info.id:
+                        return True
+
+    return False
+
+
+def make_messages(count: int, mention_share: float) -> list[types.Message]:
+    """Создает поток сообщений группы: в основном болтовня, немного обращений."""
+    rng = random.Random(0)
+    chat = types.Chat(id=-100, type="supergroup")
+    messages = []
+    for message_id in range(count):
+        author = rng.choice(USERS)
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 30)))
+        kwargs = {}
+        roll = rng.random()
+        if roll < mention_share:
+            text = f"@{BOT.username} {text}"
+        elif roll < 0.3:
+            # Упоминание другого участника
+            other = rng.choice(USERS)
+            text = f"@{other.first_name} {text}"
+            kwargs["entities"] = [
+                types.MessageEntity(
+                    type="mention", offset=0, length=len(other.first_name) + 1
+                )
+            ]
+        elif roll < 0.5:
+            kwargs["reply_to_message"] = types.Message(
+                message_id=message_id - 1,
+                date=datetime.now(),
+                chat=chat,
+                from_user=rng.choice(USERS),
+                text="...",
+            )
+        if rng.random() < 0.2:
+            kwargs["caption"] = text
+            kwargs["photo"] = []
+            if "entities" in kwargs:
+                kwargs["caption_entities"] = kwargs.pop("entities")
+        else:
+            kwargs["text"] = text
+        messages.append(
+            types.Message(
+                message_id=message_id,
+                date=datetime.now(),
+                chat=chat,
+                from_user=author,
+                **kwargs,
+            )
+        )
+    return messages
+
+
+async def measure(check, messages: list[types.Message]) -> tuple[float, int]:
+    """Возвращает (сообщений в секунду, количество обращений к боту)."""
+    started = time.perf_counter()
+    addressed = 0
+    for message in messages:
+        addressed += await check(message)
+    return len(messages) / (time.perf_counter() - started), addressed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000, help="сообщений")
+    parser.add_argument("--mention-share", type=float, default=0.03)
+    parser.add_argument(
+        "--api-latency-ms", type=float, default=0, help="задержка get_me"
+    )
+    args = parser.parse_args()
+
+    async def get_me():
+        if args.api_latency_ms:
+            await asyncio.sleep(args.api_latency_ms / 1000)
+        return BOT
+
+    utils.bot.get_me = get_me
+    messages = make_messages(args.messages, args.mention_share)
+    await utils.load_bot_identity()
+
+    old_rate, old_addressed = await measure(
+        lambda message: old_should_respond_in_chat(message, get_me), messages
+    )
+    new_rate, new_addressed = await measure(utils.should_respond_in_chat, messages)
+    assert old_addressed == new_addressed, (old_addressed, new_addressed)
+
+    print(
+        f"{args.messages} сообщений, обращений к боту: {new_addressed}, "
+        f"задержка get_me {args.api_latency_ms:g} мс\n"
+    )
+    print(f"прежняя версия: {old_rate:>10,.0f} сообщений/с")
+    print(
+        f"текущая версия: {new_rate:>10,.0f} сообщений/с ({new_rate / old_rate:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк времени запуска: импорт приложения (app.py) в отдельном процессе с
+python -X importtime, разбор отчета по пакетам и пиковая память (RSS).
+
+Тяжелые зависимости (matplotlib, OpenCV, NumPy) должны загружаться при
+первом использовании, а не при запуске бота: с --check скрипт завершается
+с ошибкой, если какая-то из них импортируется вместе с app.py.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны импортироваться при запуске бота
+HEAVY_MODULES = ("matplotlib", "cv2", "numpy")
+
+# Строка отчета: "import time: <собственное, мкс> | <с зависимостями, мкс> | <модуль>"
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)$")
+
+RSS_CODE = (
+    "import resource, app; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def child_env() -> dict:
+    """Окружение для импорта app.py без .env, логов в файл и сети."""
+    env = dict(os.environ)
+    env.setdefault("TG_TOKEN", "42:bench")
+    env["FILE_LOG_LEVEL"] = "DISABLED"
+    env["TELEGRAM_LOG_LEVEL"] = "DISABLED"
+    return env
+
+
+def run_importtime() -> list[tuple[int, str]]:
+    """
+    Импортирует app.py с -X importtime.
+
+    Returns:
+        Список (собственное время импорта модуля в мкс, имя модуля)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            entries.append((int(match[1]), match[2]))
+    return entries
+
+
+def measure_rss() -> float:
+    """Возвращает пиковую память процесса после импорта app.py (в МБ)."""
+    result = subprocess.run(
+        [sys.executable, "-c", RSS_CODE],
+        cwd=ROOT,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(result.stdout.strip().splitlines()[-1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="повторов (медиана)")
+    parser.add_argument("--top", type=int, default=15, help="пакетов в отчете")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="ошибка, если тяжелые зависимости импортируются при запуске",
+    )
+    args = parser.parse_args()
+
+    # Первый запуск прогревает кэш байткода и не учитывается
+    run_importtime()
+    runs = [run_importtime() for _ in range(args.runs)]
+    rss = statistics.median(measure_rss() for _ in range(args.runs))
+
+    # Время по пакетам верхнего уровня: сумма собственного времени модулей
+    package_times = defaultdict(list)
+    totals = []
+    for entries in runs:
+        per_package = defaultdict(int)
+        for self_us, name in entries:
+            per_package[name.split(".")[0]] += self_us
+        for package, self_us in per_package.items():
+            package_times[package].append(self_us)
+        totals.append(sum(per_package.values()))
+
+    imported = {name.split(".")[0] for _, name in runs[0]}
+    heavy = [module for module in HEAVY_MODULES if module in imported]
+
+    print(
+        f"import app: {statistics.median(totals) / 1000:.0f} мс (медиана {args.runs})"
+    )
+    print(f"пиковая память: {rss:.0f} МБ\n")
+    print("пакеты (собственное время модулей, мс):")
+    top = sorted(
+        package_times.items(), key=lambda item: statistics.median(item[1]), reverse=True
+    )
+    for package, times in top[: args.top]:
+        print(f"  {package:<28} {statistics.median(times) / 1000:8.1f}")
+
+    print()
+    for module in HEAVY_MODULES:
+        status = "импортируется при запуске" if module in heavy else "не импортируется"
+        print(f"{module}: {status}")
+
+    if args.check and heavy:
+        sys.exit(f"\nПри запуске импортируются тяжелые зависимости: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
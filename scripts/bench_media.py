@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк извлечения кадров из видео: задержка event loop при декодировании
+прямо в loop и через пул потоков services.media_service, а также время
+выбора кадров перемотками (первый/средний/последний) и по сменам сцен.
+
+Генерирует синтетическое видео, запускает извлечение кадров и параллельно
+измеряет, насколько опаздывает периодическая задача в event loop
+(так же опаздывала бы обработка сообщений других пользователей).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.media_service import extract_key_frames, run_in_media_executor  # noqa: E402
+
+TICK = 0.005  # Период задачи-пульса в секундах
+
+
+def make_video(
+    seconds: int, width: int, height: int, fps: int = 30, scene_length: int = 0
+) -> bytes:
+    """
+    Создает синтетическое видео со случайным шумом (плохо сжимается).
+
+    Args:
+        seconds: Длительность в секундах
+        width: Ширина кадра
+        height: Высота кадра
+        fps: Частота кадров
+        scene_length: Длина сцены в секундах: вместо шума каждая сцена
+            залита своим цветом с движущимся прямоугольником (0 - только шум)
+
+    Returns:
+        Байты видео в формате mp4
+    """
+    rng = np.random.default_rng(0)
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video:
+        path = temp_video.name
+    try:
+        writer = cv2.VideoWriter(
+            path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+        )
+        for i in range(seconds * fps):
+            if scene_length:
+                scene = i // (scene_length * fps)
+                frame = np.full((height, width, 3), (scene * 53) % 256, dtype=np.uint8)
+                x = (i * 7) % (width - 100)
+                cv2.rectangle(frame, (x, 100), (x + 100, 200), (0, 0, 255), -1)
+            else:
+                frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+def seek_key_frames(video_bytes: bytes) -> list[int]:
+    """Прежний способ: перемотка к первому, среднему и последнему кадру."""
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video:
+        temp_video.write(video_bytes)
+        path = temp_video.name
+    try:
+        cap = cv2.VideoCapture(path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        extracted = []
+        for idx in (0, total_frames // 2, total_frames - 1):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if ret and cv2.imencode(".jpg", frame)[0]:
+                extracted.append(idx)
+        cap.release()
+        return extracted
+    finally:
+        os.unlink(path)
+
+
+def measure_sampling(video_bytes: bytes):
+    """Сравнивает время выбора кадров перемотками и по сменам сцен."""
+    for name, func in (
+        ("перемотки", seek_key_frames),
+        ("смены сцен", lambda data: extract_key_frames(data)["frame_indices"]),
+    ):
+        start = time.perf_counter()
+        indices = func(video_bytes)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>16}: {elapsed:.2f} с, кадры {indices}")
+
+
+async def measure_lag(work) -> tuple[float, float]:
+    """
+    Выполняет work() и измеряет максимальное опоздание задачи-пульса.
+
+    Returns:
+        (время выполнения work в секундах, максимальная задержка loop в мс)
+    """
+    max_lag = 0.0
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal max_lag
+        while not stop.is_set():
+            expected = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            max_lag = max(max_lag, time.perf_counter() - expected)
+
+    pulse = asyncio.create_task(heartbeat())
+    await asyncio.sleep(TICK * 2)
+
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await pulse
+    return elapsed, max_lag * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=7, help="длительность видео")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--parallel", type=int, default=4, help="одновременных видео")
+    parser.add_argument(
+        "--scene-video",
+        type=int,
+        default=60,
+        help="длительность видео со сменами сцен для сравнения выбора кадров",
+    )
+    args = parser.parse_args()
+
+    print("Генерация видео...")
+    video_bytes = make_video(args.seconds, args.width, args.height)
+    print(f"Размер видео: {len(video_bytes) / 1024 / 1024:.1f} МБ\n")
+
+    async def inline():
+        for _ in range(args.parallel):
+            extract_key_frames(video_bytes)
+
+    async def executor():
+        await asyncio.gather(
+            *(
+                run_in_media_executor(extract_key_frames, video_bytes)
+                for _ in range(args.parallel)
+            )
+        )
+
+    for name, work in (("в event loop", inline), ("в пуле потоков", executor)):
+        elapsed, lag = await measure_lag(work)
+        print(
+            f"{name:>16}: {args.parallel} видео за {elapsed:.2f} с, "
+            f"макс. задержка loop {lag:.1f} мс"
+        )
+
+    print("\nВыбор кадров, видео с шумом:")
+    measure_sampling(video_bytes)
+
+    print(f"\nВыбор кадров, видео {args.scene_video} с со сменой сцены каждые 8 с:")
+    scene_video = make_video(
+        args.scene_video, args.width, args.height, fps=30, scene_length=8
+    )
+    measure_sampling(scene_video)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
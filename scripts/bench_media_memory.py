@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пикового потребления памяти (RSS) при скачивании и обработке медиа:
+прежний путь (BytesIO -> .read() -> временный файл, base64 через json.dumps)
+и путь без лишних копий (download_media -> memoryview -> memfd,
+build_vision_body).
+
+Запускает локальный сервер, имитирующий Bot API (getFile и скачивание файла),
+и выполняет каждый вариант в отдельном процессе.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Добавляем корневую директорию проекта в путь для импорта
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TOKEN = "42:bench"
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса в мегабайтах."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def old_extract(video_bytes: bytes) -> dict:
+    """Прежний способ: копия видео во временный файл на диске."""
+    from services import media_service
+
+    # Без memfd video_file() записывает видео во временный файл, как раньше
+    memfd_create = os.__dict__.pop("memfd_create", None)
+    try:
+        return media_service.extract_key_frames(video_bytes)
+    finally:
+        if memfd_create is not None:
+            os.memfd_create = memfd_create
+
+
+def old_vision_body(image_bytes: bytes) -> bytes:
+    """Прежний способ: строка base64, словарь и json.dumps()."""
+    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+    data = {
+        "model": "model",
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "prompt"},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
+                    },
+                ],
+            }
+        ],
+    }
+    return json.dumps(data).encode()
+
+
+async def run_child(mode: str, base_url: str):
+    """Скачивает видео и картинку и обрабатывает их выбранным способом."""
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from services.llm_client import build_vision_body
+    from services.media_service import (
+        MAX_VIDEO_SIZE,
+        download_media,
+        extract_key_frames,
+    )
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(base_url))
+    bot = Bot(TOKEN, session=session)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+
+    try:
+        if mode == "old":
+            file = await bot.get_file("video")
+            video_bytes = (await bot.download_file(file.file_path)).read()
+            info = old_extract(video_bytes)
+            file = await bot.get_file("image")
+            image_bytes = (await bot.download_file(file.file_path)).read()
+            body = old_vision_body(image_bytes)
+        else:
+            video_bytes = await download_media(bot, "video", MAX_VIDEO_SIZE)
+            info = extract_key_frames(video_bytes)
+            image_bytes = await download_media(bot, "image", MAX_VIDEO_SIZE)
+            body = build_vision_body("model", "prompt", [image_bytes])
+    finally:
+        await session.close()
+
+    print(
+        json.dumps(
+            {
+                "peak_delta_mb": peak_rss_mb() - baseline,
+                "seconds": time.perf_counter() - started,
+                "frames": len(info["frames"]),
+                "body_mb": len(body) / 1024 / 1024,
+            }
+        )
+    )
+
+
+async def serve_and_measure(video_mb: int, image_mb: int):
+    """Запускает сервер Bot API и дочерние процессы для каждого варианта."""
+    import cv2
+    import numpy as np
+    from aiohttp import web
+
+    # Видео со случайным шумом нужного размера
+    rng = np.random.default_rng(0)
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video:
+        path = temp_video.name
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (1280, 720))
+    while os.path.getsize(path) < video_mb * 1024 * 1024:
+        for _ in range(30):
+            writer.write(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8))
+    writer.release()
+    with open(path, "rb") as f:
+        files = {"video": f.read()}
+    os.unlink(path)
+    files["image"] = rng.bytes(image_mb * 1024 * 1024)
+
+    async def get_file(request):
+        data = await request.post()
+        file_id = data["file_id"]
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "file_id": file_id,
+                    "file_unique_id": file_id,
+                    "file_size": len(files[file_id]),
+                    "file_path": file_id,
+                },
+            }
+        )
+
+    async def download(request):
+        return web.Response(body=files[request.match_info["name"]])
+
+    app = web.Application()
+    app.router.add_post(f"/bot{TOKEN}/getFile", get_file)
+    app.router.add_get(f"/file/bot{TOKEN}/{{name}}", download)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    print(
+        f"Видео {len(files['video']) / 1024 / 1024:.1f} МБ, "
+        f"изображение {image_mb} МБ\n"
+    )
+    try:
+        for mode, name in (("old", "прежний путь"), ("new", "без копий")):
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                __file__,
+                "--child",
+                mode,
+                "--base-url",
+                f"http://127.0.0.1:{port}",
+                stdout=subprocess.PIPE,
+            )
+            stdout, _ = await process.communicate()
+            result = json.loads(stdout.decode().strip().splitlines()[-1])
+            print(
+                f"{name:>14}: пик RSS +{result['peak_delta_mb']:.1f} МБ, "
+                f"{result['seconds']:.2f} с, тело запроса {result['body_mb']:.1f} МБ"
+            )
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video-mb", type=int, default=20, help="размер видео")
+    parser.add_argument("--image-mb", type=int, default=5, help="размер изображения")
+    parser.add_argument("--child", choices=["old", "new"], help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_child(args.child, args.base_url))
+    else:
+        asyncio.run(serve_and_measure(args.video_mb, args.image_mb))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк удаления бесед: по одной (отдельное соединение и транзакция
+на каждую беседу, как раньше при рассылке) и пачками через
+Conversation.delete_many (временная таблица ID, транзакция на пачку).
+
+БД - временный файл со схемой бота: --users бесед по --per-user сообщений
+со счетчиками activity_rollup. Удаляются --delete случайных бесед.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+
+import core.database as database  # noqa: E402
+
+
+def create_db(path: str, users: int, per_user: int):
+    """Создает БД со схемой бота, сообщениями и счетчиками активности."""
+    database.DATABASE_NAME = path
+    asyncio.run(database.check_db())
+    db = sqlite3.connect(path)
+    db.executemany(
+        "INSERT INTO conversations (id, name) VALUES (?, ?)",
+        ((user_id, f"user{user_id}") for user_id in range(1, users + 1)),
+    )
+    db.executemany(
+        """
+        INSERT INTO messages (user_id, role, content, timestamp, created_at)
+        VALUES (?, ?, 'сообщение пользователя', '2025-01-01 00:00:00', 1735689600)
+        """,
+        (
+            (user_id, "user" if i % 2 == 0 else "assistant")
+            for user_id in range(1, users + 1)
+            for i in range(per_user)
+        ),
+    )
+    db.executemany(
+        """
+        INSERT INTO activity_rollup (user_id, day, hour, count)
+        VALUES (?, '2025-01-01', 12, ?)
+        """,
+        ((user_id, per_user // 2) for user_id in range(1, users + 1)),
+    )
+    # Индекс из миграции 014
+    db.execute(
+        "CREATE INDEX idx_messages_user_id_role_created_at "
+        "ON messages (user_id, role, created_at)"
+    )
+    db.commit()
+    db.close()
+
+
+async def delete_one_by_one(ids: list[int]):
+    """Удаление по одной беседе (прежний Conversation.delete_from_db)."""
+    for conversation_id in ids:
+        async with aiosqlite.connect(database.DATABASE_NAME) as db:
+            await db.execute(
+                "DELETE FROM messages WHERE user_id = ?", (conversation_id,)
+            )
+            await db.execute(
+                "DELETE FROM activity_rollup WHERE user_id = ?", (conversation_id,)
+            )
+            await db.execute(
+                "DELETE FROM conversations WHERE id = ?", (conversation_id,)
+            )
+            await db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000, help="бесед")
+    parser.add_argument("--per-user", type=int, default=20, help="сообщений в беседе")
+    parser.add_argument("--delete", type=int, default=5000, help="удаляемых бесед")
+    args = parser.parse_args()
+
+    ids = random.Random(0).sample(range(1, args.users + 1), args.delete)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.db")
+        create_db(source, args.users, args.per_user)
+
+        print(
+            f"{args.users} бесед по {args.per_user} сообщений, "
+            f"удаляется {args.delete} (пачка {database.ID_CHUNK_SIZE})\n"
+        )
+        for title, purge in (
+            ("по одной", delete_one_by_one),
+            ("delete_many", database.Conversation.delete_many),
+        ):
+            path = os.path.join(tmp, f"{purge.__name__}.db")
+            shutil.copy(source, path)
+            database.DATABASE_NAME = path
+            started = time.perf_counter()
+            asyncio.run(purge(ids))
+            elapsed = time.perf_counter() - started
+            db = sqlite3.connect(path)
+            left = db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            db.close()
+            print(f"{title:>12}: {elapsed:7.2f} с, осталось бесед: {left}")
+
+
+if __name__ == "__main__":
+    main()
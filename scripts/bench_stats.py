@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк подготовки данных для /stats на синтетической БД:
+прежний способ (все timestamps в Python, strptime и группировка в словарях)
+и чтение счетчиков activity_rollup (get_activity_counts), а также топ
+активных пользователей: прежний запрос на каждого пользователя (N+1)
+и один запрос по activity_rollup с LIMIT (get_top_active_users).
+
+activity_rollup заполняется по истории миграцией 013 (время выводится).
+Средние для графиков сравниваются отдельно: словари {дата: [24 часа]}
+с циклами в Python (как раньше) и массивы NumPy (bincount/unique).
+
+Графики не строятся - измеряется только сбор данных.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import aiosqlite
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migration_013_activity_rollup  # noqa: E402
+from services import stats_service  # noqa: E402
+
+START = datetime(2024, 1, 1)
+
+
+def create_db(path: str, messages: int, users: int, days: int):
+    """Создает БД со схемой бота и случайными сообщениями пользователей."""
+    rng = random.Random(0)
+    db = sqlite3.connect(path)
+    db.execute(
+        """
+        CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """
+    )
+    db.execute(
+        "CREATE TABLE conversations (id INTEGER PRIMARY KEY, name TEXT NOT NULL)"
+    )
+    db.executemany(
+        "INSERT INTO conversations (id, name) VALUES (?, ?)",
+        ((user_id, f"user{user_id}") for user_id in range(1, users + 1)),
+    )
+    content = "сообщение пользователя " * 4
+
+    def rows():
+        for _ in range(messages):
+            moment = START + timedelta(seconds=rng.randrange(days * 86400))
+            role = "user" if rng.random() < 0.5 else "assistant"
+            timestamp = moment.strftime("%Y-%m-%d %H:%M:%S")
+            yield rng.randint(1, users), role, content, timestamp
+
+    db.executemany(
+        "INSERT INTO messages (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+        rows(),
+    )
+    db.commit()
+    db.close()
+
+
+async def old_activity_counts(user_id: int | None = None) -> dict:
+    """Прежний способ: все timestamps в Python и группировка в словарях."""
+    timestamps = []
+    async with aiosqlite.connect(stats_service.DATABASE_NAME) as db:
+        if user_id is not None:
+            cursor = await db.execute(
+                "SELECT timestamp FROM messages WHERE user_id = ? "
+                "AND timestamp IS NOT NULL AND role = 'user'",
+                (user_id,),
+            )
+        else:
+            cursor = await db.execute(
+                "SELECT timestamp FROM messages "
+                "WHERE timestamp IS NOT NULL AND role = 'user'"
+            )
+        for (value,) in await cursor.fetchall():
+            timestamps.append(datetime.strptime(value, "%Y-%m-%d %H:%M:%S"))
+
+    date_hour_counts = defaultdict(lambda: defaultdict(int))
+    for dt in timestamps:
+        date_hour_counts[dt.date()][dt.hour] += 1
+    week_weekday_counts = defaultdict(lambda: defaultdict(int))
+    for dt in timestamps:
+        iso_year, iso_week, _ = dt.isocalendar()
+        week_weekday_counts[(iso_year, iso_week)][dt.weekday()] += 1
+    return date_hour_counts
+
+
+async def old_top_active_users(limit: int = 10) -> list[dict]:
+    """Прежний способ: отдельный запрос timestamps на каждого пользователя."""
+    user_stats = []
+    async with aiosqlite.connect(stats_service.DATABASE_NAME) as db:
+        cursor = await db.execute("SELECT id, name FROM conversations WHERE id > 0")
+        for user_id, username in await cursor.fetchall():
+            cursor = await db.execute(
+                "SELECT timestamp FROM messages "
+                "WHERE user_id = ? AND timestamp IS NOT NULL AND role = 'user'",
+                (user_id,),
+            )
+            messages_by_date = defaultdict(int)
+            for (value,) in await cursor.fetchall():
+                messages_by_date[
+                    datetime.strptime(value, "%Y-%m-%d %H:%M:%S").date()
+                ] += 1
+            if len(messages_by_date) < stats_service.TOP_USERS_MIN_DAYS:
+                continue
+            total_messages = sum(messages_by_date.values())
+            avg_messages_per_day = total_messages / len(messages_by_date)
+            max_messages_per_day = max(messages_by_date.values())
+            user_stats.append(
+                {
+                    "user_id": user_id,
+                    "username": username,
+                    "score": avg_messages_per_day * 0.6 + max_messages_per_day * 0.4,
+                }
+            )
+    user_stats.sort(key=lambda x: x["score"], reverse=True)
+    return user_stats[:limit]
+
+
+async def dict_chart_averages(user_id: int | None = None) -> tuple[list, list]:
+    """Прежний способ: счетчики в словарь {дата: [24 часа]} и средние в циклах."""
+    async with aiosqlite.connect(stats_service.DATABASE_NAME) as db:
+        cursor = await db.execute(
+            "SELECT day, hour, count FROM activity_rollup WHERE user_id = ?",
+            (user_id or 0,),
+        )
+        rows = await cursor.fetchall()
+    day_hour_counts = {}
+    for day, hour, count in rows:
+        day_hour_counts.setdefault(date.fromisoformat(day), [0] * 24)[hour] = count
+
+    num_days = len(day_hour_counts) or 1
+    hourly = [
+        sum(day_data[h] for day_data in day_hour_counts.values()) / num_days
+        for h in range(24)
+    ]
+    week_weekday_counts = defaultdict(lambda: defaultdict(int))
+    for day, day_data in day_hour_counts.items():
+        iso_year, iso_week, _ = day.isocalendar()
+        week_weekday_counts[(iso_year, iso_week)][day.weekday()] += sum(day_data)
+    num_weeks = len(week_weekday_counts) or 1
+    weekly = [
+        sum(week_data.get(d, 0) for week_data in week_weekday_counts.values())
+        / num_weeks
+        for d in range(7)
+    ]
+    return hourly, weekly
+
+
+async def numpy_chart_averages(user_id: int | None = None) -> tuple[list, list]:
+    """Текущий способ: массивы из get_activity_counts и средние NumPy."""
+    days, hours, counts = await stats_service.get_activity_counts(user_id)
+    return (
+        stats_service.hourly_averages(days, hours, counts),
+        stats_service.weekday_averages(days, counts),
+    )
+
+
+async def median_ms(func, *args, repeat: int = 20) -> float:
+    """Возвращает медианное время выполнения в миллисекундах."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+async def measure(func, *args, memory: bool = False) -> str:
+    """
+    Возвращает время выполнения и, если memory=True, пик памяти Python.
+
+    Память измеряется отдельным прогоном: tracemalloc сильно замедляет код.
+    """
+    started = time.perf_counter()
+    await func(*args)
+    result = f"{time.perf_counter() - started:6.2f} с"
+    if memory:
+        tracemalloc.start()
+        await func(*args)
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+        result += f", пик памяти {peak:7.1f} МБ"
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000, help="сообщений")
+    parser.add_argument("--users", type=int, default=1000, help="пользователей")
+    parser.add_argument("--days", type=int, default=365, help="дней истории")
+    parser.add_argument(
+        "--memory", action="store_true", help="измерить пик памяти (медленно)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_stats.db")
+        started = time.perf_counter()
+        create_db(path, args.messages, args.users, args.days)
+        print(
+            f"БД: {args.messages:,} сообщений, {args.users} пользователей, "
+            f"{args.days} дней (создана за {time.perf_counter() - started:.1f} с)\n"
+        )
+        stats_service.DATABASE_NAME = path
+        migration_013_activity_rollup.DATABASE_NAME = path
+        # Прежний способ группирует по UTC, для сверки счетчики тоже в UTC
+        migration_013_activity_rollup.TIMEZONE_OFFSET = 0
+        started = time.perf_counter()
+        print(await migration_013_activity_rollup.upgrade())
+        print(f"(миграция 013 за {time.perf_counter() - started:.1f} с)\n")
+
+        for title, user_id in (("все пользователи", None), ("один пользователь", 1)):
+            old = await measure(old_activity_counts, user_id, memory=args.memory)
+            new = await measure(
+                stats_service.get_activity_counts, user_id, memory=args.memory
+            )
+            print(title)
+            print(f"  прежний способ:  {old}")
+            print(f"  activity_rollup: {new}")
+
+        old = await measure(old_top_active_users, memory=args.memory)
+        new = await measure(stats_service.get_top_active_users, memory=args.memory)
+        old_top = [user["user_id"] for user in await old_top_active_users()]
+        new_top = [
+            user["user_id"] for user in await stats_service.get_top_active_users()
+        ]
+        assert old_top == new_top, (old_top, new_top)
+        print("топ активных пользователей")
+        print(f"  запрос на пользователя: {old}")
+        print(f"  activity_rollup:        {new}")
+
+        print("средние для графиков (медиана 20 запусков)")
+        for title, user_id in (("все пользователи", None), ("один пользователь", 1)):
+            assert await dict_chart_averages(user_id) == await numpy_chart_averages(
+                user_id
+            )
+            old = await median_ms(dict_chart_averages, user_id)
+            new = await median_ms(numpy_chart_averages, user_id)
+            print(f"  {title}: словари {old:6.1f} мс, NumPy {new:6.1f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
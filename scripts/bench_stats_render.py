@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки event loop во время /stats: графики строятся прямо
+в event loop (как раньше) или в пуле процессов, а также повторный /stats
+с графиками из кэша.
+
+Задержка измеряется фоновой задачей, которая просыпается каждые
+--tick-ms миллисекунд и записывает, насколько позже срока она проснулась.
+БД - временный файл со счетчиками activity_rollup за --days дней.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+os.environ["DATABASE_NAME"] = os.path.join(tempfile.mkdtemp(), "bench_render.db")
+
+import aiosqlite  # noqa: E402
+
+import core.database as database  # noqa: E402
+from services import stats_service  # noqa: E402
+
+
+async def fill_rollup(days: int):
+    """Заполняет activity_rollup случайными счетчиками за последние days дней."""
+    rng = random.Random(0)
+    start = date.today() - timedelta(days=days)
+    rows = [
+        (
+            database.ACTIVITY_TOTAL_ID,
+            (start + timedelta(days=day)).isoformat(),
+            hour,
+            rng.randint(0, 500),
+        )
+        for day in range(days)
+        for hour in range(24)
+    ]
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        await db.executemany(
+            "INSERT INTO activity_rollup (user_id, day, hour, count) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        await db.commit()
+
+
+async def measure_lag(work, tick: float) -> tuple[float, float, float]:
+    """
+    Выполняет work() и возвращает (время /stats, макс. и средняя задержка
+    event loop в мс).
+    """
+    delays = []
+    running = True
+
+    async def ticker():
+        while running:
+            expected = time.perf_counter() + tick
+            await asyncio.sleep(tick)
+            delays.append(max(0.0, time.perf_counter() - expected))
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(tick * 2)
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    running = False
+    await ticker_task
+    return elapsed * 1000, max(delays) * 1000, sum(delays) / len(delays) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365, help="дней статистики")
+    parser.add_argument("--tick-ms", type=float, default=5, help="шаг проверки")
+    args = parser.parse_args()
+
+    await database.check_db()
+    await fill_rollup(args.days)
+    tick = args.tick_ms / 1000
+
+    async def inline_render(func, *func_args):
+        # Прежнее поведение: отрисовка синхронно в event loop
+        return func(*func_args)
+
+    async def stats():
+        stats_service._chart_cache.clear()
+        await stats_service.generate_user_stats()
+
+    async def cached_stats():
+        await stats_service.generate_user_stats()
+
+    pool_render = stats_service.run_in_chart_pool
+    scenarios = [
+        ("в event loop", inline_render, stats),
+        ("пул процессов (запуск)", pool_render, stats),
+        ("пул процессов", pool_render, stats),
+        ("из кэша", pool_render, cached_stats),
+    ]
+
+    print(
+        f"/stats за {args.days} дней, проверка event loop каждые {args.tick_ms:g} мс\n"
+    )
+    print(f"{'':>24}  {'/stats, мс':>10}  {'макс. задержка':>14}  {'средняя':>8}")
+    try:
+        for name, render, work in scenarios:
+            stats_service.run_in_chart_pool = render
+            elapsed, max_lag, avg_lag = await measure_lag(work, tick)
+            print(f"{name:>24}  {elapsed:10.0f}  {max_lag:11.1f} мс  {avg_lag:5.1f} мс")
+    finally:
+        stats_service.shutdown_chart_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
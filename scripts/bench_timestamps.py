@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк перехода messages на unix-время (миграция 014): размер БД и время
+запросов до и после.
+
+БД - временный файл со схемой messages до миграции (только текстовый
+timestamp, без индексов). Сравниваются последняя активность
+пользователей (Conversation.get_last_activity, пачками по --batch ID, как
+в фоновой проверке подписок) по MAX(timestamp) со strptime и по
+MAX(created_at), а также подсчет сообщений за последние 30 дней.
+Размер - занятые страницы по таблице и индексам (dbstat) и файл после VACUUM.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+import aiosqlite
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TG_TOKEN", "42:bench")
+
+import core.database as database  # noqa: E402
+from migrations import migration_014_messages_created_at  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def create_db(path: str, messages: int, users: int, days: int):
+    """Создает БД со схемой messages до миграции 014 и случайными сообщениями."""
+    rng = random.Random(0)
+    db = sqlite3.connect(path)
+    db.execute(
+        """
+        CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """
+    )
+    content = "сообщение пользователя " * 4
+
+    def rows():
+        for _ in range(messages):
+            moment = START + timedelta(seconds=rng.randrange(days * 86400))
+            role = "user" if rng.random() < 0.5 else "assistant"
+            timestamp = moment.strftime("%Y-%m-%d %H:%M:%S")
+            yield rng.randint(1, users), role, content, timestamp
+
+    db.executemany(
+        "INSERT INTO messages (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+        rows(),
+    )
+    db.commit()
+    db.close()
+
+
+def db_size(path: str) -> tuple[dict[str, int], int]:
+    """
+    Returns:
+        ({таблица или индекс messages: байт}, размер файла после VACUUM)
+    """
+    db = sqlite3.connect(path)
+    try:
+        sizes = dict(
+            db.execute(
+                """
+                SELECT name, SUM(pgsize) FROM dbstat
+                WHERE name = 'messages' OR name LIKE 'idx_messages_%'
+                GROUP BY name
+                """
+            ).fetchall()
+        )
+    except sqlite3.OperationalError:
+        # SQLite собран без dbstat
+        sizes = {}
+    db.execute("VACUUM")
+    db.close()
+    return sizes, os.path.getsize(path)
+
+
+def print_size(title: str, sizes: dict[str, int], file_size: int, messages: int):
+    print(title)
+    for name, size in sorted(sizes.items()):
+        print(
+            f"  {name:<38} {size / 2**20:7.1f} МБ ({size / messages:5.1f} байт/строку)"
+        )
+    print(f"  {'файл после VACUUM':<38} {file_size / 2**20:7.1f} МБ\n")
+
+
+async def old_last_activity(ids: list[int]) -> dict[int, int]:
+    """Прежний способ: MAX по текстовому timestamp и strptime в Python."""
+    placeholders = ", ".join("?" for _ in ids)
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        cursor = await db.execute(
+            f"""
+            SELECT user_id, MAX(timestamp) FROM messages
+            WHERE user_id IN ({placeholders}) AND role = 'user'
+            GROUP BY user_id
+            """,
+            list(ids),
+        )
+        rows = await cursor.fetchall()
+
+    last_activity = {}
+    for user_id, timestamp in rows:
+        try:
+            dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        except (ValueError, TypeError):
+            continue
+        last_activity[user_id] = int(dt.replace(tzinfo=UTC).timestamp())
+    return last_activity
+
+
+async def count_recent(column: str, since) -> int:
+    """Количество сообщений пользователей не раньше since."""
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        cursor = await db.execute(
+            f"SELECT COUNT(*) FROM messages WHERE role = 'user' AND {column} >= ?",
+            (since,),
+        )
+        return (await cursor.fetchone())[0]
+
+
+async def median_ms(func, *args, repeat: int = 10) -> float:
+    """Возвращает медианное время выполнения в миллисекундах."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000, help="сообщений")
+    parser.add_argument("--users", type=int, default=10_000, help="пользователей")
+    parser.add_argument("--days", type=int, default=365, help="дней истории")
+    parser.add_argument("--batch", type=int, default=500, help="ID в пачке")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_timestamps.db")
+        create_db(path, args.messages, args.users, args.days)
+        database.DATABASE_NAME = path
+        migration_014_messages_created_at.DATABASE_NAME = path
+        print(
+            f"БД: {args.messages:,} сообщений, {args.users} пользователей, "
+            f"{args.days} дней\n"
+        )
+
+        batch = random.Random(1).sample(range(1, args.users + 1), args.batch)
+        since = START + timedelta(days=args.days - 30)
+        old_last = await median_ms(old_last_activity, batch)
+        expected = await old_last_activity(batch)
+        old_recent = await median_ms(
+            count_recent, "timestamp", since.strftime("%Y-%m-%d %H:%M:%S")
+        )
+        print_size("до миграции", *db_size(path), args.messages)
+
+        started = time.perf_counter()
+        print(await migration_014_messages_created_at.upgrade())
+        elapsed = time.perf_counter() - started
+        chunks = -(-args.messages // migration_014_messages_created_at.CHUNK_SIZE)
+        print(
+            f"(миграция 014 за {elapsed:.1f} с, {chunks} транзакций "
+            f"по {migration_014_messages_created_at.CHUNK_SIZE} строк)\n"
+        )
+
+        assert await database.Conversation.get_last_activity(batch) == expected
+        new_last = await median_ms(database.Conversation.get_last_activity, batch)
+        new_recent = await median_ms(count_recent, "created_at", int(since.timestamp()))
+        print_size("после миграции", *db_size(path), args.messages)
+
+        print("запросы (медиана 10 запусков)")
+        print(
+            f"  последняя активность {args.batch} ID: "
+            f"timestamp {old_last:7.1f} мс, created_at {new_last:7.1f} мс"
+        )
+        print(
+            f"  сообщений за 30 дней:        "
+            f"timestamp {old_recent:7.1f} мс, created_at {new_recent:7.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки ответа на видео: кадры описываются последовательно,
+параллельно (VIDEO_VISION_MODE=parallel) или одним запросом (batch).
+
+Если в .env есть LLM_TOKEN, запросы идут в OpenRouter (VISION_MODEL и MODEL),
+иначе задержки сети имитируются параметрами --vision-latency и --llm-latency.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import llm_service  # noqa: E402
+from services.llm_client import LLM_TOKEN  # noqa: E402
+
+
+def make_frames(count: int) -> list[bytes]:
+    """Создает JPEG-кадры 640x360 с разными цветами."""
+    frames = []
+    for i in range(count):
+        image = np.full((360, 640, 3), (i * 70) % 256, dtype=np.uint8)
+        cv2.putText(image, f"frame {i + 1}", (40, 200), 0, 3, (255, 255, 255), 5)
+        frames.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return frames
+
+
+def simulated_api(vision_latency: float, llm_latency: float):
+    """Возвращает заглушки функций llm_client с имитацией задержки сети."""
+
+    async def send_image(image_bytes, image_mime_type="image/jpeg", prompt=""):
+        await asyncio.sleep(vision_latency)
+        return "описание кадра"
+
+    async def send_images(images, image_mime_type="image/jpeg", prompt=""):
+        # Каждая дополнительная картинка немного увеличивает время ответа
+        await asyncio.sleep(vision_latency * (1 + 0.25 * (len(images) - 1)))
+        return "описание кадров"
+
+    async def send_request(prompt):
+        await asyncio.sleep(llm_latency)
+        return "ответ"
+
+    return send_image, send_images, send_request
+
+
+async def sequential(chat_id, frames, labels):
+    """Старое поведение: кадры описываются по одному."""
+    descriptions = []
+    for i, frame_bytes in enumerate(frames, start=1):
+        description = await llm_service.describe_frame(
+            chat_id, i, frame_bytes, labels[i - 1]
+        )
+        if description:
+            descriptions.append(description)
+    return descriptions
+
+
+async def video_reply(mode: str, frames: list[bytes], labels: list[str]) -> float:
+    """Описывает кадры и запрашивает ответ LLM, возвращает время в секундах."""
+    started = time.perf_counter()
+    if mode == "sequential":
+        descriptions = await sequential(0, frames, labels)
+    else:
+        descriptions = await llm_service.describe_video_frames(0, frames, labels, mode)
+    await llm_service.send_request_to_openrouter(
+        [{"role": "user", "content": "Опиши видео:\n\n" + "\n\n".join(descriptions)}]
+    )
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=3, help="количество кадров")
+    parser.add_argument("--runs", type=int, default=3, help="повторов на режим")
+    parser.add_argument("--vision-latency", type=float, default=2.0)
+    parser.add_argument("--llm-latency", type=float, default=3.0)
+    parser.add_argument(
+        "--simulate", action="store_true", help="не ходить в OpenRouter даже с LLM_TOKEN"
+    )
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    labels = [f"кадр {i}" for i in range(1, args.frames + 1)]
+
+    patches = []
+    if args.simulate or not LLM_TOKEN:
+        print(
+            f"Имитация: vision {args.vision_latency}с на запрос, LLM {args.llm_latency}с\n"
+        )
+        send_image, send_images, send_request = simulated_api(
+            args.vision_latency, args.llm_latency
+        )
+        patches = [
+            patch.object(llm_service, "send_image_to_vision_model", send_image),
+            patch.object(llm_service, "send_images_to_vision_model", send_images),
+            patch.object(llm_service, "send_request_to_openrouter", send_request),
+        ]
+    else:
+        print("Запросы к OpenRouter\n")
+
+    for p in patches:
+        p.start()
+    try:
+        for mode in ("sequential", "parallel", "batch"):
+            timings = [
+                await video_reply(mode, frames, labels) for _ in range(args.runs)
+            ]
+            print(
+                f"{mode:>10}: медиана {statistics.median(timings):.2f}с, "
+                f"макс. {max(timings):.2f}с"
+            )
+    finally:
+        for p in patches:
+            p.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк подготовки изображений для vision модели: размер до и после
+уменьшения и перекодирования (VISION_MAX_EDGE, VISION_JPEG_QUALITY)
+и время ответа vision модели для исходного и подготовленного изображения.
+
+Время ответа измеряется, только если в .env есть LLM_TOKEN.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import VISION_JPEG_QUALITY, VISION_MAX_EDGE  # noqa: E402
+from services.llm_client import LLM_TOKEN, send_image_to_vision_model  # noqa: E402
+from services.media_service import prepare_image_for_vision  # noqa: E402
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """Создает похожее на фото изображение (градиент, фигуры, шум) в JPEG 95."""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.dstack([x + 0 * y, y + 0 * x, (x + y) / 2]).astype(np.uint8)
+    for _ in range(30):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(20, height // 4)), color, -1)
+    noise = rng.normal(0, 6, image.shape)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+
+
+async def vision_latency(image_bytes: bytes, runs: int) -> float:
+    """Возвращает медианное время ответа vision модели."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await send_image_to_vision_model(image_bytes)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*", help="пути к изображениям")
+    parser.add_argument("--runs", type=int, default=3, help="запросов к vision модели")
+    args = parser.parse_args()
+
+    if args.images:
+        samples = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                samples.append((os.path.basename(path), f.read()))
+    else:
+        samples = [
+            ("синтетическое 1280x960", make_photo(1280, 960)),
+            ("синтетическое 2560x1920", make_photo(2560, 1920)),
+        ]
+
+    print(f"VISION_MAX_EDGE={VISION_MAX_EDGE}, VISION_JPEG_QUALITY={VISION_JPEG_QUALITY}\n")
+
+    for name, image_bytes in samples:
+        started = time.perf_counter()
+        prepared, _ = prepare_image_for_vision(image_bytes)
+        elapsed = (time.perf_counter() - started) * 1000
+        change = 100 * (len(prepared) / len(image_bytes) - 1)
+        print(
+            f"{name}: {len(image_bytes) // 1024} КБ -> {len(prepared) // 1024} КБ "
+            f"({change:+.0f}%), подготовка {elapsed:.1f} мс"
+        )
+
+        if LLM_TOKEN:
+            original = await vision_latency(image_bytes, args.runs)
+            reduced = await vision_latency(prepared, args.runs)
+            print(f"    vision модель: {original:.2f}с -> {reduced:.2f}с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
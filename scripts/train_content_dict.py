@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Обучение словаря сжатия текста сообщений (messages.content) по истории
+из БД (DATABASE_NAME).
+
+Словарь строится по последним --sample несжатым сообщениям не короче
+CONTENT_COMPRESS_MIN_SIZE байт и оценивается на отложенной пятой части
+выборки (zlib без словаря и со словарем). С --save словарь записывается
+в content_dictionaries и используется ботом для новых сообщений (после
+перезапуска), с --compress дополнительно сжимается сохраненная история.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zlib
+
+import aiosqlite
+
+# Добавляем корневую директорию проекта в путь для импорта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import content_codec, database  # noqa: E402
+
+# Количество строк messages, сжимаемых одной транзакцией
+CHUNK_SIZE = 1000
+
+
+async def load_samples(limit: int, min_size: int) -> list[str]:
+    """Возвращает последние несжатые сообщения не короче min_size байт."""
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        cursor = await db.execute(
+            """
+            SELECT content FROM messages
+            WHERE content_codec = ? AND length(CAST(content AS BLOB)) >= ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (content_codec.CODEC_TEXT, min_size, limit),
+        )
+        return [row[0] for row in await cursor.fetchall()]
+
+
+def evaluate(samples: list[str], dictionary: bytes) -> tuple[int, int, int]:
+    """Возвращает размер образцов: без сжатия, zlib, zlib со словарем."""
+    plain = sum(len(text.encode()) for text in samples)
+    compressed = sum(len(zlib.compress(text.encode())) for text in samples)
+    with_dictionary = sum(
+        len(content_codec.compress(text, dictionary)) for text in samples
+    )
+    return plain, compressed, with_dictionary
+
+
+async def save_dictionary(dictionary: bytes) -> int:
+    """Записывает словарь в content_dictionaries и возвращает его ID."""
+    dict_id = content_codec.dictionary_id(dictionary)
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        await db.execute(
+            """
+            INSERT OR IGNORE INTO content_dictionaries (id, data, created_at)
+            VALUES (?, ?, ?)
+            """,
+            (dict_id, dictionary, int(time.time())),
+        )
+        await db.commit()
+    return dict_id
+
+
+async def compress_history(dictionary: bytes, min_size: int) -> int:
+    """
+    Сжимает сохраненные несжатые сообщения не короче min_size байт пачками
+    по CHUNK_SIZE строк (каждая пачка - отдельная транзакция).
+
+    Returns:
+        Количество сжатых сообщений
+    """
+    compressed = 0
+    async with aiosqlite.connect(database.DATABASE_NAME) as db:
+        cursor = await db.execute("SELECT MIN(id), MAX(id) FROM messages")
+        min_id, max_id = await cursor.fetchone()
+        if min_id is None:
+            return 0
+
+        for start in range(min_id, max_id + 1, CHUNK_SIZE):
+            cursor = await db.execute(
+                """
+                SELECT id, content FROM messages
+                WHERE id >= ? AND id < ? AND content_codec = ?
+                    AND length(CAST(content AS BLOB)) >= ?
+                """,
+                (start, start + CHUNK_SIZE, content_codec.CODEC_TEXT, min_size),
+            )
+            rows = await cursor.fetchall()
+            await db.executemany(
+                "UPDATE messages SET content = ?, content_codec = ? WHERE id = ?",
+                [
+                    (
+                        content_codec.compress(content, dictionary),
+                        content_codec.CODEC_ZLIB,
+                        message_id,
+                    )
+                    for message_id, content in rows
+                ],
+            )
+            await db.commit()
+            compressed += len(rows)
+    return compressed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sample", type=int, default=5000, help="сообщений")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=content_codec.MAX_DICTIONARY_SIZE,
+        help="размер словаря в байтах",
+    )
+    parser.add_argument(
+        "--min-size",
+        type=int,
+        default=database.CONTENT_COMPRESS_MIN_SIZE,
+        help="минимальный размер сжимаемого сообщения в байтах",
+    )
+    parser.add_argument("--save", action="store_true", help="записать словарь в БД")
+    parser.add_argument(
+        "--compress", action="store_true", help="записать словарь и сжать историю"
+    )
+    args = parser.parse_args()
+
+    samples = await load_samples(args.sample, args.min_size)
+    if len(samples) < 5:
+        sys.exit(
+            f"Недостаточно сообщений не короче {args.min_size} байт: {len(samples)}"
+        )
+
+    # Последние сообщения - для оценки, остальные - для обучения
+    holdout = len(samples) // 5
+    dictionary = content_codec.train_dictionary(samples[holdout:], args.size)
+    plain, compressed, with_dictionary = evaluate(samples[:holdout], dictionary)
+    print(
+        f"Словарь {len(dictionary)} байт по {len(samples) - holdout} сообщениям, "
+        f"оценка на {holdout}:"
+    )
+    print(f"  без сжатия:     {plain / 1024:10.1f} КБ")
+    print(f"  zlib:           {compressed / 1024:10.1f} КБ ({plain / compressed:.2f}x)")
+    print(
+        f"  zlib + словарь: {with_dictionary / 1024:10.1f} КБ "
+        f"({plain / with_dictionary:.2f}x)"
+    )
+
+    if args.save or args.compress:
+        dict_id = await save_dictionary(dictionary)
+        print(f"\nСловарь {dict_id} записан в content_dictionaries")
+    if args.compress:
+        started = time.perf_counter()
+        count = await compress_history(dictionary, args.min_size)
+        print(f"Сжато {count} сообщений за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
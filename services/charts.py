@@ -0,0 +1,116 @@
+"""
+Построение графиков статистики (/stats) в PNG.
+
+Функции синхронные и выполняются в отдельном процессе из пула
+stats_service, поэтому используют объектный API matplotlib (Figure)
+без глобального состояния pyplot и получают уже посчитанные средние.
+matplotlib импортируется при первом построении графика, то есть только
+в процессе пула.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Русские названия дней недели
+WEEKDAY_NAMES = {
+    0: "Понедельник",
+    1: "Вторник",
+    2: "Среда",
+    3: "Четверг",
+    4: "Пятница",
+    5: "Суббота",
+    6: "Воскресенье",
+}
+
+
+def _highlight_max(bars, values: list[float], color: str):
+    """Подсвечивает столбцы с максимальным значением."""
+    if values:
+        max_value = max(values)
+        for bar, value in zip(bars, values, strict=True):
+            if value == max_value and value > 0:
+                bar.set_color(color)
+                bar.set_edgecolor("darkred")
+
+
+def _to_png(fig: Figure) -> bytes:
+    """Сохраняет график в PNG."""
+    fig.tight_layout()
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def render_hourly_chart(avg_counts: list[float], user_id: int | None = None) -> bytes:
+    """
+    Строит график средней активности по часам суток.
+
+    Args:
+        avg_counts: Среднее количество сообщений в 0, 1, ..., 23 час.
+        user_id: ID пользователя (для заголовка).
+
+    Returns:
+        PNG изображение графика.
+    """
+    from matplotlib.figure import Figure
+
+    hours = list(range(24))
+    fig = Figure(figsize=(14, 6))
+    ax = fig.subplots()
+    bars = ax.bar(hours, avg_counts, color="skyblue", edgecolor="navy", alpha=0.7)
+    _highlight_max(bars, avg_counts, "orange")
+
+    ax.set_xlabel("Час суток", fontsize=12, weight="bold")
+    ax.set_ylabel("Среднее количество сообщений", fontsize=12, weight="bold")
+
+    if user_id:
+        title = f"Средняя активность пользователя USER{user_id} по часам суток"
+    else:
+        title = "Средняя активность всех пользователей по часам суток"
+    ax.set_title(title, fontsize=14, weight="bold")
+
+    ax.set_xticks(hours)
+    ax.grid(axis="y", alpha=0.3, linestyle="--")
+    return _to_png(fig)
+
+
+def render_weekly_chart(avg_counts: list[float], user_id: int | None = None) -> bytes:
+    """
+    Строит график средней активности по дням недели.
+
+    Args:
+        avg_counts: Среднее количество сообщений с понедельника по воскресенье.
+        user_id: ID пользователя (для заголовка).
+
+    Returns:
+        PNG изображение графика.
+    """
+    from matplotlib.figure import Figure
+
+    day_names = [WEEKDAY_NAMES[d] for d in range(7)]
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    bars = ax.bar(
+        day_names, avg_counts, color="lightgreen", edgecolor="darkgreen", alpha=0.7
+    )
+    _highlight_max(bars, avg_counts, "gold")
+
+    ax.set_xlabel("День недели", fontsize=12, weight="bold")
+    ax.set_ylabel("Среднее количество сообщений", fontsize=12, weight="bold")
+
+    if user_id:
+        title = f"Средняя активность пользователя USER{user_id} по дням недели"
+    else:
+        title = "Средняя активность всех пользователей по дням недели"
+    ax.set_title(title, fontsize=14, weight="bold")
+
+    ax.tick_params(axis="x", labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    ax.grid(axis="y", alpha=0.3, linestyle="--")
+    return _to_png(fig)
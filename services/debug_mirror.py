@@ -0,0 +1,181 @@
+"""
+Пересылка сообщений пользователей и ответов бота в ADMIN_CHAT.
+
+forward_to_debug() только ставит сообщение в очередь. Фоновая задача
+debug_mirror_loop раз в DEBUG_MIRROR_INTERVAL секунд пересылает накопленное:
+одна метка USER{id} и один forward_messages на чат вместо метки и
+forward_message на каждое сообщение.
+
+Пересылка имеет самый низкий приоритет среди исходящих запросов: запросы
+идут строго по одному, а при TelegramRetryAfter пересылка ждет сама,
+не отнимая лимиты у ответов пользователям. Если очередь выросла больше
+DEBUG_MIRROR_MAX_PENDING, пересылается только каждое
+DEBUG_MIRROR_SAMPLE_EVERY-е сообщение, остальные считаются и выводятся
+в метке чата.
+"""
+
+import asyncio
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramMigrateToChat, TelegramRetryAfter
+
+from core.config import (
+    ADMIN_CHAT,
+    DEBUG_MIRROR_INTERVAL,
+    DEBUG_MIRROR_MAX_PENDING,
+    DEBUG_MIRROR_SAMPLE_EVERY,
+    MESSAGES_LEVEL,
+    logger,
+)
+
+# Максимум сообщений в одном forward_messages (ограничение Bot API)
+FORWARD_BATCH_SIZE = 100
+
+# Очередь на пересылку: {chat_id: [message_id, ...]}
+_pending: dict[int, list[int]] = {}
+# Пропущенные при нагрузке сообщения: {chat_id: количество}
+_skipped: dict[int, int] = {}
+# Сообщений, поступивших при переполненной очереди (для выборки каждого N-го)
+_overflow_seen = 0
+# Текущий ADMIN чат (меняется, если чат мигрировал в супергруппу)
+_admin_chat = ADMIN_CHAT
+
+
+def forward_to_debug(message_chat_id: int, message_id: int):
+    """
+    Ставит сообщение в очередь на пересылку в отладочный чат.
+    Пересылка происходит только если TELEGRAM_LOG_LEVEL <= MESSAGES (25).
+
+    Args:
+        message_chat_id: ID чата с сообщением
+        message_id: ID сообщения
+    """
+    global _overflow_seen
+
+    # Пересылаем только если уровень <= MESSAGES (включая INFO, DEBUG, FULL)
+    if getattr(logger, "_telegram_level", 100) > MESSAGES_LEVEL:
+        return
+
+    if sum(len(ids) for ids in _pending.values()) >= DEBUG_MIRROR_MAX_PENDING:
+        _overflow_seen += 1
+        if _overflow_seen % DEBUG_MIRROR_SAMPLE_EVERY:
+            _skipped[message_chat_id] = _skipped.get(message_chat_id, 0) + 1
+            return
+
+    _pending.setdefault(message_chat_id, []).append(message_id)
+
+
+def _take_pending() -> tuple[dict[int, list[int]], dict[int, int]]:
+    """Забирает накопленную очередь и счетчики пропущенных сообщений."""
+    global _pending, _skipped, _overflow_seen
+
+    pending, skipped = _pending, _skipped
+    _pending, _skipped, _overflow_seen = {}, {}, 0
+    return pending, skipped
+
+
+async def _mirror_chat(bot: Bot, label: str, from_chat_id: int, message_ids: list[int]):
+    """
+    Пересылает пачку сообщений одного чата в ADMIN чат с обработкой ошибок.
+
+    Args:
+        bot: Экземпляр бота
+        label: Метка пачки (USER{id})
+        from_chat_id: ID чата с сообщениями
+        message_ids: ID сообщений по возрастанию
+    """
+    global _admin_chat
+
+    batches = [
+        message_ids[start : start + FORWARD_BATCH_SIZE]
+        for start in range(0, len(message_ids), FORWARD_BATCH_SIZE)
+    ]
+    # Сколько частей (метка и пачки) уже отправлено: повтор после
+    # TelegramRetryAfter продолжает с части, на которой остановился
+    sent = 0
+
+    async def send(chat_id: int):
+        nonlocal sent
+        if sent == 0:
+            await bot.send_message(chat_id, label)
+            sent = 1
+        for batch in batches[sent - 1 :]:
+            await bot.forward_messages(
+                chat_id=chat_id, from_chat_id=from_chat_id, message_ids=batch
+            )
+            sent += 1
+
+    try:
+        try:
+            await send(_admin_chat)
+        except TelegramRetryAfter as e:
+            # Уступаем лимиты ответам пользователям и пробуем еще раз
+            await asyncio.sleep(e.retry_after)
+            await send(_admin_chat)
+    except TelegramMigrateToChat as e:
+        # Чат был преобразован в супергруппу
+        new_chat_id = e.migrate_to_chat_id
+        logger.warning(
+            f"⚠️ ADMIN чат был преобразован в супергруппу!\n"
+            f"Старый ID: {_admin_chat}\n"
+            f"Новый ID: {new_chat_id}\n"
+            f"❗ Обновите переменную ADMIN_CHAT в .env или GitHub Secrets"
+        )
+        _admin_chat = new_chat_id
+        # Пытаемся отправить в новый чат (целиком, с меткой)
+        sent = 0
+        try:
+            await send(new_chat_id)
+            logger.info(f"✅ Сообщения успешно отправлены в новый чат {new_chat_id}")
+        except Exception as e2:
+            logger.error(
+                f"❌ Не удалось отправить сообщения в новый чат {new_chat_id}: {e2}"
+            )
+    except Exception as e:
+        # Любые другие ошибки (бот не добавлен в чат, чат не существует и т.д.)
+        logger.warning(
+            f"⚠️ Не удалось переслать сообщения в ADMIN чат (ID: {_admin_chat}): {e}\n"
+            f"Проверьте:\n"
+            f"1. Бот добавлен в ADMIN чат\n"
+            f"2. ADMIN_CHAT ID корректный\n"
+            f"3. У бота есть права на отправку сообщений"
+        )
+
+
+async def flush_debug_mirror(bot: Bot):
+    """
+    Пересылает все накопленные сообщения: по одной пачке на чат.
+
+    Args:
+        bot: Экземпляр бота
+    """
+    pending, skipped = _take_pending()
+
+    for chat_id in dict.fromkeys([*pending, *skipped]):
+        label = f"USER{chat_id}"
+        if skipped.get(chat_id):
+            label += f" (пропущено при нагрузке: {skipped[chat_id]})"
+        # forward_messages требует ID сообщений по возрастанию
+        await _mirror_chat(bot, label, chat_id, sorted(pending.get(chat_id, [])))
+
+
+async def debug_mirror_loop(bot: Bot):
+    """
+    Фоновая задача пересылки сообщений в ADMIN чат.
+
+    Раз в DEBUG_MIRROR_INTERVAL секунд пересылает накопленные сообщения.
+    При отмене задачи досылает оставшиеся.
+
+    Args:
+        bot: Экземпляр бота
+    """
+    try:
+        while True:
+            await asyncio.sleep(DEBUG_MIRROR_INTERVAL)
+            try:
+                await flush_debug_mirror(bot)
+            except Exception as e:
+                logger.error(f"Ошибка при пересылке сообщений в ADMIN чат: {e}")
+    except asyncio.CancelledError:
+        await flush_debug_mirror(bot)
+        raise
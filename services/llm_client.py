@@ -2,6 +2,7 @@ import asyncio
 import base64
 import json
 import os
+import time
 
 import aiohttp
 from dotenv import load_dotenv
@@ -12,6 +13,13 @@ load_dotenv()
 LLM_TOKEN = os.environ.get("LLM_TOKEN")
 MODEL = os.environ.get("MODEL")
 VISION_MODEL = os.environ.get("VISION_MODEL", "google/gemini-2.0-flash-001")
+# Максимальное количество одновременных запросов к vision модели
+VISION_CONCURRENCY = int(os.environ.get("VISION_CONCURRENCY") or "4")
+
+_vision_semaphore = asyncio.Semaphore(VISION_CONCURRENCY)
+
+# Размер части изображения при кодировании в base64 (кратен 3, без паддинга внутри)
+BASE64_CHUNK_SIZE = 3 * 64 * 1024
 
 
 async def send_request_to_openrouter(
@@ -109,8 +117,51 @@ async def send_request_to_openrouter(
     return None
 
 
+def build_vision_body(
+    model: str,
+    prompt: str,
+    images: list[bytes | memoryview],
+    image_mime_type: str = "image/jpeg",
+) -> bytearray:
+    """
+    Формирует JSON-тело запроса к vision модели: сначала текст, затем изображения.
+
+    Изображения кодируются в base64 частями прямо в итоговый буфер, без
+    промежуточных строк base64 и копии всего тела при json.dumps().
+
+    Args:
+        model: Модель для обработки изображений
+        prompt: Промпт
+        images: Список байтов изображений
+        image_mime_type: MIME-тип изображений
+
+    Returns:
+        Тело запроса в UTF-8
+    """
+    # Места для изображений помечаем маркерами и затем заменяем на base64
+    marker = "\x00image\x00"
+    content = [{"type": "text", "text": prompt}]
+    content.extend(
+        {
+            "type": "image_url",
+            "image_url": {"url": f"data:{image_mime_type};base64,{marker}"},
+        }
+        for _ in images
+    )
+    data = {"model": model, "messages": [{"role": "user", "content": content}]}
+    parts = json.dumps(data).encode().split(json.dumps(marker)[1:-1].encode())
+
+    body = bytearray(parts[0])
+    for image_bytes, part in zip(images, parts[1:], strict=True):
+        view = memoryview(image_bytes)
+        for start in range(0, len(view), BASE64_CHUNK_SIZE):
+            body += base64.b64encode(view[start : start + BASE64_CHUNK_SIZE])
+        body += part
+    return body
+
+
 async def send_image_to_vision_model(
-    image_bytes: bytes,
+    image_bytes: bytes | memoryview,
     image_mime_type: str = "image/jpeg",
     prompt: str = "Опиши подробно эту картинку на русском языке. Опиши что на ней изображено, какие объекты, люди, эмоции, детали.",
     model: str = VISION_MODEL,
@@ -133,37 +184,62 @@ async def send_image_to_vision_model(
     Returns:
         Описание изображения от модели или None при ошибке
     """
+    return await send_images_to_vision_model(
+        [image_bytes], image_mime_type, prompt, model, api_key, retries, retry_delay
+    )
+
+
+async def send_images_to_vision_model(
+    images: list[bytes | memoryview],
+    image_mime_type: str = "image/jpeg",
+    prompt: str = "Опиши подробно эти картинки на русском языке.",
+    model: str = VISION_MODEL,
+    api_key: str = LLM_TOKEN,
+    retries: int = 3,
+    retry_delay: int = 1,
+) -> str | None:
+    """
+    Отправляет одно или несколько изображений в модель vision одним запросом.
+
+    Одновременных запросов к vision модели не больше VISION_CONCURRENCY,
+    остальные ждут своей очереди.
+
+    Args:
+        images: Список байтов изображений (в порядке, в котором их увидит модель)
+        image_mime_type: MIME-тип изображений (image/jpeg, image/png, и т.д.)
+        prompt: Промпт для описания изображений
+        model: Модель для обработки изображений
+        api_key: API ключ OpenRouter
+        retries: Количество попыток при ошибках (по умолчанию 3)
+        retry_delay: Задержка между попытками в секундах (по умолчанию 1)
+
+    Returns:
+        Ответ модели или None при ошибке
+    """
     url = "https://openrouter.ai/api/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
 
-    # Кодируем изображение в base64
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
-
-    # Формируем запрос с изображением
-    data = {
-        "model": model,
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{image_mime_type};base64,{base64_image}"
-                        },
-                    },
-                ],
-            }
-        ],
-    }
+    body = build_vision_body(model, prompt, images, image_mime_type)
+
+    async with _vision_semaphore:
+        started = time.monotonic()
+        result = await _post_vision_request(url, headers, body, retries, retry_delay)
 
+    logger.info(
+        f"Vision model: {len(images)} изобр., "
+        f"{sum(len(image_bytes) for image_bytes in images) // 1024} КБ, "
+        f"ответ за {time.monotonic() - started:.2f}с"
+    )
+    return result
+
+
+async def _post_vision_request(
+    url: str, headers: dict, body: bytearray, retries: int, retry_delay: int
+) -> str | None:
+    """Отправляет запрос к vision модели с повторами при ошибках."""
     # HTTP статусы, для которых стоит делать retry (серверные ошибки и rate limit)
     retryable_statuses = {400, 429, 500, 502, 503, 504}
     delay = retry_delay
@@ -172,7 +248,7 @@ async def send_image_to_vision_model(
         try:
             async with (
                 aiohttp.ClientSession() as session,
-                session.post(url, headers=headers, data=json.dumps(data)) as response,
+                session.post(url, headers=headers, data=body) as response,
             ):
                 # Для retryable статусов делаем retry
                 if response.status in retryable_statuses:
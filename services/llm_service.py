@@ -2,22 +2,33 @@
 Сервис для работы с LLM.
 """
 
+import asyncio
 import json
-import os
-import tempfile
+import time
 from datetime import datetime, timedelta, timezone
 
-import cv2
 import telegramify_markdown
 
 from core.config import (
     FULL_LEVEL,
     SYSTEM_PROMPT,
     TIMEZONE_OFFSET,
+    VIDEO_VISION_MODE,
     logger,
 )
 from core.database import Conversation
-from services.llm_client import send_image_to_vision_model, send_request_to_openrouter
+from services import vision_cache
+from services.llm_client import (
+    send_image_to_vision_model,
+    send_images_to_vision_model,
+    send_request_to_openrouter,
+)
+from services.media_service import (
+    VideoRejectedError,
+    extract_key_frames,
+    prepare_image_for_vision,
+    run_in_media_executor,
+)
 
 
 def log_prompt(chat_id: int, prompt: list[dict], prompt_type: str = "MESSAGE"):
@@ -178,28 +189,61 @@ async def process_user_message(chat_id: int, message_text: str) -> str | None:
 
 
 async def process_user_image(
-    chat_id: int, image_bytes: bytes, image_mime_type: str = "image/jpeg", user_name_prefix: str = ""
+    chat_id: int,
+    image_bytes: bytes | memoryview | None,
+    image_mime_type: str = "image/jpeg",
+    user_name_prefix: str = "",
+    file_unique_id: str | None = None,
+    image_description: str | None = None,
 ) -> str | None:
     """
     Обрабатывает изображение от пользователя через vision модель и отправляет описание в LLM.
 
+    Описание сначала ищется в кэше по перцептивному хэшу и размерам изображения
+    среди изображений этого чата (services.vision_cache), и только при промахе
+    запрашивается у vision модели.
+
     Args:
         chat_id: ID чата пользователя
-        image_bytes: Байты изображения
+        image_bytes: Байты изображения (не нужны, если передано image_description)
         image_mime_type: MIME-тип изображения
         user_name_prefix: Префикс с именем пользователя для групповых чатов (например, "Nik: ")
+        file_unique_id: Уникальный ID файла в Telegram (для кэша описаний)
+        image_description: Готовое описание из кэша по file_unique_id
 
     Returns:
         Отформатированный ответ от LLM или None при ошибке
     """
     logger.info(f"USER{chat_id}TOLLM: [ИЗОБРАЖЕНИЕ]")
 
-    # Шаг 1: Получаем описание изображения от vision модели
+    # Шаг 1: Получаем описание изображения из кэша или от vision модели
     try:
-        image_description = await send_image_to_vision_model(
-            image_bytes=image_bytes,
-            image_mime_type=image_mime_type,
-        )
+        if image_description is None:
+            # Уменьшаем и перекодируем изображение в пуле потоков
+            prepared_bytes, image_key = await run_in_media_executor(
+                prepare_image_for_vision, image_bytes
+            )
+            if prepared_bytes is not image_bytes:
+                logger.info(
+                    f"VISION{chat_id} - изображение сжато: {len(image_bytes) // 1024} КБ -> "
+                    f"{len(prepared_bytes) // 1024} КБ"
+                )
+                image_mime_type = "image/jpeg"
+
+            image_description = await vision_cache.lookup_by_hash(chat_id, image_key)
+            if image_description is not None:
+                logger.info(f"VISION{chat_id} - описание взято из кэша по хэшу")
+            else:
+                image_description = await send_image_to_vision_model(
+                    image_bytes=prepared_bytes,
+                    image_mime_type=image_mime_type,
+                )
+                if image_description and image_description.strip():
+                    await vision_cache.store(
+                        chat_id, file_unique_id, image_key, image_description
+                    )
+        else:
+            logger.info(f"VISION{chat_id} - описание взято из кэша по file_unique_id")
     except Exception as e:
         logger.error(f"VISION{chat_id} - Критическая ошибка: {e}", exc_info=True)
         return "⚠️ Произошла ошибка при обработке изображения. Пожалуйста, попробуйте позже."
@@ -218,14 +262,156 @@ async def process_user_image(
     return await process_user_message(chat_id, message_text)
 
 
+def get_frame_label(frame_index: int, total_frames: int, fps: float) -> str:
+    """
+    Возвращает подпись кадра для промпта по его положению в видео.
+
+    Args:
+        frame_index: Номер кадра
+        total_frames: Количество кадров в видео
+        fps: Частота кадров (0 - неизвестна)
+    """
+    if frame_index == 0:
+        return "начало видео"
+    if frame_index >= total_frames - 1:
+        return "конец видео"
+    if fps > 0:
+        seconds = int(frame_index / fps)
+        return f"кадр на {seconds // 60}:{seconds % 60:02d}"
+    return "середина видео"
+
+
+async def describe_frame(
+    chat_id: int, frame_number: int, frame_bytes: bytes, frame_label: str
+) -> str | None:
+    """
+    Получает описание одного кадра видео от vision модели.
+
+    Args:
+        chat_id: ID чата пользователя
+        frame_number: Порядковый номер кадра (с 1, для логов)
+        frame_bytes: JPEG-байты кадра
+        frame_label: Подпись кадра (начало/середина/конец видео)
+
+    Returns:
+        Описание кадра с подписью или None при ошибке
+    """
+    try:
+        description = await send_image_to_vision_model(
+            image_bytes=frame_bytes,
+            image_mime_type="image/jpeg",
+            prompt=f"Опиши подробно этот кадр из видео ({frame_label}) на русском языке. "
+            f"Что происходит, какие объекты, люди, действия, детали.",
+        )
+    except Exception as e:
+        logger.error(
+            f"VISION{chat_id} - ошибка обработки кадра {frame_number}: {e}",
+            exc_info=True,
+        )
+        return None
+
+    if not description or not description.strip():
+        logger.warning(f"VISION{chat_id} - пустое описание для кадра {frame_number}")
+        return None
+
+    logger.debug(
+        f"VISION{chat_id} - описание кадра {frame_number}: {description[:100]}..."
+    )
+    return f"{frame_label.capitalize()}: {description}"
+
+
+async def describe_frames_in_one_request(
+    chat_id: int, frames: list[bytes], frame_labels: list[str]
+) -> str | None:
+    """
+    Получает описания всех кадров видео одним запросом к vision модели.
+
+    Args:
+        chat_id: ID чата пользователя
+        frames: JPEG-байты кадров в хронологическом порядке
+        frame_labels: Подписи кадров
+
+    Returns:
+        Описание кадров или None при ошибке
+    """
+    labels = "\n".join(
+        f"Кадр {i}: {label}" for i, label in enumerate(frame_labels, start=1)
+    )
+    try:
+        description = await send_images_to_vision_model(
+            frames,
+            image_mime_type="image/jpeg",
+            prompt=f"Это {len(frames)} кадров из одного видео в хронологическом порядке:\n"
+            f"{labels}\n\n"
+            f"Опиши подробно на русском языке каждый кадр отдельно, начиная описание "
+            f"с «Кадр N». Что происходит, какие объекты, люди, действия, детали.",
+        )
+    except Exception as e:
+        logger.error(
+            f"VISION{chat_id} - ошибка обработки кадров одним запросом: {e}",
+            exc_info=True,
+        )
+        return None
+
+    if not description or not description.strip():
+        logger.warning(f"VISION{chat_id} - пустое описание кадров")
+        return None
+
+    logger.debug(f"VISION{chat_id} - описание кадров: {description[:100]}...")
+    return description
+
+
+async def describe_video_frames(
+    chat_id: int,
+    frames: list[bytes],
+    frame_labels: list[str],
+    mode: str = VIDEO_VISION_MODE,
+) -> list[str]:
+    """
+    Получает описания кадров видео от vision модели.
+
+    В режиме "parallel" кадры отправляются отдельными запросами одновременно
+    (число запросов ограничено VISION_CONCURRENCY в llm_client), и кадры,
+    которые не удалось описать, пропускаются. В режиме "batch" все кадры
+    отправляются одним запросом, а при его ошибке - по одному параллельно.
+
+    Args:
+        chat_id: ID чата пользователя
+        frames: JPEG-байты кадров в хронологическом порядке
+        frame_labels: Подписи кадров
+        mode: Режим ("parallel" или "batch")
+
+    Returns:
+        Список описаний (пустой, если не удалось описать ни одного кадра)
+    """
+    if mode == "batch" and len(frames) > 1:
+        description = await describe_frames_in_one_request(chat_id, frames, frame_labels)
+        if description:
+            return [description]
+        logger.warning(f"VISION{chat_id} - повторяем описание кадров по одному")
+
+    results = await asyncio.gather(
+        *(
+            describe_frame(chat_id, i, frame_bytes, frame_labels[i - 1])
+            for i, frame_bytes in enumerate(frames, start=1)
+        )
+    )
+    return [description for description in results if description]
+
+
 async def process_user_video(
-    chat_id: int, video_bytes: bytes, video_duration: int | None = None, user_name_prefix: str = ""
+    chat_id: int,
+    video_bytes: bytes | memoryview,
+    video_duration: int | None = None,
+    user_name_prefix: str = "",
 ) -> str | None:
     """
     Обрабатывает видео от пользователя через vision модель и отправляет описание в LLM.
 
-    Извлекает 3 кадра (первый, средний, последний), отправляет их в VISION_MODEL,
-    затем отправляет описания в MODEL для получения общего описания процесса на видео.
+    Выбирает ключевые кадры по сменам сцен (их количество зависит от длительности),
+    отправляет их в VISION_MODEL (одновременно или одним запросом, см.
+    VIDEO_VISION_MODE), затем отправляет описания в MODEL для получения
+    общего описания процесса на видео.
 
     Args:
         chat_id: ID чата пользователя
@@ -237,104 +423,52 @@ async def process_user_video(
         Отформатированный ответ от LLM или None при ошибке
     """
     logger.info(f"USER{chat_id}TOLLM: [ВИДЕО]")
+    started = time.monotonic()
 
-    # Создаем временный файл для видео
-    temp_video_path = None
     try:
-        # Сохраняем видео во временный файл
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video:
-            temp_video.write(video_bytes)
-            temp_video_path = temp_video.name
-
-        logger.debug(
-            f"VIDEO{chat_id} - видео сохранено во временный файл: {temp_video_path}"
-        )
-
-        # Открываем видео через OpenCV
-        cap = cv2.VideoCapture(temp_video_path)
-
-        if not cap.isOpened():
-            logger.error(f"VIDEO{chat_id} - не удалось открыть видео файл")
-            return None
-
-        # Получаем информацию о видео
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        # Декодируем видео и извлекаем кадры в пуле потоков, не блокируя event loop
+        try:
+            video_info = await run_in_media_executor(extract_key_frames, video_bytes)
+        except VideoRejectedError as e:
+            logger.warning(f"VIDEO{chat_id} - видео отклонено: {e}")
+            return f"⚠️ Не удалось обработать видео: {e}."
 
-        if total_frames == 0:
-            logger.error(f"VIDEO{chat_id} - видео не содержит кадров")
-            cap.release()
-            return None
+        total_frames = video_info["total_frames"]
+        fps = video_info["fps"]
+        frames = video_info["frames"]
 
         # Вычисляем длительность если не передана
-        if video_duration is None and fps > 0:
-            video_duration = int(total_frames / fps)
+        if video_duration is None:
+            video_duration = video_info["duration"]
 
         logger.info(
             f"VIDEO{chat_id} - всего кадров: {total_frames}, "
             f"FPS: {fps}, длительность: {video_duration}с"
         )
 
-        # Определяем индексы кадров: первый, средний, последний
-        frame_indices = [
-            0,  # первый кадр
-            total_frames // 2,  # средний кадр
-            total_frames - 1,  # последний кадр
-        ]
-
-        frames = []
-
-        # Извлекаем кадры
-        for idx in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-            ret, frame = cap.read()
-
-            if ret:
-                # Конвертируем кадр в JPEG
-                _, buffer = cv2.imencode(".jpg", frame)
-                frames.append(buffer.tobytes())
-                logger.debug(f"VIDEO{chat_id} - извлечен кадр #{idx}")
-            else:
-                logger.warning(f"VIDEO{chat_id} - не удалось извлечь кадр #{idx}")
-
-        cap.release()
-
         if len(frames) == 0:
             logger.error(f"VIDEO{chat_id} - не удалось извлечь ни одного кадра")
             return None
 
-        logger.info(f"VIDEO{chat_id} - извлечено {len(frames)} кадров")
-
-        # Отправляем каждый кадр в vision модель
-        frame_descriptions = []
-        frame_labels = ["начало видео", "середина видео", "конец видео"]
-
-        for i, frame_bytes in enumerate(frames):
-            try:
-                description = await send_image_to_vision_model(
-                    image_bytes=frame_bytes,
-                    image_mime_type="image/jpeg",
-                    prompt=f"Опиши подробно этот кадр из видео ({frame_labels[i]}) на русском языке. "
-                    f"Что происходит, какие объекты, люди, действия, детали.",
-                )
-
-                if description and description.strip():
-                    frame_descriptions.append(
-                        f"{frame_labels[i].capitalize()}: {description}"
-                    )
-                    logger.debug(
-                        f"VISION{chat_id} - описание кадра {i + 1}: {description[:100]}..."
-                    )
-                else:
-                    logger.warning(
-                        f"VISION{chat_id} - пустое описание для кадра {i + 1}"
-                    )
+        logger.info(
+            f"VIDEO{chat_id} - извлечено {len(frames)} кадров: {video_info['frame_indices']} "
+            f"(проанализировано {video_info['analyzed_frames']})"
+        )
+        if video_info["truncated"]:
+            logger.warning(
+                f"VIDEO{chat_id} - анализ кадров остановлен по VIDEO_SAMPLING_BUDGET"
+            )
 
-            except Exception as e:
-                logger.error(
-                    f"VISION{chat_id} - ошибка обработки кадра {i + 1}: {e}",
-                    exc_info=True,
-                )
+        # Получаем описания кадров от vision модели
+        frame_labels = [
+            get_frame_label(idx, total_frames, fps) for idx in video_info["frame_indices"]
+        ]
+        vision_started = time.monotonic()
+        frame_descriptions = await describe_video_frames(chat_id, frames, frame_labels)
+        logger.info(
+            f"VISION{chat_id} - описание {len(frames)} кадров ({VIDEO_VISION_MODE}) "
+            f"получено за {time.monotonic() - vision_started:.2f}с"
+        )
 
         if len(frame_descriptions) == 0:
             # Ошибка уже залогирована в send_image_to_vision_model после всех попыток
@@ -377,7 +511,7 @@ async def process_user_video(
         # Формируем запрос к MODEL для анализа процесса на видео
         video_analysis_prompt = (
             f"{user_name_prefix}[Пользователь отправил видео{duration_text}. "
-            f"Вот описания трёх ключевых кадров из этого видео:\n\n"
+            f"Вот описания ключевых кадров из этого видео:\n\n"
             f"{combined_description}\n\n"
             f"На основе этих кадров опиши процесс, который происходит на видео. "
             f"Что делает человек/объект, как развивается действие от начала к концу.]"
@@ -423,6 +557,9 @@ async def process_user_video(
 
         await conversation.update_in_db()
 
+        logger.info(
+            f"VIDEO{chat_id} - ответ на видео готов за {time.monotonic() - started:.2f}с"
+        )
         return converted
 
     except Exception as e:
@@ -430,16 +567,3 @@ async def process_user_video(
             f"VIDEO{chat_id} - критическая ошибка обработки видео: {e}", exc_info=True
         )
         return None
-
-    finally:
-        # Удаляем временный файл
-        if temp_video_path and os.path.exists(temp_video_path):
-            try:
-                os.unlink(temp_video_path)
-                logger.debug(
-                    f"VIDEO{chat_id} - временный файл удален: {temp_video_path}"
-                )
-            except Exception as e:
-                logger.warning(
-                    f"VIDEO{chat_id} - не удалось удалить временный файл: {e}"
-                )
@@ -0,0 +1,163 @@
+"""
+Фоновое обслуживание БД.
+
+Удаление старых сообщений (MAX_STORAGE) и бесед оставляет в файле БД
+свободные страницы: SQLite использует их для новых записей, но файл
+не уменьшается. Задача db_maintenance_loop раз в DB_MAINTENANCE_INTERVAL
+секунд дожидается паузы в нагрузке (DB_MAINTENANCE_IDLE секунд без новых
+сообщений) и:
+1. Возвращает свободные страницы в файловую систему (PRAGMA
+   incremental_vacuum) шагами по DB_VACUUM_STEP_PAGES страниц. Каждый шаг -
+   короткая транзакция, между шагами выполняются запросы бота, а при новом
+   сообщении освобождение откладывается до следующего запуска.
+2. Обновляет статистику планировщика запросов (ANALYZE с analysis_limit).
+3. Переносит WAL в файл БД (PRAGMA wal_checkpoint(PASSIVE)), если БД
+   в режиме WAL.
+
+Размер БД, свободные страницы и результат последнего обслуживания
+показывает команда /db_stats.
+"""
+
+import asyncio
+import time
+from datetime import UTC, datetime
+
+import core.database as database
+from core.config import (
+    DB_MAINTENANCE_IDLE,
+    DB_MAINTENANCE_INTERVAL,
+    DB_VACUUM_STEP_PAGES,
+    logger,
+)
+
+# Пауза между шагами incremental_vacuum (в секундах)
+VACUUM_STEP_PAUSE = 0.05
+
+# Как часто проверять, наступила ли пауза в нагрузке (в секундах)
+IDLE_CHECK_TICK = 10
+
+# Сколько строк каждого индекса просматривает ANALYZE
+ANALYSIS_LIMIT = 1000
+
+AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+# Результат последнего обслуживания (см. run_maintenance)
+_last_run: dict | None = None
+
+
+def is_idle() -> bool:
+    """Проверяет, что новых сообщений не было DB_MAINTENANCE_IDLE секунд."""
+    return time.monotonic() - database.last_message_at >= DB_MAINTENANCE_IDLE
+
+
+def get_last_run() -> dict | None:
+    """Возвращает результат последнего обслуживания или None."""
+    return _last_run
+
+
+async def release_free_pages() -> int:
+    """
+    Возвращает свободные страницы в файловую систему шагами по
+    DB_VACUUM_STEP_PAGES, пока нет новых сообщений.
+
+    Returns:
+        Количество освобожденных страниц
+    """
+    stats = await database.get_db_stats()
+    if stats["auto_vacuum"] != database.AUTO_VACUUM_INCREMENTAL:
+        return 0
+
+    free_pages = stats["freelist_count"]
+    while free_pages and is_idle():
+        left = await database.incremental_vacuum(DB_VACUUM_STEP_PAGES)
+        if left >= free_pages:
+            break
+        free_pages = left
+        await asyncio.sleep(VACUUM_STEP_PAUSE)
+    return stats["freelist_count"] - free_pages
+
+
+async def run_maintenance() -> dict:
+    """
+    Выполняет обслуживание БД: incremental_vacuum, ANALYZE и чекпоинт WAL.
+
+    Returns:
+        {"finished_at", "duration", "freed_pages", "checkpoint", "stats"}
+    """
+    started = time.monotonic()
+    freed_pages = await release_free_pages()
+    await database.analyze_db(ANALYSIS_LIMIT)
+    checkpoint = await database.checkpoint_wal()
+    stats = await database.get_db_stats()
+
+    result = {
+        "finished_at": datetime.now(UTC),
+        "duration": time.monotonic() - started,
+        "freed_pages": freed_pages,
+        "checkpoint": checkpoint,
+        "stats": stats,
+    }
+    logger.info(
+        f"Обслуживание БД за {result['duration']:.1f} сек: "
+        f"освобождено страниц: {freed_pages}, "
+        f"страниц: {stats['page_count']}, свободных: {stats['freelist_count']}"
+    )
+    return result
+
+
+def format_db_report(stats: dict, last_run: dict | None) -> str:
+    """
+    Формирует отчет /db_stats.
+
+    Args:
+        stats: Статистика БД (database.get_db_stats)
+        last_run: Результат последнего обслуживания (run_maintenance) или None
+    """
+    page_size = stats["page_size"]
+    report = "🗄 База данных\n\n"
+    report += (
+        f"Размер: {stats['page_count'] * page_size / 2**20:.1f} МБ "
+        f"({stats['page_count']} страниц по {page_size} байт)\n"
+    )
+    report += (
+        f"Свободно: {stats['freelist_count']} страниц "
+        f"({stats['freelist_count'] * page_size / 2**20:.1f} МБ)\n"
+    )
+    auto_vacuum = AUTO_VACUUM_MODES.get(stats["auto_vacuum"], stats["auto_vacuum"])
+    report += f"auto_vacuum: {auto_vacuum}, journal_mode: {stats['journal_mode']}\n\n"
+
+    if last_run is None:
+        report += "🧹 Обслуживание еще не выполнялось"
+        return report
+
+    report += (
+        f"🧹 Последнее обслуживание: "
+        f"{last_run['finished_at']:%Y-%m-%d %H:%M} UTC "
+        f"({last_run['duration']:.1f} сек)\n"
+    )
+    report += f"Освобождено страниц: {last_run['freed_pages']}"
+    if last_run["checkpoint"] is not None:
+        _, wal_pages, moved_pages = last_run["checkpoint"]
+        report += f"\nЧекпоинт WAL: перенесено {moved_pages} из {wal_pages} страниц"
+    return report
+
+
+async def db_maintenance_loop():
+    """
+    Фоновая задача обслуживания БД: раз в DB_MAINTENANCE_INTERVAL секунд
+    дожидается паузы в нагрузке и выполняет run_maintenance.
+    """
+    global _last_run
+    logger.info(
+        f"Запуск фоновой задачи обслуживания БД (раз в {DB_MAINTENANCE_INTERVAL} сек)"
+    )
+
+    while True:
+        await asyncio.sleep(DB_MAINTENANCE_INTERVAL)
+        while not is_idle():
+            await asyncio.sleep(IDLE_CHECK_TICK)
+
+        try:
+            _last_run = await run_maintenance()
+        except Exception as e:
+            logger.error(f"Ошибка при обслуживании БД: {e}", exc_info=True)
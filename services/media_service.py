@@ -0,0 +1,502 @@
+"""
+Сервис для обработки медиа (видео и изображений) вне event loop.
+
+Декодирование видео через OpenCV занимает от сотен миллисекунд до секунд.
+Чтобы не блокировать обработку сообщений других пользователей, вся работа
+с OpenCV выполняется в отдельном ограниченном пуле потоков (OpenCV отпускает
+GIL во время декодирования и кодирования).
+
+OpenCV и NumPy импортируются при первой обработке медиа (уже в потоке пула),
+а не при запуске бота.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import heapq
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from core.config import (
+    MAX_IMAGE_SIZE_MB,
+    MAX_VIDEO_DURATION,
+    MAX_VIDEO_SIZE_MB,
+    MEDIA_WORKERS,
+    VIDEO_MAX_FRAMES,
+    VIDEO_MIN_FRAMES,
+    VIDEO_SAMPLE_FPS,
+    VIDEO_SAMPLING_BUDGET,
+    VIDEO_SECONDS_PER_FRAME,
+    VISION_JPEG_QUALITY,
+    VISION_MAX_EDGE,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MAX_VIDEO_SIZE = MAX_VIDEO_SIZE_MB * 1024 * 1024
+MAX_IMAGE_SIZE = MAX_IMAGE_SIZE_MB * 1024 * 1024
+
+# Размер уменьшенного кадра для сравнения сцен и число корзин гистограммы
+THUMBNAIL_SIZE = (64, 36)
+HISTOGRAM_BINS = 64
+# Минимальное изменение гистограммы (от 0 до 1), которое считается сменой сцены
+SCENE_CHANGE_THRESHOLD = 0.25
+
+# Пул потоков для работы с медиа и ограничение числа одновременных задач:
+# лишние задачи ждут в event loop, а не копятся в очереди пула
+_media_executor = ThreadPoolExecutor(
+    max_workers=MEDIA_WORKERS, thread_name_prefix="media"
+)
+_media_semaphore = asyncio.Semaphore(MEDIA_WORKERS)
+
+
+class VideoRejectedError(Exception):
+    """Видео не может быть обработано (слишком большое, длинное или повреждено)."""
+
+
+class MediaTooLargeError(Exception):
+    """Файл больше допустимого размера."""
+
+
+class MediaBuffer:
+    """
+    Буфер для скачивания файла через bot.download_file() без лишних копий.
+
+    Память выделяется один раз по размеру из get_file, чанки пишутся прямо
+    в нее, а результат отдается как memoryview без копирования. Скачивание
+    прерывается, как только данных становится больше max_size.
+    """
+
+    def __init__(self, max_size: int, size_hint: int | None = None):
+        self.max_size = max_size
+        self._buffer = bytearray(min(size_hint or 0, max_size))
+        self._length = 0
+
+    def write(self, chunk: bytes) -> int:
+        end = self._length + len(chunk)
+        if end > self.max_size:
+            raise MediaTooLargeError(
+                f"размер больше {self.max_size / 1024 / 1024:.0f} МБ"
+            )
+        if end > len(self._buffer):
+            # Размер неизвестен или оказался больше заявленного - расширяем буфер
+            new_size = min(self.max_size, max(end, 2 * len(self._buffer)))
+            self._buffer.extend(bytes(new_size - len(self._buffer)))
+        self._buffer[self._length : end] = chunk
+        self._length = end
+        return len(chunk)
+
+    def flush(self):
+        pass
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # download_file() перематывает поток в начало после скачивания
+        return 0
+
+    def getbuffer(self) -> memoryview:
+        """Возвращает скачанные данные без копирования."""
+        return memoryview(self._buffer)[: self._length]
+
+
+async def download_media(bot, file_id: str, max_size: int) -> memoryview:
+    """
+    Скачивает файл из Telegram в память с ограничением размера.
+
+    Args:
+        bot: Экземпляр бота
+        file_id: ID файла в Telegram
+        max_size: Максимальный размер в байтах
+
+    Returns:
+        Содержимое файла (memoryview, без копирования)
+
+    Raises:
+        MediaTooLargeError: Если файл больше max_size
+    """
+    file = await bot.get_file(file_id)
+    if file.file_size and file.file_size > max_size:
+        raise MediaTooLargeError(f"размер больше {max_size / 1024 / 1024:.0f} МБ")
+
+    buffer = MediaBuffer(max_size, file.file_size)
+    await bot.download_file(file.file_path, destination=buffer)
+    return buffer.getbuffer()
+
+
+@contextlib.contextmanager
+def video_file(video_bytes: bytes | memoryview):
+    """
+    Отдает путь к файлу с видео для cv2.VideoCapture.
+
+    В Linux видео записывается в анонимный файл в памяти (memfd), который
+    OpenCV открывает по пути /proc/self/fd/N, в других системах - во временный
+    файл на диске. Файл удаляется при выходе из контекста.
+
+    Args:
+        video_bytes: Байты видео
+    """
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create("video")
+        try:
+            view = memoryview(video_bytes)
+            while view:
+                view = view[os.write(fd, view) :]
+            yield f"/proc/self/fd/{fd}"
+        finally:
+            os.close(fd)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video:
+        temp_video.write(video_bytes)
+    try:
+        yield temp_video.name
+    finally:
+        os.unlink(temp_video.name)
+
+
+async def run_in_media_executor(func, *args, **kwargs):
+    """
+    Выполняет синхронную функцию в пуле потоков для медиа.
+
+    Args:
+        func: Синхронная функция
+        *args: Позиционные аргументы
+        **kwargs: Именованные аргументы
+
+    Returns:
+        Результат функции
+    """
+    async with _media_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _media_executor, functools.partial(func, *args, **kwargs)
+        )
+
+
+def check_video_limits(size: int | None, duration: int | None) -> str | None:
+    """
+    Проверяет размер и длительность видео до загрузки и декодирования.
+
+    Args:
+        size: Размер файла в байтах (None - неизвестен)
+        duration: Длительность в секундах (None - неизвестна)
+
+    Returns:
+        Причина отказа или None, если видео можно обрабатывать
+    """
+    if size is not None and size > MAX_VIDEO_SIZE:
+        return f"размер {size / 1024 / 1024:.1f} МБ больше {MAX_VIDEO_SIZE_MB} МБ"
+    if duration is not None and duration > MAX_VIDEO_DURATION:
+        return f"длительность {duration} с больше {MAX_VIDEO_DURATION} с"
+    return None
+
+
+def encode_for_vision(image: np.ndarray) -> bytes | None:
+    """
+    Уменьшает изображение до VISION_MAX_EDGE по большей стороне и кодирует в JPEG.
+
+    Args:
+        image: Изображение в формате BGR
+
+    Returns:
+        JPEG-байты без метаданных или None при ошибке кодирования
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = VISION_MAX_EDGE / max(height, width)
+    if scale < 1:
+        image = cv2.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    ok, buffer = cv2.imencode(
+        ".jpg",
+        image,
+        [cv2.IMWRITE_JPEG_QUALITY, VISION_JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1],
+    )
+    return buffer.tobytes() if ok else None
+
+
+def image_hash(image: np.ndarray) -> int:
+    """
+    Считает перцептивный хэш (aHash) изображения.
+
+    Изображение уменьшается до 8x8 в оттенках серого, каждый бит - ярче ли
+    пиксель среднего. Хэш не меняется при пересжатии, поэтому находит один
+    и тот же мем в разных файлах. Но он совпадает и у многих разных
+    изображений (скриншоты текста, документы, однотонные и темные картинки),
+    так что сам по себе не доказывает, что изображение то же самое.
+
+    Args:
+        image: Изображение в формате BGR
+
+    Returns:
+        64-битный хэш как знаковое целое (для хранения в SQLite INTEGER)
+    """
+    import cv2
+    import numpy as np
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+    bits = (small > small.mean()).ravel()
+    value = int(np.packbits(bits).view(">u8")[0])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def prepare_image_for_vision(
+    image_bytes: bytes | memoryview,
+) -> tuple[bytes | memoryview, tuple[int, int, int] | None]:
+    """
+    Подготавливает изображение для отправки в vision модель.
+
+    Декодирует изображение (с учетом поворота из EXIF), уменьшает и перекодирует
+    в JPEG через encode_for_vision(). Метаданные при этом не сохраняются.
+    Если изображение не пришлось уменьшать, а перекодированное получилось
+    не меньше исходного JPEG (например, уже сжатое Telegram фото), возвращается
+    исходное изображение.
+
+    Синхронная функция: вызывайте через run_in_media_executor().
+
+    Args:
+        image_bytes: Байты изображения в любом формате, который понимает OpenCV
+
+    Returns:
+        (JPEG-байты, (перцептивный хэш, ширина, высота)) или
+        (исходные байты, None), если изображение не удалось декодировать
+    """
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return image_bytes, None
+
+    height, width = image.shape[:2]
+    image_key = (image_hash(image), width, height)
+    prepared = encode_for_vision(image)
+    if prepared is None:
+        return image_bytes, image_key
+    if (
+        max(height, width) <= VISION_MAX_EDGE
+        and bytes(image_bytes[:2]) == b"\xff\xd8"
+        and len(prepared) >= len(image_bytes)
+    ):
+        return image_bytes, image_key
+    return prepared, image_key
+
+
+def get_frames_count(duration: float | None) -> int:
+    """
+    Возвращает количество ключевых кадров для видео заданной длительности.
+
+    Args:
+        duration: Длительность в секундах (None - неизвестна)
+    """
+    if not duration:
+        return VIDEO_MIN_FRAMES
+    count = 1 + int(duration // VIDEO_SECONDS_PER_FRAME)
+    return max(VIDEO_MIN_FRAMES, min(VIDEO_MAX_FRAMES, count))
+
+
+def frame_histogram(frame: np.ndarray) -> np.ndarray:
+    """
+    Считает нормированную цветовую гистограмму уменьшенного кадра.
+
+    Каждый канал квантуется до 4 уровней, итого 64 корзины.
+
+    Args:
+        frame: Кадр в формате BGR
+    """
+    import cv2
+    import numpy as np
+
+    thumbnail = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    levels = (thumbnail >> 6).astype(np.intp)
+    codes = levels[..., 0] * 16 + levels[..., 1] * 4 + levels[..., 2]
+    histogram = np.bincount(codes.ravel(), minlength=HISTOGRAM_BINS)
+    return histogram / histogram.sum()
+
+
+def select_key_frames(
+    first: int,
+    scene_changes: dict[int, float],
+    fallback: list[int],
+    count: int,
+    min_gap: int,
+) -> list[int]:
+    """
+    Выбирает номера ключевых кадров.
+
+    Первым всегда берется начало видео, затем кадры с самой сильной сменой сцены,
+    а оставшиеся места занимают равномерно расположенные запасные кадры.
+    Выбранные кадры отстоят друг от друга не меньше чем на min_gap кадров.
+
+    Args:
+        first: Номер первого кадра
+        scene_changes: Словарь {номер кадра: сила смены сцены от 0 до 1}
+        fallback: Номера запасных кадров в порядке приоритета
+        count: Сколько кадров выбрать
+        min_gap: Минимальное расстояние между выбранными кадрами
+
+    Returns:
+        Отсортированный список номеров кадров
+    """
+    selected = [first]
+
+    def fits(index: int) -> bool:
+        return all(abs(index - other) >= min_gap for other in selected)
+
+    by_score = sorted(scene_changes.items(), key=lambda item: item[1], reverse=True)
+    for index in [index for index, _ in by_score] + fallback:
+        if len(selected) >= count:
+            break
+        if fits(index):
+            selected.append(index)
+
+    return sorted(selected)
+
+
+def extract_key_frames(video_bytes: bytes | memoryview) -> dict:
+    """
+    Извлекает из видео ключевые кадры в формате JPEG (уменьшенные для vision модели).
+
+    Видео декодируется один раз последовательно (без перемоток). Каждый кадр
+    из VIDEO_SAMPLE_FPS в секунду сравнивается с предыдущим по цветовой
+    гистограмме, и из кадров с самой сильной сменой сцены выбираются
+    ключевые (их количество зависит от длительности, см. get_frames_count).
+    Если анализ не уложился в VIDEO_SAMPLING_BUDGET секунд, кадры выбираются
+    из уже просмотренной части видео.
+
+    Синхронная функция: вызывайте через run_in_media_executor().
+    Не пишет в лог (логирование выполняет вызывающий код в event loop).
+
+    Args:
+        video_bytes: Байты видео (например, memoryview из download_media)
+
+    Returns:
+        Словарь:
+        - frames: список JPEG-байтов извлеченных кадров
+        - frame_indices: номера извлеченных кадров
+        - total_frames: количество кадров в видео
+        - fps: частота кадров
+        - duration: длительность в секундах (None если fps неизвестен)
+        - analyzed_frames: сколько кадров сравнивалось по гистограмме
+        - truncated: True если анализ остановлен по VIDEO_SAMPLING_BUDGET
+
+    Raises:
+        VideoRejectedError: Если видео не открывается, пустое или слишком длинное
+    """
+    import cv2
+    import numpy as np
+
+    if len(video_bytes) > MAX_VIDEO_SIZE:
+        raise VideoRejectedError(check_video_limits(len(video_bytes), None))
+
+    # OpenCV читает видео только из файла
+    with video_file(video_bytes) as video_path:
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if not cap.isOpened():
+                raise VideoRejectedError("не удалось открыть видео файл")
+
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+
+            if total_frames <= 0:
+                raise VideoRejectedError("видео не содержит кадров")
+
+            duration = int(total_frames / fps) if fps > 0 else None
+            reason = check_video_limits(None, duration)
+            if reason:
+                raise VideoRejectedError(reason)
+
+            count = get_frames_count(duration)
+            stride = max(1, round(fps / VIDEO_SAMPLE_FPS)) if fps > 0 else 1
+            min_gap = max(1, total_frames // (count * 2))
+            # Равномерно расположенные кадры на случай, если смен сцены мало
+            targets = {
+                int(index) for index in np.linspace(0, total_frames - 1, count).round()
+            }
+
+            kept = {}  # Номер кадра -> кадр (только возможные ключевые кадры)
+            scene_changes = {}  # Номер кадра -> сила смены сцены
+            heap = []  # Лучшие смены сцены (минимальная наверху)
+            previous_histogram = None
+            last_index = None
+            analyzed_frames = 0
+            truncated = False
+            deadline = time.monotonic() + VIDEO_SAMPLING_BUDGET
+
+            index = -1
+            while cap.grab():
+                index += 1
+                if index % stride and index not in targets:
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    continue
+
+                histogram = frame_histogram(frame)
+                analyzed_frames += 1
+
+                previous_last, last_index = last_index, index
+                kept[index] = frame
+
+                if previous_histogram is not None:
+                    score = 0.5 * float(np.abs(histogram - previous_histogram).sum())
+                    if score >= SCENE_CHANGE_THRESHOLD:
+                        heapq.heappush(heap, (score, index))
+                        scene_changes[index] = score
+                        if len(heap) > count * 2:
+                            _, dropped = heapq.heappop(heap)
+                            del scene_changes[dropped]
+                            if dropped not in targets and dropped != last_index:
+                                kept.pop(dropped, None)
+                previous_histogram = histogram
+
+                # Последний просмотренный кадр нужен только как запасной конец видео
+                if (
+                    previous_last is not None
+                    and previous_last not in targets
+                    and previous_last not in scene_changes
+                ):
+                    kept.pop(previous_last, None)
+
+                if time.monotonic() > deadline:
+                    truncated = True
+                    break
+        finally:
+            cap.release()
+
+    if last_index is None:
+        raise VideoRejectedError("не удалось декодировать видео")
+
+    fallback = sorted(index for index in targets if index in kept) + [last_index]
+    frame_indices = select_key_frames(
+        min(kept), scene_changes, fallback, count, min_gap
+    )
+
+    frames = []
+    extracted_indices = []
+    for index in frame_indices:
+        frame_bytes = encode_for_vision(kept[index])
+        if frame_bytes:
+            frames.append(frame_bytes)
+            extracted_indices.append(index)
+
+    return {
+        "frames": frames,
+        "frame_indices": extracted_indices,
+        "total_frames": total_frames,
+        "fps": fps,
+        "duration": duration,
+        "analyzed_frames": analyzed_frames,
+        "truncated": truncated,
+    }
@@ -0,0 +1,52 @@
+"""
+Фоновое удаление бесед из БД.
+
+Рассылка (/dispatch_all) находит заблокировавших бота пользователей по ходу
+отправки. Их ID не удаляются по одному (отдельное соединение и транзакция
+на каждого), а передаются пачками в schedule_purge: удаление идет фоновой
+задачей через Conversation.delete_many и не задерживает рассылку.
+"""
+
+import asyncio
+from collections.abc import Iterable
+
+from core.config import logger
+from core.database import Conversation
+
+# Запущенные задачи удаления (ссылки нужны, чтобы задачи не собрал GC)
+_jobs: set[asyncio.Task] = set()
+
+
+async def _purge(ids: set[int], reason: str) -> int:
+    try:
+        deleted = await Conversation.delete_many(ids)
+    except Exception as e:
+        logger.error(
+            f"{reason}: ошибка при удалении {len(ids)} бесед: {e}", exc_info=True
+        )
+        return 0
+    logger.info(f"{reason}: удалено бесед из БД: {deleted}")
+    return deleted
+
+
+def schedule_purge(ids: Iterable[int], reason: str) -> asyncio.Task:
+    """
+    Запускает фоновое удаление бесед и всех их данных.
+
+    Args:
+        ids: ID бесед
+        reason: Причина удаления (для логов)
+
+    Returns:
+        Задача, результат которой - количество удаленных бесед (0 при ошибке)
+    """
+    task = asyncio.create_task(_purge(set(ids), reason))
+    _jobs.add(task)
+    task.add_done_callback(_jobs.discard)
+    return task
+
+
+async def wait_for_purges():
+    """Дожидается завершения запущенных удалений (при остановке бота)."""
+    if _jobs:
+        await asyncio.gather(*_jobs)
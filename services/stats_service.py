@@ -1,228 +1,210 @@
 """
 Сервис для сбора статистики и генерации графиков.
+
+Средние для графиков считаются NumPy по счетчикам activity_rollup, графики
+строятся matplotlib в отдельном процессе (services.charts), чтобы отрисовка
+не блокировала event loop, а готовые PNG кэшируются по данным, из которых
+построены. NumPy импортируется при первом /stats.
 """
 
 from __future__ import annotations
 
-from collections import defaultdict
-from datetime import datetime
+import asyncio
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
+from typing import TYPE_CHECKING
 
 import aiosqlite
-import matplotlib
-import matplotlib.pyplot as plt
 
-from core.database import DATABASE_NAME
+from core.config import STATS_CHART_CACHE_SIZE, STATS_RENDER_WORKERS
+from core.database import ACTIVITY_TOTAL_ID, DATABASE_NAME
+from services import charts
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Минимум дней активности для попадания в топ активных пользователей
+TOP_USERS_MIN_DAYS = 5
+
+# Пул процессов для отрисовки графиков создается при первом /stats.
+# Процессы запускаются через spawn: fork процесса с event loop и рабочими
+# потоками (aiosqlite, пул медиа) небезопасен. Spawn заново выполняет главный
+# модуль (main.py), который импортирует приложение только при запуске бота,
+# поэтому в процессах пула загружается только services.charts
+_chart_pool: ProcessPoolExecutor | None = None
+
+# Кэш графиков: user_id (None - все пользователи) -> (отпечаток данных,
+# PNG по часам, PNG по дням недели). При изменении activity_rollup меняется
+# отпечаток, и запись перестраивается
+_chart_cache: OrderedDict[int | None, tuple[int, bytes, bytes]] = OrderedDict()
+
+
+def _get_chart_pool() -> ProcessPoolExecutor:
+    """Возвращает пул процессов для графиков, создавая его при необходимости."""
+    global _chart_pool
+    if _chart_pool is None:
+        _chart_pool = ProcessPoolExecutor(
+            max_workers=STATS_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _chart_pool
+
+
+async def run_in_chart_pool(func, *args):
+    """
+    Выполняет функцию построения графика в пуле процессов.
+
+    Если процесс пула аварийно завершился, пул пересоздается при следующем
+    вызове.
+
+    Args:
+        func: Функция из services.charts
+        *args: Аргументы функции
+
+    Returns:
+        Результат функции
+    """
+    global _chart_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_chart_pool(), functools.partial(func, *args)
+        )
+    except BrokenProcessPool:
+        _chart_pool = None
+        raise
 
-# Используем Agg backend для работы без GUI
-matplotlib.use("Agg")
 
-# Русские названия дней недели
-WEEKDAY_NAMES = {
-    0: "Понедельник",
-    1: "Вторник",
-    2: "Среда",
-    3: "Четверг",
-    4: "Пятница",
-    5: "Суббота",
-    6: "Воскресенье",
-}
+def shutdown_chart_pool():
+    """Останавливает процессы пула графиков (при остановке бота)."""
+    global _chart_pool
+    if _chart_pool is not None:
+        _chart_pool.shutdown(cancel_futures=True)
+        _chart_pool = None
 
 
-async def get_user_timestamps(user_id: int | None = None) -> list[datetime]:
+async def get_activity_counts(
+    user_id: int | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Получает все timestamps из таблицы messages для указанного пользователя или всех пользователей.
+    Считает сообщения пользователей по дням и часам суток.
+
+    Данные берутся из activity_rollup (счетчики по часам, которые обновляются
+    при записи сообщений; для всех пользователей - общий счетчик), поэтому
+    объем работы зависит только от числа дней активности, а удаление старых
+    сообщений по MAX_STORAGE не искажает статистику.
 
-    Важно: timestamps в БД уже сохранены в нужном часовом поясе (с учетом TIMEZONE_OFFSET),
-    поэтому дополнительная конвертация не требуется.
+    День и час в activity_rollup уже посчитаны в часовом поясе TIMEZONE_OFFSET
+    (при записи сообщения и при заполнении по истории), поэтому дополнительная
+    конвертация не требуется.
 
     Args:
         user_id: ID пользователя. Если None, собирает статистику по всем пользователям.
 
     Returns:
-        Список объектов datetime с временными метками.
+        Массивы int64 одинаковой длины (по элементу на каждый час с сообщениями):
+        номер дня от 1970-01-01, час суток (0-23), количество сообщений.
     """
-    timestamps = []
+    import numpy as np
 
+    if user_id is None:
+        user_id = ACTIVITY_TOTAL_ID
+
+    # Номер дня считает SQLite: julianday('1970-01-01') = 2440587.5
     async with aiosqlite.connect(DATABASE_NAME) as db:
-        cursor = await db.cursor()
+        cursor = await db.execute(
+            """
+            SELECT CAST(julianday(day) - 2440587.5 AS INTEGER), hour, count
+            FROM activity_rollup
+            WHERE user_id = ?
+            """,
+            (user_id,),
+        )
+        rows = await cursor.fetchall()
 
-        if user_id is not None:
-            # Получаем данные конкретного пользователя с timestamp (только сообщения от пользователя)
-            sql = "SELECT timestamp FROM messages WHERE user_id = ? AND timestamp IS NOT NULL AND role = 'user'"
-            await cursor.execute(sql, (user_id,))
-        else:
-            # Получаем данные всех пользователей с timestamp (только сообщения от пользователей)
-            sql = "SELECT timestamp FROM messages WHERE timestamp IS NOT NULL AND role = 'user'"
-            await cursor.execute(sql)
+    days, hours, counts = np.array(rows, dtype=np.int64).reshape(-1, 3).T
+    return days, hours, counts
 
-        rows = await cursor.fetchall()
 
-        # Парсим timestamps
-        # ВАЖНО: не добавляем TIMEZONE_OFFSET, так как timestamp в БД
-        # уже сохранен с учетом часового пояса (см. database.py:125)
-        for row in rows:
-            if row[0]:
-                try:
-                    dt = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
-                    timestamps.append(dt)
-                except (ValueError, TypeError):
-                    continue
+def hourly_averages(
+    days: np.ndarray, hours: np.ndarray, counts: np.ndarray
+) -> list[float]:
+    """
+    Считает среднее количество сообщений в каждый час суток по дням активности.
+
+    Args:
+        days, hours, counts: Счетчики из get_activity_counts().
+
+    Returns:
+        Средние для 0, 1, ..., 23 часа.
+    """
+    import numpy as np
 
-    return timestamps
+    num_days = len(np.unique(days)) or 1
+    return (np.bincount(hours, weights=counts, minlength=24) / num_days).tolist()
+
+
+def weekday_averages(days: np.ndarray, counts: np.ndarray) -> list[float]:
+    """
+    Считает среднее количество сообщений в каждый день недели по неделям
+    активности (ISO неделям с понедельника по воскресенье).
+
+    Args:
+        days, counts: Счетчики из get_activity_counts().
+
+    Returns:
+        Средние с понедельника по воскресенье.
+    """
+    import numpy as np
+
+    # 1970-01-01 - четверг: со сдвигом на 3 дня номер дня делится на недели
+    # с понедельника, а остаток - день недели (0 - понедельник)
+    weeks, weekdays = np.divmod(days + 3, 7)
+    num_weeks = len(np.unique(weeks)) or 1
+    return (np.bincount(weekdays, weights=counts, minlength=7) / num_weeks).tolist()
 
 
 async def generate_hourly_stats(
-    timestamps: list[datetime], user_id: int | None = None
+    activity: tuple[np.ndarray, np.ndarray, np.ndarray], user_id: int | None = None
 ) -> BytesIO:
     """
     Генерирует график статистики по часам суток (среднее значение).
+    Средние считаются здесь, а график строится в пуле процессов.
 
     Args:
-        timestamps: Список временных меток.
+        activity: Счетчики по дням и часам (get_activity_counts).
         user_id: ID пользователя (для заголовка).
 
     Returns:
         BytesIO объект с изображением графика.
     """
-    # Группируем сообщения по дате и часу
-    date_hour_counts = defaultdict(lambda: defaultdict(int))
-    for dt in timestamps:
-        date_key = dt.date()  # Дата без времени
-        date_hour_counts[date_key][dt.hour] += 1
-
-    # Подсчитываем среднее количество сообщений для каждого часа
-    hourly_averages = defaultdict(list)
-    for date_data in date_hour_counts.values():
-        for hour in range(24):
-            hourly_averages[hour].append(date_data.get(hour, 0))
-
-    # Вычисляем среднее для каждого часа
-    hours = list(range(24))
-    num_days = len(date_hour_counts) if date_hour_counts else 1
-    avg_counts = [
-        sum(hourly_averages[h]) / num_days if hourly_averages[h] else 0 for h in hours
-    ]
-
-    # Создаем график
-    plt.figure(figsize=(14, 6))
-    bars = plt.bar(hours, avg_counts, color="skyblue", edgecolor="navy", alpha=0.7)
-
-    # Подсвечиваем максимальные значения
-    if avg_counts:
-        max_count = max(avg_counts)
-        for bar, count in zip(bars, avg_counts, strict=True):
-            if count == max_count and count > 0:
-                bar.set_color("orange")
-                bar.set_edgecolor("darkred")
-
-    plt.xlabel("Час суток", fontsize=12, weight="bold")
-    plt.ylabel("Среднее количество сообщений", fontsize=12, weight="bold")
-
-    if user_id:
-        plt.title(
-            f"Средняя активность пользователя USER{user_id} по часам суток",
-            fontsize=14,
-            weight="bold",
-        )
-    else:
-        plt.title(
-            "Средняя активность всех пользователей по часам суток",
-            fontsize=14,
-            weight="bold",
-        )
-
-    plt.xticks(hours)
-    plt.grid(axis="y", alpha=0.3, linestyle="--")
-    plt.tight_layout()
-
-    # Сохраняем в BytesIO
-    buf = BytesIO()
-    plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-    buf.seek(0)
-    plt.close()
-
-    return buf
+    avg_counts = hourly_averages(*activity)
+    png = await run_in_chart_pool(charts.render_hourly_chart, avg_counts, user_id)
+    return BytesIO(png)
 
 
 async def generate_weekly_stats(
-    timestamps: list[datetime], user_id: int | None = None
+    activity: tuple[np.ndarray, np.ndarray, np.ndarray], user_id: int | None = None
 ) -> BytesIO:
     """
     Генерирует график статистики по дням недели (среднее значение).
+    Средние считаются здесь, а график строится в пуле процессов.
 
     Args:
-        timestamps: Список временных меток.
+        activity: Счетчики по дням и часам (get_activity_counts).
         user_id: ID пользователя (для заголовка).
 
     Returns:
         BytesIO объект с изображением графика.
     """
-    # Группируем сообщения по неделям и дням недели
-    # Используем ISO calendar для определения недель
-    week_weekday_counts = defaultdict(lambda: defaultdict(int))
-    for dt in timestamps:
-        # Получаем ISO календарную неделю (год, номер недели)
-        iso_year, iso_week, _ = dt.isocalendar()
-        week_key = (iso_year, iso_week)
-        week_weekday_counts[week_key][dt.weekday()] += 1
-
-    # Подсчитываем среднее количество сообщений для каждого дня недели
-    weekday_averages = defaultdict(list)
-    for week_data in week_weekday_counts.values():
-        for weekday in range(7):
-            weekday_averages[weekday].append(week_data.get(weekday, 0))
-
-    # Вычисляем среднее для каждого дня недели
-    weekdays = list(range(7))
-    num_weeks = len(week_weekday_counts) if week_weekday_counts else 1
-    avg_counts = [
-        sum(weekday_averages[d]) / num_weeks if weekday_averages[d] else 0
-        for d in weekdays
-    ]
-    day_names = [WEEKDAY_NAMES[d] for d in weekdays]
-
-    # Создаем график
-    plt.figure(figsize=(12, 6))
-    bars = plt.bar(
-        day_names, avg_counts, color="lightgreen", edgecolor="darkgreen", alpha=0.7
-    )
-
-    # Подсвечиваем максимальные значения
-    if avg_counts:
-        max_count = max(avg_counts)
-        for bar, count in zip(bars, avg_counts, strict=True):
-            if count == max_count and count > 0:
-                bar.set_color("gold")
-                bar.set_edgecolor("darkred")
-
-    plt.xlabel("День недели", fontsize=12, weight="bold")
-    plt.ylabel("Среднее количество сообщений", fontsize=12, weight="bold")
-
-    if user_id:
-        plt.title(
-            f"Средняя активность пользователя USER{user_id} по дням недели",
-            fontsize=14,
-            weight="bold",
-        )
-    else:
-        plt.title(
-            "Средняя активность всех пользователей по дням недели",
-            fontsize=14,
-            weight="bold",
-        )
-
-    plt.xticks(rotation=45, ha="right")
-    plt.grid(axis="y", alpha=0.3, linestyle="--")
-    plt.tight_layout()
-
-    # Сохраняем в BytesIO
-    buf = BytesIO()
-    plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-    buf.seek(0)
-    plt.close()
-
-    return buf
+    days, _, counts = activity
+    avg_counts = weekday_averages(days, counts)
+    png = await run_in_chart_pool(charts.render_weekly_chart, avg_counts, user_id)
+    return BytesIO(png)
 
 
 async def get_total_users_count() -> int:
@@ -264,6 +246,9 @@ async def get_top_active_users(limit: int = 10) -> list[dict]:
     Комбинированный балл рассчитывается как:
     score = avg_messages_per_day * 0.6 + max_messages_per_day * 0.4
 
+    В топ попадают только пользователи (ID > 0) с минимум TOP_USERS_MIN_DAYS
+    днями активности.
+
     Args:
         limit: Количество пользователей в топе (по умолчанию 10)
 
@@ -277,69 +262,65 @@ async def get_top_active_users(limit: int = 10) -> list[dict]:
         - max_messages_per_day: Максимальное количество сообщений в день
         - score: Комбинированный балл активности
     """
-    user_stats = []
+    # Один запрос: сообщения по дням для каждого пользователя (из счетчиков
+    # activity_rollup в порядке первичного ключа), затем метрики, фильтр
+    # по дням активности, балл и LIMIT - все на стороне SQLite
+    sql = """
+        WITH daily AS (
+            SELECT user_id, day, SUM(count) AS messages
+            FROM activity_rollup
+            WHERE user_id > 0
+            GROUP BY user_id, day
+        ),
+        per_user AS (
+            SELECT
+                user_id,
+                SUM(messages) AS total_messages,
+                COUNT(*) AS days_active,
+                CAST(SUM(messages) AS REAL) / COUNT(*) AS avg_messages_per_day,
+                MAX(messages) AS max_messages_per_day
+            FROM daily
+            GROUP BY user_id
+            HAVING COUNT(*) >= ?
+        )
+        SELECT
+            p.user_id,
+            c.name,
+            p.total_messages,
+            p.days_active,
+            p.avg_messages_per_day,
+            p.max_messages_per_day,
+            p.avg_messages_per_day * 0.6 + p.max_messages_per_day * 0.4 AS score
+        FROM per_user AS p
+        JOIN conversations AS c ON c.id = p.user_id
+        ORDER BY score DESC, p.user_id
+        LIMIT ?
+    """
 
     async with aiosqlite.connect(DATABASE_NAME) as db:
-        # Получаем всех пользователей с положительными ID (личные чаты)
-        cursor = await db.execute(
-            "SELECT id, name FROM conversations WHERE id > 0"
-        )
-        users = await cursor.fetchall()
-
-        for user_id, username in users:
-            # Получаем timestamps для пользователя
-            timestamps_cursor = await db.execute(
-                """
-                SELECT timestamp FROM messages
-                WHERE user_id = ? AND timestamp IS NOT NULL AND role = 'user'
-                """,
-                (user_id,)
-            )
-            timestamps_rows = await timestamps_cursor.fetchall()
-
-            if not timestamps_rows:
-                continue
-
-            # Парсим timestamps и группируем по датам
-            messages_by_date = defaultdict(int)
-            for row in timestamps_rows:
-                try:
-                    dt = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
-                    date_key = dt.date()
-                    messages_by_date[date_key] += 1
-                except (ValueError, TypeError):
-                    continue
-
-            if not messages_by_date:
-                continue
-
-            # Вычисляем метрики
-            total_messages = sum(messages_by_date.values())
-            days_active = len(messages_by_date)
-            avg_messages_per_day = total_messages / days_active
-            max_messages_per_day = max(messages_by_date.values())
-
-            # Фильтруем пользователей с минимум 5 днями активности
-            if days_active < 5:
-                continue
-
-            # Комбинированный балл: среднее (60%) + максимум (40%)
-            score = avg_messages_per_day * 0.6 + max_messages_per_day * 0.4
-
-            user_stats.append({
-                "user_id": user_id,
-                "username": username,
-                "total_messages": total_messages,
-                "days_active": days_active,
-                "avg_messages_per_day": avg_messages_per_day,
-                "max_messages_per_day": max_messages_per_day,
-                "score": score,
-            })
-
-    # Сортируем по комбинированному баллу
-    user_stats.sort(key=lambda x: x["score"], reverse=True)
-
-    return user_stats[:limit]
+        cursor = await db.execute(sql, (TOP_USERS_MIN_DAYS, limit))
+        rows = await cursor.fetchall()
+
+    return [
+        {
+            "user_id": user_id,
+            "username": username,
+            "total_messages": total_messages,
+            "days_active": days_active,
+            "avg_messages_per_day": avg_messages_per_day,
+            "max_messages_per_day": max_messages_per_day,
+            "score": score,
+        }
+        for (
+            user_id,
+            username,
+            total_messages,
+            days_active,
+            avg_messages_per_day,
+            max_messages_per_day,
+            score,
+        ) in rows
+    ]
 
 
 async def generate_user_stats(
@@ -358,15 +339,33 @@ async def generate_user_stats(
         - Общее количество сообщений
         - Общее количество пользователей (только если user_id is None, иначе None)
     """
-    timestamps = await get_user_timestamps(user_id)
+    activity = await get_activity_counts(user_id)
+    total_messages = int(activity[2].sum())
 
-    if not timestamps:
+    if not total_messages:
         return None, None, 0, None
 
-    hourly_graph = await generate_hourly_stats(timestamps, user_id)
-    weekly_graph = await generate_weekly_stats(timestamps, user_id)
+    # Графики перестраиваются, только если данные изменились с прошлого раза
+    fingerprint = hash(b"".join(column.tobytes() for column in activity))
+    cached = _chart_cache.get(user_id)
+    if cached is not None and cached[0] == fingerprint:
+        _chart_cache.move_to_end(user_id)
+        hourly_graph, weekly_graph = BytesIO(cached[1]), BytesIO(cached[2])
+    else:
+        hourly_graph, weekly_graph = await asyncio.gather(
+            generate_hourly_stats(activity, user_id),
+            generate_weekly_stats(activity, user_id),
+        )
+        _chart_cache[user_id] = (
+            fingerprint,
+            hourly_graph.getvalue(),
+            weekly_graph.getvalue(),
+        )
+        _chart_cache.move_to_end(user_id)
+        while len(_chart_cache) > STATS_CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
 
     # Получаем количество пользователей только при запросе статистики для всех
     total_users = await get_total_users_count() if user_id is None else None
 
-    return hourly_graph, weekly_graph, len(timestamps), total_users
+    return hourly_graph, weekly_graph, total_messages, total_users
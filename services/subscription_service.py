@@ -3,52 +3,159 @@
 """
 
 import asyncio
+import math
+import random
+import time
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
-
-from core.config import REQUIRED_CHANNELS, logger
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from core.config import (
+    REQUIRED_CHANNELS,
+    SUBSCRIPTION_CACHE_TTL,
+    SUBSCRIPTION_CHECK_CONCURRENCY,
+    SUBSCRIPTION_CHECK_INTERVAL,
+    SUBSCRIPTION_RECONCILE_INTERVAL,
+    SUBSCRIPTION_SCHEDULER_TICK,
+    logger,
+)
 from core.database import ChatVerification, Conversation
+from core.verification_index import verification_index
 
+# Статусы участника канала, при которых пользователь считается подписанным
+SUBSCRIBED_STATUSES = ("creator", "administrator", "member")
 
-async def check_user_subscription(
-    bot: Bot, user_id: int, channels: list[str] = None
-) -> dict[str, bool]:
+# Сколько раз повторять get_chat_member после TelegramRetryAfter
+RETRY_AFTER_ATTEMPTS = 3
+
+# Множители базового интервала проверки в зависимости от давности
+# последнего сообщения пользователя: (давность в секундах, множитель)
+ACTIVITY_TIERS = (
+    (24 * 3600, 1),  # активен за последние сутки
+    (7 * 24 * 3600, 4),  # за последнюю неделю
+    (30 * 24 * 3600, 12),  # за последний месяц
+)
+# Множитель для давно неактивных пользователей и тех, кто ни разу не писал
+INACTIVE_MULTIPLIER = 48
+
+# Разброс времени следующей проверки (доля интервала), чтобы проверки не сбивались в пачки
+SCHEDULE_JITTER = 0.1
+
+# Кэш членства: {(channel, user_id): (subscribed, expires_at)}
+_membership_cache: dict[tuple[str, int], tuple[bool, float]] = {}
+
+# Ограничение одновременных запросов к Bot API (общее для всех проверок)
+_api_semaphore = asyncio.Semaphore(SUBSCRIPTION_CHECK_CONCURRENCY)
+
+
+def get_cached_membership(channel: str, user_id: int) -> bool | None:
     """
-    Проверяет подписку пользователя на список каналов.
+    Возвращает закэшированный статус членства или None, если записи нет или она устарела.
 
     Args:
-        bot: Экземпляр бота
+        channel: Канал
         user_id: ID пользователя
-        channels: Список каналов для проверки (по умолчанию REQUIRED_CHANNELS)
+    """
+    entry = _membership_cache.get((channel, user_id))
+    if entry is None:
+        return None
+
+    subscribed, expires_at = entry
+    if expires_at < time.monotonic():
+        _membership_cache.pop((channel, user_id), None)
+        return None
+    return subscribed
+
+
+def remember_membership(channel: str, user_id: int, subscribed: bool):
+    """
+    Сохраняет статус членства в кэше на SUBSCRIPTION_CACHE_TTL секунд.
+
+    Args:
+        channel: Канал
+        user_id: ID пользователя
+        subscribed: True если пользователь подписан
+    """
+    _membership_cache[(channel, user_id)] = (
+        subscribed,
+        time.monotonic() + SUBSCRIPTION_CACHE_TTL,
+    )
+
+
+def prune_membership_cache() -> int:
+    """
+    Удаляет устаревшие записи из кэша членства.
 
     Returns:
-        Словарь {channel: subscribed}, где subscribed = True если пользователь подписан
+        Количество удаленных записей
     """
-    if channels is None:
-        channels = REQUIRED_CHANNELS
+    now = time.monotonic()
+    expired = [key for key, (_, expires_at) in _membership_cache.items() if expires_at < now]
+    for key in expired:
+        del _membership_cache[key]
+    return len(expired)
 
-    if not channels:
-        # Если каналов нет, считаем что подписка не требуется
-        return {}
 
-    results = {}
+async def _check_channel_membership(
+    bot: Bot, channel: str, user_id: int, use_cache: bool = True
+) -> bool:
+    """
+    Проверяет подписку пользователя на один канал.
+
+    Запрос к Bot API выполняется под общим семафором. Результат кэшируется,
+    ошибки доступа к каналу не кэшируются (они могут быть временными).
+
+    Args:
+        bot: Экземпляр бота
+        channel: Канал
+        user_id: ID пользователя
+        use_cache: Использовать ли кэш членства
+
+    Returns:
+        True если пользователь подписан на канал
+
+    Raises:
+        TelegramRetryAfter: Лимит запросов не снят за RETRY_AFTER_ATTEMPTS
+            попыток - подписка неизвестна, статус пользователя менять нельзя
+    """
+    if use_cache:
+        cached = get_cached_membership(channel, user_id)
+        if cached is not None:
+            return cached
 
-    for channel in channels:
+    for attempt in range(1, RETRY_AFTER_ATTEMPTS + 1):
         try:
-            # Получаем информацию о членстве пользователя в канале
-            member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
+            async with _api_semaphore:
+                # Получаем информацию о членстве пользователя в канале
+                member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
 
             # Проверяем статус пользователя
             # Статусы: creator, administrator, member - подписан
             # left, kicked - не подписан
-            is_subscribed = member.status in ["creator", "administrator", "member"]
-            results[channel] = is_subscribed
+            is_subscribed = member.status in SUBSCRIBED_STATUSES
+            remember_membership(channel, user_id, is_subscribed)
 
             logger.debug(
                 f"USER{user_id}: канал {channel}, статус {member.status}, подписан: {is_subscribed}"
             )
+            return is_subscribed
 
+        except TelegramRetryAfter as e:
+            # Превышен лимит запросов - ждем и повторяем, а не считаем пользователя отписанным
+            if attempt >= RETRY_AFTER_ATTEMPTS:
+                logger.warning(
+                    f"Лимит запросов при проверке канала {channel} для USER{user_id}: {e}"
+                )
+                raise
+            logger.debug(
+                f"Лимит запросов Bot API, жду {e.retry_after} сек "
+                f"(попытка {attempt}/{RETRY_AFTER_ATTEMPTS})"
+            )
+            await asyncio.sleep(e.retry_after)
         except TelegramBadRequest as e:
             # Специальная обработка для PARTICIPANT_ID_INVALID
             # Это нормальная ситуация для пользователей, которые никогда не были в канале
@@ -56,29 +163,63 @@ async def check_user_subscription(
                 logger.debug(
                     f"USER{user_id}: не является участником канала {channel} (никогда не был подписан)"
                 )
-                results[channel] = False
+                remember_membership(channel, user_id, False)
             else:
                 # Другие ошибки - канал не найден или бот не является админом
                 logger.warning(
                     f"Ошибка при проверке канала {channel} для USER{user_id}: {e}"
                 )
-                results[channel] = False
+            return False
         except TelegramForbiddenError as e:
             # Бот заблокирован пользователем или не имеет доступа
             logger.warning(f"Нет доступа к каналу {channel} для USER{user_id}: {e}")
-            results[channel] = False
+            return False
         except Exception as e:
             logger.error(
                 f"Неожиданная ошибка при проверке канала {channel} для USER{user_id}: {e}",
                 exc_info=True,
             )
-            results[channel] = False
+            return False
 
-    return results
+    return False
+
+
+async def check_user_subscription(
+    bot: Bot, user_id: int, channels: list[str] = None, use_cache: bool = True
+) -> dict[str, bool]:
+    """
+    Проверяет подписку пользователя на список каналов.
+
+    Каналы проверяются параллельно, общее число одновременных запросов
+    ограничено SUBSCRIPTION_CHECK_CONCURRENCY.
+
+    Args:
+        bot: Экземпляр бота
+        user_id: ID пользователя
+        channels: Список каналов для проверки (по умолчанию REQUIRED_CHANNELS)
+        use_cache: Использовать ли кэш членства (False - всегда спрашивать Telegram)
+
+    Returns:
+        Словарь {channel: subscribed}, где subscribed = True если пользователь подписан
+    """
+    if channels is None:
+        channels = REQUIRED_CHANNELS
+
+    if not channels:
+        # Если каналов нет, считаем что подписка не требуется
+        return {}
+
+    statuses = await asyncio.gather(
+        *(
+            _check_channel_membership(bot, channel, user_id, use_cache)
+            for channel in channels
+        )
+    )
+    return dict(zip(channels, statuses, strict=True))
 
 
 async def is_user_subscribed_to_all(
-    bot: Bot, user_id: int, channels: list[str] = None
+    bot: Bot, user_id: int, channels: list[str] = None, use_cache: bool = True
 ) -> bool:
     """
     Проверяет, подписан ли пользователь на ВСЕ обязательные каналы.
@@ -87,6 +228,7 @@ async def is_user_subscribed_to_all(
         bot: Экземпляр бота
         user_id: ID пользователя
         channels: Список каналов для проверки (по умолчанию REQUIRED_CHANNELS)
+        use_cache: Использовать ли кэш членства (False - всегда спрашивать Telegram)
 
     Returns:
         True если подписан на все каналы, False иначе
@@ -98,10 +240,10 @@ async def is_user_subscribed_to_all(
         # Если каналов нет, считаем что подписка не требуется
         return True
 
-    results = await check_user_subscription(bot, user_id, channels)
+    results = await check_user_subscription(bot, user_id, channels, use_cache)
     is_subscribed = all(results.values())
 
-    logger.info(
+    logger.debug(
         f"USER{user_id}: проверка подписки завершена, результат: {is_subscribed}"
     )
 
@@ -122,7 +264,7 @@ async def update_user_subscription_status(bot: Bot, user_id: int) -> bool:
     conversation = Conversation(user_id)
     await conversation.get_from_db()
 
-    is_subscribed = await is_user_subscribed_to_all(bot, user_id)
+    is_subscribed = await is_user_subscribed_to_all(bot, user_id, use_cache=False)
 
     # Обновляем статус в БД
     conversation.subscription_verified = 1 if is_subscribed else 0
@@ -135,98 +277,417 @@ async def update_user_subscription_status(bot: Bot, user_id: int) -> bool:
     return is_subscribed
 
 
+async def sweep_user_subscriptions(
+    bot: Bot,
+    use_cache: bool = True,
+    base_interval: int = SUBSCRIPTION_CHECK_INTERVAL,
+    now: int | None = None,
+) -> dict[str, int]:
+    """
+    Проверяет подписку всех личных пользователей (ID > 0).
+
+    Пользователи читаются из БД страницами, беседы каждой страницы загружаются
+    одним запросом и проверяются параллельно. Статусы и время следующей
+    проверки (compute_next_check_at) записываются в БД одной транзакцией
+    в конце обхода, чтобы планировщик не проверял этих пользователей повторно.
+
+    Args:
+        bot: Экземпляр бота
+        use_cache: Использовать ли кэш членства
+        base_interval: Базовый интервал проверки в секундах
+        now: Текущее unix-время (для тестов)
+
+    Returns:
+        Словарь со счетчиками: checked, subscribed, not_subscribed, unsubscribed
+    """
+    if now is None:
+        now = int(time.time())
+
+    stats = {"checked": 0, "subscribed": 0, "not_subscribed": 0, "unsubscribed": 0}
+    checks = {}
+    changes = 0
+
+    async for user_ids in Conversation.iter_id_chunks(min_id=0):
+        conversations = await Conversation.get_many_from_db(user_ids)
+        last_activity = await Conversation.get_last_activity(user_ids)
+        results = await asyncio.gather(
+            *(
+                is_user_subscribed_to_all(bot, user_id, use_cache=use_cache)
+                for user_id in user_ids
+            ),
+            return_exceptions=True,
+        )
+
+        for user_id, result in zip(user_ids, results, strict=True):
+            if isinstance(result, TelegramRetryAfter):
+                # Подписка неизвестна - оставляем статус как есть
+                logger.warning(f"USER{user_id}: проверка подписки отложена: {result}")
+                continue
+            if isinstance(result, BaseException):
+                logger.error(
+                    f"Ошибка при проверке подписки USER{user_id}: {result}",
+                    exc_info=result,
+                )
+                continue
+
+            conversation = conversations.get(user_id)
+            if conversation is None:
+                # Беседа удалена во время обхода
+                continue
+
+            stats["checked"] += 1
+            new_status = 1 if result else 0
+            old_status = conversation.subscription_verified
+
+            if result:
+                stats["subscribed"] += 1
+            else:
+                stats["not_subscribed"] += 1
+                if old_status == 1:
+                    stats["unsubscribed"] += 1
+
+            if old_status != new_status:
+                logger.info(
+                    f"USER{user_id}: статус подписки изменился с {old_status} на {new_status}"
+                )
+                changes += 1
+
+            checks[user_id] = (
+                new_status,
+                compute_next_check_at(now, last_activity.get(user_id), base_interval),
+            )
+
+    await Conversation.update_subscription_schedule(checks)
+    logger.debug(
+        f"Проверка подписок пользователей завершена: {stats}, изменений: {changes}"
+    )
+
+    return stats
+
+
+async def sweep_chat_verifications(bot: Bot, use_cache: bool = True) -> dict[str, int]:
+    """
+    Проверяет подписку пользователей-верификаторов всех верифицированных чатов.
+    Если верификатор отписался - удаляет запись из chat_verifications.
+
+    Args:
+        bot: Экземпляр бота
+        use_cache: Использовать ли кэш членства
+
+    Returns:
+        Словарь со счетчиками: checked, verified, removed
+    """
+    stats = {"checked": 0, "verified": 0, "removed": 0}
+
+    chat_verifications = await ChatVerification.get_all_from_db()
+    if not chat_verifications:
+        logger.debug("Нет верифицированных чатов для проверки")
+        return stats
+
+    logger.info(f"Проверка верификации для {len(chat_verifications)} чатов")
+
+    results = await asyncio.gather(
+        *(
+            is_user_subscribed_to_all(
+                bot, verification.verified_by_user_id, use_cache=use_cache
+            )
+            for verification in chat_verifications
+        ),
+        return_exceptions=True,
+    )
+
+    for verification, result in zip(chat_verifications, results, strict=True):
+        chat_id = verification.chat_id
+        verifier_name = verification.user_name
+
+        if isinstance(result, BaseException):
+            logger.error(
+                f"Ошибка при проверке верификации CHAT{chat_id}: {result}",
+                exc_info=result,
+            )
+            continue
+
+        stats["checked"] += 1
+
+        if result:
+            stats["verified"] += 1
+            logger.debug(f"CHAT{chat_id}: верификатор {verifier_name} подписан, всё ОК")
+            continue
+
+        # Верификатор отписался - удаляем верификацию чата
+        logger.warning(
+            f"CHAT{chat_id}: верификатор {verifier_name} (ID: {verification.verified_by_user_id}) "
+            f"отписался от каналов. Удаляем верификацию чата."
+        )
+        try:
+            await verification.delete_from_db()
+            stats["removed"] += 1
+            logger.info(f"CHAT{chat_id}: верификация удалена")
+        except Exception as e:
+            logger.error(
+                f"Ошибка при удалении верификации CHAT{chat_id}: {e}", exc_info=True
+            )
+
+    logger.debug("Проверка верификации чатов завершена")
+
+    return stats
+
+
+def match_required_channel(chat_id: int, username: str | None) -> str | None:
+    """
+    Находит канал из REQUIRED_CHANNELS, соответствующий чату.
+
+    Каналы в REQUIRED_CHANNELS задаются как @username или числовой ID.
+
+    Args:
+        chat_id: ID чата
+        username: Username чата (без @)
+
+    Returns:
+        Запись из REQUIRED_CHANNELS или None, если чат не является обязательным каналом
+    """
+    for channel in REQUIRED_CHANNELS:
+        if channel.startswith("@"):
+            if username and channel[1:].lower() == username.lower():
+                return channel
+        elif channel == str(chat_id):
+            return channel
+    return None
+
+
+async def apply_membership_change(
+    bot: Bot, channel: str, user_id: int, subscribed: bool
+) -> int | None:
+    """
+    Применяет изменение членства пользователя в обязательном канале,
+    полученное из события chat_member.
+
+    Обновляет кэш членства и subscription_verified пользователя. При отписке
+    также снимает верификацию со всех чатов, которые подтверждал пользователь.
+    События участников канала, которых нет в БД (не писали боту), пропускаются
+    без запросов к Bot API и БД.
+
+    Args:
+        bot: Экземпляр бота
+        channel: Канал из REQUIRED_CHANNELS
+        user_id: ID пользователя
+        subscribed: True если пользователь теперь участник канала
+
+    Returns:
+        Новый subscription_verified или None, если пользователя нет в БД
+    """
+    if not verification_index.conversation_exists(user_id):
+        return None
+
+    remember_membership(channel, user_id, subscribed)
+
+    if subscribed:
+        # Остальные каналы берем из кэша (или спрашиваем Telegram, если их там нет)
+        new_status = 1 if await is_user_subscribed_to_all(bot, user_id) else 0
+    else:
+        new_status = 0
+        removed_chats = await ChatVerification.delete_by_verifier(user_id)
+        for chat_id in removed_chats:
+            logger.warning(
+                f"CHAT{chat_id}: верификатор USER{user_id} отписался от {channel}. "
+                f"Верификация чата удалена."
+            )
+
+    conversation = (await Conversation.get_many_from_db([user_id])).get(user_id)
+    if conversation is None:
+        return None
+
+    if conversation.subscription_verified != new_status:
+        logger.info(
+            f"USER{user_id}: статус подписки изменился с "
+            f"{conversation.subscription_verified} на {new_status} (событие {channel})"
+        )
+        await Conversation.update_subscription_statuses({user_id: new_status})
+
+    return new_status
+
+
+async def are_membership_events_available(bot: Bot) -> bool:
+    """
+    Проверяет, будет ли Telegram присылать события chat_member по всем
+    обязательным каналам (для этого бот должен быть их администратором).
+
+    Args:
+        bot: Экземпляр бота
+
+    Returns:
+        True если бот - администратор всех REQUIRED_CHANNELS
+    """
+    if not REQUIRED_CHANNELS:
+        return False
+
+    for channel in REQUIRED_CHANNELS:
+        try:
+            member = await bot.get_chat_member(chat_id=channel, user_id=bot.id)
+        except Exception as e:
+            logger.warning(f"Не удалось проверить права бота в канале {channel}: {e}")
+            return False
+
+        if member.status not in ("creator", "administrator"):
+            logger.warning(
+                f"Бот не является администратором канала {channel}, "
+                f"события chat_member недоступны"
+            )
+            return False
+
+    return True
+
+
+def compute_next_check_at(
+    now: int, last_active_at: int | None, base_interval: int
+) -> int:
+    """
+    Вычисляет время следующей проверки подписки пользователя.
+
+    Недавно активных пользователей проверяем с базовым интервалом - для них
+    статус подписки важен прямо сейчас. Чем дольше пользователь не писал,
+    тем реже его проверяем (см. ACTIVITY_TIERS).
+
+    Args:
+        now: Текущее unix-время
+        last_active_at: Unix-время последнего сообщения пользователя (None - не писал)
+        base_interval: Базовый интервал проверки в секундах
+
+    Returns:
+        Unix-время следующей проверки
+    """
+    multiplier = INACTIVE_MULTIPLIER
+    if last_active_at is not None:
+        idle = now - last_active_at
+        for max_idle, tier_multiplier in ACTIVITY_TIERS:
+            if idle <= max_idle:
+                multiplier = tier_multiplier
+                break
+
+    interval = base_interval * multiplier
+    jitter = random.uniform(-SCHEDULE_JITTER, SCHEDULE_JITTER) * interval
+    return int(now + interval + jitter)
+
+
+async def check_due_subscriptions(
+    bot: Bot,
+    base_interval: int = SUBSCRIPTION_CHECK_INTERVAL,
+    tick: int = SUBSCRIPTION_SCHEDULER_TICK,
+    now: int | None = None,
+) -> int:
+    """
+    Проверяет очередную порцию пользователей, у которых наступил next_check_at.
+
+    Размер порции подобран так, чтобы вся база проходила не чаще одного раза
+    за base_interval: нагрузка на Bot API идет равномерным потоком, а не
+    всплеском раз в интервал.
+
+    Args:
+        bot: Экземпляр бота
+        base_interval: Базовый интервал проверки в секундах
+        tick: Шаг планировщика в секундах
+        now: Текущее unix-время (для тестов)
+
+    Returns:
+        Количество проверенных пользователей
+    """
+    if now is None:
+        now = int(time.time())
+
+    total_users = await Conversation.count_ids(min_id=0)
+    budget = max(1, math.ceil(total_users * tick / base_interval))
+
+    conversations = await Conversation.get_due_for_subscription_check(now, budget)
+    if not conversations:
+        return 0
+
+    user_ids = [conversation.id for conversation in conversations]
+    last_activity = await Conversation.get_last_activity(user_ids)
+    results = await asyncio.gather(
+        *(is_user_subscribed_to_all(bot, user_id) for user_id in user_ids),
+        return_exceptions=True,
+    )
+
+    checks = {}
+    for conversation, result in zip(conversations, results, strict=True):
+        user_id = conversation.id
+        old_status = conversation.subscription_verified
+
+        if isinstance(result, BaseException):
+            if isinstance(result, TelegramRetryAfter):
+                logger.warning(f"USER{user_id}: проверка подписки отложена: {result}")
+            else:
+                logger.error(
+                    f"Ошибка при проверке подписки USER{user_id}: {result}",
+                    exc_info=result,
+                )
+            # Оставляем статус как есть и повторяем через базовый интервал
+            checks[user_id] = (old_status, now + base_interval)
+            continue
+
+        new_status = 1 if result else 0
+        if old_status != new_status:
+            logger.info(
+                f"USER{user_id}: статус подписки изменился с {old_status} на {new_status}"
+            )
+
+        checks[user_id] = (
+            new_status,
+            compute_next_check_at(now, last_activity.get(user_id), base_interval),
+        )
+
+    await Conversation.update_subscription_schedule(checks)
+    logger.debug(f"Планировщик подписок: проверено {len(checks)} пользователей")
+
+    return len(checks)
+
+
 async def subscription_check_loop(bot: Bot):
     """
-    Фоновая задача для периодической проверки подписок пользователей и чатов.
-    Проверяет подписку каждые 30 минут.
+    Фоновая задача для проверки подписок пользователей и чатов.
+
+    Если бот - администратор всех обязательных каналов, статусы обновляются
+    в реальном времени по событиям chat_member (см. apply_membership_change),
+    и эта задача только сверяет их раз в SUBSCRIPTION_RECONCILE_INTERVAL.
+    Иначе базовый интервал проверки - SUBSCRIPTION_CHECK_INTERVAL.
 
     Проверяет:
-    1. Личных пользователей (ID > 0) - обновляет subscription_verified
-    2. Верифицированные чаты - проверяет подписку пользователя-верификатора
-       Если верификатор отписался - удаляет запись из chat_verifications
+    1. Личных пользователей (ID > 0) - каждые SUBSCRIPTION_SCHEDULER_TICK секунд
+       проверяет небольшую порцию пользователей, у которых наступил next_check_at,
+       и обновляет subscription_verified. Расписание хранится в БД, поэтому
+       перезапуск бота не вызывает полную перепроверку.
+    2. Верифицированные чаты - раз в базовый интервал проверяет подписку
+       пользователя-верификатора. Если верификатор отписался - удаляет запись
+       из chat_verifications
     """
     logger.info("Запуск фоновой задачи проверки подписок")
 
+    base_interval = SUBSCRIPTION_CHECK_INTERVAL
+    try:
+        if await are_membership_events_available(bot):
+            base_interval = SUBSCRIPTION_RECONCILE_INTERVAL
+            logger.info(
+                "Статусы подписок обновляются по событиям chat_member, "
+                f"фоновая сверка раз в {base_interval} сек"
+            )
+    except Exception as e:
+        logger.error(f"Ошибка при проверке событий chat_member: {e}", exc_info=True)
+
+    last_chats_check = None
+
     while True:
         try:
             # ========== ПРОВЕРКА ЛИЧНЫХ ПОЛЬЗОВАТЕЛЕЙ ==========
-            all_user_ids = await Conversation.get_ids_from_table()
-            user_ids = [uid for uid in all_user_ids if uid > 0]
-            logger.info(f"Проверка подписок для {len(user_ids)} пользователей")
-
-            for user_id in user_ids:
-                try:
-                    conversation = Conversation(user_id)
-                    await conversation.get_from_db()
-
-                    # Проверяем подписку для всех пользователей
-                    is_subscribed = await is_user_subscribed_to_all(bot, user_id)
-                    new_status = 1 if is_subscribed else 0
-
-                    # Логируем только если статус изменился
-                    if conversation.subscription_verified != new_status:
-                        logger.info(
-                            f"USER{user_id}: статус подписки изменился с {conversation.subscription_verified} на {new_status}"
-                        )
-                        conversation.subscription_verified = new_status
-                        await conversation.update_in_db()
-
-                except Exception as e:
-                    logger.error(
-                        f"Ошибка при проверке подписки USER{user_id}: {e}",
-                        exc_info=True,
-                    )
-                    continue
-
-            logger.debug("Проверка подписок пользователей завершена")
+            await check_due_subscriptions(bot, base_interval=base_interval)
 
             # ========== ПРОВЕРКА ВЕРИФИЦИРОВАННЫХ ЧАТОВ ==========
-            import aiosqlite
-
-            from core.database import DATABASE_NAME
-
-            async with aiosqlite.connect(DATABASE_NAME) as db:
-                cursor = await db.execute(
-                    "SELECT chat_id, verified_by_user_id, user_name FROM chat_verifications"
-                )
-                chat_verifications = await cursor.fetchall()
-
-            if chat_verifications:
-                logger.info(f"Проверка верификации для {len(chat_verifications)} чатов")
-
-                for chat_id, verifier_user_id, verifier_name in chat_verifications:
-                    try:
-                        # Проверяем подписку пользователя-верификатора
-                        is_subscribed = await is_user_subscribed_to_all(
-                            bot, verifier_user_id
-                        )
-
-                        if not is_subscribed:
-                            # Верификатор отписался - удаляем верификацию чата
-                            logger.warning(
-                                f"CHAT{chat_id}: верификатор {verifier_name} (ID: {verifier_user_id}) "
-                                f"отписался от каналов. Удаляем верификацию чата."
-                            )
-
-                            chat_verification = ChatVerification(chat_id)
-                            await chat_verification.delete_from_db()
-
-                            logger.info(f"CHAT{chat_id}: верификация удалена")
-                        else:
-                            logger.debug(
-                                f"CHAT{chat_id}: верификатор {verifier_name} подписан, всё ОК"
-                            )
-
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка при проверке верификации CHAT{chat_id}: {e}",
-                            exc_info=True,
-                        )
-                        continue
-
-                logger.debug("Проверка верификации чатов завершена")
-            else:
-                logger.debug("Нет верифицированных чатов для проверки")
+            if (
+                last_chats_check is None
+                or time.monotonic() - last_chats_check >= base_interval
+            ):
+                last_chats_check = time.monotonic()
+                prune_membership_cache()
+                await sweep_chat_verifications(bot)
 
         except Exception as e:
             logger.error(
@@ -234,5 +695,4 @@ async def subscription_check_loop(bot: Bot):
                 exc_info=True,
             )
 
-        # Ждем 30 минут до следующей проверки
-        await asyncio.sleep(1800)
+        await asyncio.sleep(SUBSCRIPTION_SCHEDULER_TICK)
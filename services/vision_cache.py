@@ -0,0 +1,107 @@
+"""
+Кэш описаний изображений от vision модели.
+
+Описание ищется сначала по file_unique_id (до скачивания файла), затем по
+перцептивному хэшу и размерам изображения (тот же мем, пересохраненный
+или отправленный как новый файл). Общие для всех чатов только попадания
+по file_unique_id: одинаковый хэш бывает у разных изображений, поэтому
+по хэшу ищутся только описания изображений из того же чата.
+Сами записи хранятся в таблице vision_cache (core.database), а счетчики
+попаданий с момента запуска - в памяти процесса.
+"""
+
+from core.config import logger
+from core.database import VisionCache
+
+# Счетчики с момента запуска бота
+_stats = {"file_hits": 0, "hash_hits": 0, "misses": 0}
+
+
+async def lookup_by_file_id(file_unique_id: str | None) -> str | None:
+    """
+    Ищет описание изображения по file_unique_id, до скачивания файла.
+
+    Args:
+        file_unique_id: Уникальный ID файла в Telegram
+
+    Returns:
+        Описание или None, если в кэше его нет
+    """
+    if not file_unique_id:
+        return None
+
+    description = await VisionCache.get(file_unique_id=file_unique_id)
+    if description is not None:
+        _stats["file_hits"] += 1
+        logger.debug(f"VISION_CACHE: попадание по file_unique_id {file_unique_id}")
+    return description
+
+
+async def lookup_by_hash(
+    chat_id: int, image_key: tuple[int, int, int] | None
+) -> str | None:
+    """
+    Ищет описание изображения из того же чата по перцептивному хэшу и размерам.
+
+    Промах здесь считается окончательным промахом кэша. Найденное описание
+    не сохраняется под новым file_unique_id: по нему описание выдается
+    во всех чатах, а совпадение хэша не гарантирует, что изображение то же.
+
+    Args:
+        chat_id: ID чата, откуда пришло изображение
+        image_key: (перцептивный хэш, ширина, высота) изображения
+
+    Returns:
+        Описание или None, если в кэше его нет
+    """
+    description = None
+    if image_key is not None:
+        description = await VisionCache.get_by_hash(chat_id, *image_key)
+
+    if description is None:
+        _stats["misses"] += 1
+        return None
+
+    _stats["hash_hits"] += 1
+    logger.debug(f"VISION_CACHE: попадание по хэшу {image_key} в чате {chat_id}")
+    return description
+
+
+async def store(
+    chat_id: int,
+    file_unique_id: str | None,
+    image_key: tuple[int, int, int] | None,
+    description: str,
+):
+    """
+    Сохраняет описание изображения в кэш.
+
+    Args:
+        chat_id: ID чата, откуда пришло изображение
+        file_unique_id: Уникальный ID файла в Telegram
+        image_key: (перцептивный хэш, ширина, высота) изображения
+        description: Описание от vision модели
+    """
+    if file_unique_id is None and image_key is None:
+        return
+    await VisionCache.save(file_unique_id, description, chat_id, image_key)
+
+
+async def get_stats() -> dict:
+    """
+    Возвращает статистику кэша.
+
+    Returns:
+        Словарь:
+        - file_hits, hash_hits, misses: счетчики с момента запуска
+        - hit_rate: доля попаданий с момента запуска (0.0 - 1.0)
+        - entries: количество записей в кэше
+        - saved_calls: сколько всего запросов к vision модели сэкономил кэш
+    """
+    hits = _stats["file_hits"] + _stats["hash_hits"]
+    lookups = hits + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        **await VisionCache.get_stats(),
+    }
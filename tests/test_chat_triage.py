@@ -0,0 +1,166 @@
+"""
+Тесты для отбора сообщений в групповых чатах (ответ только на обращения к боту).
+"""
+
+import importlib
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram import types
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+BOT_ID = 777
+BOT_USERNAME = "TestChatBot"
+
+
+def mock_bot_modules() -> dict:
+    """Моки конфигурации и бота (get_me возвращает тестового бота)."""
+    mock_config = MagicMock()
+    mock_config.ADMIN_CHAT = -999
+    mock_bot_instance = MagicMock()
+    mock_bot_instance.bot.get_me = AsyncMock(
+        return_value=types.User(
+            id=BOT_ID, is_bot=True, first_name="Bot", username=BOT_USERNAME
+        )
+    )
+    return {"core.config": mock_config, "core.bot_instance": mock_bot_instance}
+
+
+def forget_core_submodules(*modules):
+    """Убирает модули с моками из пакета core, чтобы они не попали в другие тесты."""
+    core = sys.modules.get("core")
+    for module in modules:
+        name = module.__name__.rsplit(".", 1)[1]
+        if core is not None and getattr(core, name, None) is module:
+            delattr(core, name)
+
+
+@pytest.fixture
+def utils():
+    """Импортирует utils с замоканными конфигурацией и ботом."""
+    with patch.dict("sys.modules", mock_bot_modules()):
+        sys.modules.pop("core.utils", None)
+        utils = importlib.import_module("core.utils")
+        yield utils
+    forget_core_submodules(utils)
+
+
+@pytest.fixture
+def middlewares():
+    """Импортирует middleware с замоканными конфигурацией, ботом и обработчиками."""
+    modules = mock_bot_modules()
+    modules["handlers.subscription_handlers"] = MagicMock()
+    with patch.dict("sys.modules", modules):
+        sys.modules.pop("core.utils", None)
+        sys.modules.pop("core.middlewares", None)
+        middlewares = importlib.import_module("core.middlewares")
+        utils = sys.modules["core.utils"]
+        yield middlewares
+    forget_core_submodules(middlewares, utils)
+
+
+def make_message(chat_type="supergroup", **kwargs) -> types.Message:
+    """Создает сообщение в чате указанного типа."""
+    return types.Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=types.Chat(id=-100 if chat_type != "private" else 5, type=chat_type),
+        from_user=types.User(id=5, is_bot=False, first_name="Петя"),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_bot_identity_is_loaded_once(utils):
+    """Тест проверяет, что get_me вызывается один раз на все сообщения."""
+    for _ in range(5):
+        assert not await utils.should_respond_in_chat(make_message(text="привет всем"))
+
+    utils.bot.get_me.assert_awaited_once()
+    assert await utils.get_bot_identity() == (BOT_ID, BOT_USERNAME)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("kwargs", "expected"),
+    [
+        ({"text": "просто разговор"}, False),
+        ({"text": f"@{BOT_USERNAME} как дела?"}, True),
+        ({"text": f"эй, @{BOT_USERNAME.lower()}!"}, True),
+        ({"text": f"@{BOT_USERNAME}_fan тоже бот"}, False),
+        ({"caption": f"что на фото, @{BOT_USERNAME}?"}, True),
+        ({"caption": "фото без подписи боту"}, False),
+        (
+            {
+                "text": "Бот, ответь",
+                "entities": [
+                    types.MessageEntity(
+                        type="text_mention",
+                        offset=0,
+                        length=3,
+                        user=types.User(id=BOT_ID, is_bot=True, first_name="Bot"),
+                    )
+                ],
+            },
+            True,
+        ),
+        (
+            {
+                "text": "да",
+                "reply_to_message": types.Message(
+                    message_id=0,
+                    date=datetime.now(),
+                    chat=types.Chat(id=-100, type="supergroup"),
+                    from_user=types.User(id=BOT_ID, is_bot=True, first_name="Bot"),
+                    text="вопрос от бота",
+                ),
+            },
+            True,
+        ),
+    ],
+)
+async def test_group_message_triage(utils, kwargs, expected):
+    """Тест проверяет, на какие сообщения в группе бот отвечает."""
+    assert await utils.should_respond_in_chat(make_message(**kwargs)) is expected
+
+
+@pytest.mark.asyncio
+async def test_private_chat_always_answered(utils):
+    """Тест проверяет, что в личном чате бот отвечает без запроса get_me."""
+    assert await utils.should_respond_in_chat(make_message("private", text="привет"))
+    utils.bot.get_me.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("chat_type", "kwargs", "passed"),
+    [
+        ("supergroup", {"text": "болтовня участников"}, False),
+        ("supergroup", {"photo": [], "caption": "фото для всех"}, False),
+        ("supergroup", {"text": f"@{BOT_USERNAME} привет"}, True),
+        ("supergroup", {"text": "/help"}, True),
+        (
+            "supergroup",
+            {"new_chat_members": [types.User(id=BOT_ID, is_bot=True, first_name="B")]},
+            True,
+        ),
+        ("private", {"text": "привет"}, True),
+    ],
+)
+async def test_group_traffic_middleware(middlewares, chat_type, kwargs, passed):
+    """
+    Тест проверяет, что outer middleware отбрасывает сообщения в группах,
+    не обращенные к боту, не вызывая следующие обработчики.
+    """
+    handler = AsyncMock(return_value="handled")
+    message = make_message(chat_type, **kwargs)
+
+    result = await middlewares.GroupTrafficMiddleware()(handler, message, {})
+
+    assert handler.await_count == int(passed)
+    assert result == ("handled" if passed else None)
@@ -0,0 +1,173 @@
+"""
+Тесты для сжатия текста сообщений (messages.content).
+"""
+
+import os
+import sys
+import zlib
+from pathlib import Path
+from unittest.mock import patch
+
+import aiosqlite
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import content_codec, database
+from migrations import migration_015_content_compression as migration_015
+
+REPLY = (
+    "Отличный вопрос! Давайте разберемся по порядку.\n\n"
+    "**Шаг 1.** Откройте настройки и найдите нужный раздел.\n"
+    "**Шаг 2.** Сохраните изменения и перезапустите приложение.\n\n"
+    "Надеюсь, это поможет! Если нужно, могу объяснить подробнее."
+)
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_content_compression.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    with (
+        patch.object(database, "DATABASE_NAME", test_db_name),
+        patch.object(database, "_content_dictionaries", None),
+    ):
+        await database.check_db()
+        yield test_db_name
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+def test_dictionary_improves_compression():
+    """
+    Тест проверяет, что словарь, обученный на похожих ответах, не больше
+    заданного размера, сжимает лучше zlib без словаря, а ID словаря читается
+    из сжатых данных и без нужного словаря распаковка невозможна.
+    """
+    samples = [REPLY.replace("1", str(i)) for i in range(50)]
+    dictionary = content_codec.train_dictionary(samples, size=1024)
+    assert 0 < len(dictionary) <= 1024
+
+    compressed = content_codec.compress(REPLY, dictionary)
+    assert len(compressed) < len(zlib.compress(REPLY.encode())) / 2
+
+    dict_id = content_codec.dictionary_id(dictionary)
+    assert content_codec.stream_dictionary_id(compressed) == dict_id
+    assert content_codec.decompress(compressed, {dict_id: dictionary}) == REPLY
+    with pytest.raises(KeyError):
+        content_codec.decompress(compressed, {})
+
+    plain = content_codec.compress(REPLY)
+    assert content_codec.stream_dictionary_id(plain) is None
+    assert content_codec.decompress(plain, {}) == REPLY
+
+
+@pytest.mark.asyncio
+async def test_long_messages_are_stored_compressed(test_db):
+    """
+    Тест проверяет, что при CONTENT_COMPRESSION=zlib сообщения не короче
+    CONTENT_COMPRESS_MIN_SIZE байт хранятся сжатыми последним словарем,
+    короткие - текстом, а контекст для LLM содержит исходные тексты.
+    """
+    old_dictionary = content_codec.train_dictionary(["старый словарь " * 3] * 2)
+    dictionary = content_codec.train_dictionary([REPLY] * 2)
+    async with aiosqlite.connect(test_db) as db:
+        await db.executemany(
+            "INSERT INTO content_dictionaries (id, data, created_at) VALUES (?, ?, ?)",
+            [
+                (content_codec.dictionary_id(old_dictionary), old_dictionary, 1),
+                (content_codec.dictionary_id(dictionary), dictionary, 2),
+            ],
+        )
+        await db.commit()
+
+    conversation = database.Conversation(1, "user1")
+    await conversation.save_for_db()
+    with (
+        patch.object(database, "CONTENT_COMPRESSION", "zlib"),
+        patch.object(database, "CONTENT_COMPRESS_MIN_SIZE", 100),
+    ):
+        await conversation.update_prompt("user", "Как настроить роутер?")
+        await conversation.update_prompt("assistant", REPLY)
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "SELECT content, content_codec FROM messages ORDER BY id"
+        )
+        (question, question_codec), (reply, reply_codec) = await cursor.fetchall()
+    assert (question, question_codec) == ("Как настроить роутер?", 0)
+    assert reply_codec == content_codec.CODEC_ZLIB
+    assert content_codec.stream_dictionary_id(reply) == content_codec.dictionary_id(
+        dictionary
+    )
+
+    # Словари загружаются заново при первой распаковке
+    database._content_dictionaries = None
+    context = await conversation.get_context_for_llm()
+    assert [(m["role"], m["content"]) for m in context] == [
+        ("user", "Как настроить роутер?"),
+        ("assistant", REPLY),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dictionary_trained_after_start_is_loaded(test_db):
+    """
+    Тест проверяет, что сообщение, сжатое словарем, обученным после загрузки
+    словарей (scripts/train_content_dict.py --compress), распаковывается:
+    словари перечитываются из БД. Без сжатия сообщения хранятся текстом.
+    """
+    conversation = database.Conversation(1, "user1")
+    await conversation.save_for_db()
+    await conversation.update_prompt("assistant", REPLY)
+    assert [m["content"] for m in await conversation.get_context_for_llm()] == [REPLY]
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute("SELECT content_codec FROM messages")
+        assert (await cursor.fetchone())[0] == content_codec.CODEC_TEXT
+        assert await database._get_content_dictionaries(db) == {}
+
+        dictionary = content_codec.train_dictionary([REPLY] * 2)
+        await db.execute(
+            "INSERT INTO content_dictionaries (id, data, created_at) VALUES (?, ?, 1)",
+            (content_codec.dictionary_id(dictionary), dictionary),
+        )
+        await db.execute(
+            "UPDATE messages SET content = ?, content_codec = ?",
+            (content_codec.compress(REPLY, dictionary), content_codec.CODEC_ZLIB),
+        )
+        await db.commit()
+
+    assert [m["content"] for m in await conversation.get_context_for_llm()] == [REPLY]
+
+
+@pytest.mark.asyncio
+async def test_migration_adds_codec_column(test_db):
+    """
+    Тест проверяет, что миграция 015 добавляет content_codec к старой таблице
+    messages (существующие сообщения - текст) и применяется повторно.
+    """
+    async with aiosqlite.connect(test_db) as db:
+        await db.execute("DROP TABLE messages")
+        await db.execute("DROP TABLE content_dictionaries")
+        await db.execute(
+            "CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT NOT NULL)"
+        )
+        await db.execute("INSERT INTO messages (content) VALUES ('привет')")
+        await db.commit()
+
+    with patch.object(migration_015, "DATABASE_NAME", test_db):
+        await migration_015.upgrade()
+        await migration_015.upgrade()
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute("SELECT content, content_codec FROM messages")
+        assert await cursor.fetchall() == [("привет", content_codec.CODEC_TEXT)]
+        cursor = await db.execute("SELECT COUNT(*) FROM content_dictionaries")
+        assert (await cursor.fetchone())[0] == 0
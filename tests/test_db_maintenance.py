@@ -0,0 +1,178 @@
+"""
+Тесты для фонового обслуживания БД (incremental_vacuum, ANALYZE, чекпоинт WAL).
+"""
+
+import importlib
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import aiosqlite
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import database
+from migrations import migration_016_incremental_vacuum as migration_016
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_db_maintenance.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    with patch.object(database, "DATABASE_NAME", test_db_name):
+        await database.check_db()
+        yield test_db_name
+
+    for path in (test_db_name, f"{test_db_name}-wal", f"{test_db_name}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def maintenance(monkeypatch):
+    """
+    Импортирует сервис с замоканной конфигурацией (без файлов логов и .env):
+    пауза в нагрузке - 60 секунд, шаг incremental_vacuum - 10 страниц.
+    """
+    monkeypatch.setitem(sys.modules, "core.config", MagicMock())
+    sys.modules.pop("services.maintenance_service", None)
+    module = importlib.import_module("services.maintenance_service")
+    monkeypatch.setattr(module, "DB_MAINTENANCE_IDLE", 60)
+    monkeypatch.setattr(module, "DB_VACUUM_STEP_PAGES", 10)
+    monkeypatch.setattr(module, "VACUUM_STEP_PAUSE", 0)
+    # Последнее сообщение было давно
+    monkeypatch.setattr(database, "last_message_at", time.monotonic() - 3600)
+    yield module
+    sys.modules.pop("services.maintenance_service", None)
+
+
+async def free_pages(db_name: str, messages: int = 300) -> int:
+    """Записывает и удаляет сообщения, возвращает количество свободных страниц."""
+    async with aiosqlite.connect(db_name) as db:
+        await db.executemany(
+            """
+            INSERT INTO messages (user_id, role, content, timestamp, created_at)
+            VALUES (1, 'user', ?, '2025-01-01 00:00:00', 1735689600)
+            """,
+            [("сообщение " * 100,)] * messages,
+        )
+        await db.commit()
+        await db.execute("DELETE FROM messages")
+        await db.commit()
+    return (await database.get_db_stats())["freelist_count"]
+
+
+@pytest.mark.asyncio
+async def test_release_free_pages_in_steps(maintenance, test_db):
+    """
+    Тест проверяет, что новая БД создается с auto_vacuum = INCREMENTAL,
+    а свободные страницы возвращаются в файловую систему шагами
+    по DB_VACUUM_STEP_PAGES и файл уменьшается.
+    """
+    stats = await database.get_db_stats()
+    assert stats["auto_vacuum"] == database.AUTO_VACUUM_INCREMENTAL
+    free = await free_pages(test_db)
+    assert free > 50
+    page_count = (await database.get_db_stats())["page_count"]
+
+    steps = []
+    vacuum = database.incremental_vacuum
+
+    async def counting_vacuum(pages):
+        steps.append(pages)
+        return await vacuum(pages)
+
+    with patch.object(database, "incremental_vacuum", counting_vacuum):
+        freed = await maintenance.release_free_pages()
+
+    assert freed == free
+    assert steps == [10] * -(-free // 10)
+    stats = await database.get_db_stats()
+    assert stats["freelist_count"] == 0
+    assert stats["page_count"] == page_count - free
+    assert os.path.getsize(test_db) == stats["page_count"] * stats["page_size"]
+
+
+@pytest.mark.asyncio
+async def test_release_stops_on_new_message(maintenance, test_db):
+    """
+    Тест проверяет, что освобождение страниц прерывается, когда приходит
+    новое сообщение (Conversation.update_prompt).
+    """
+    free = await free_pages(test_db)
+    vacuum = database.incremental_vacuum
+
+    async def vacuum_then_message(pages):
+        left = await vacuum(pages)
+        await database.Conversation(1).update_prompt("user", "привет")
+        return left
+
+    with patch.object(database, "incremental_vacuum", vacuum_then_message):
+        freed = await maintenance.release_free_pages()
+
+    assert freed == 10
+    assert (await database.get_db_stats())["freelist_count"] == free - 10
+    assert not maintenance.is_idle()
+
+
+@pytest.mark.asyncio
+async def test_run_maintenance_report(maintenance, test_db):
+    """
+    Тест проверяет, что обслуживание обновляет статистику планировщика,
+    в режиме WAL выполняет чекпоинт, а отчет /db_stats содержит размер БД,
+    свободные страницы и результат обслуживания.
+    """
+    stats = await database.get_db_stats()
+    report = maintenance.format_db_report(stats, None)
+    assert f"{stats['page_count']} страниц по {stats['page_size']} байт" in report
+    assert "auto_vacuum: INCREMENTAL, journal_mode: delete" in report
+    assert "еще не выполнялось" in report
+
+    async with aiosqlite.connect(test_db) as db:
+        await db.execute("PRAGMA journal_mode = wal")
+    await free_pages(test_db)
+
+    result = await maintenance.run_maintenance()
+
+    assert result["freed_pages"] > 0
+    assert result["stats"]["freelist_count"] == 0
+    assert result["checkpoint"][0] == 0
+    with sqlite3.connect(test_db) as db:
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master")}
+    assert "sqlite_stat1" in tables
+
+    report = maintenance.format_db_report(result["stats"], result)
+    assert "journal_mode: wal" in report
+    assert f"Освобождено страниц: {result['freed_pages']}" in report
+    assert "Чекпоинт WAL" in report
+
+
+@pytest.mark.asyncio
+async def test_migration_enables_incremental_vacuum(test_db):
+    """
+    Тест проверяет, что миграция 016 переводит существующую БД
+    в auto_vacuum = INCREMENTAL без потери данных и применяется повторно.
+    """
+    os.remove(test_db)
+    with sqlite3.connect(test_db) as db:
+        db.execute("CREATE TABLE conversations (id INTEGER PRIMARY KEY, name TEXT)")
+        db.execute("INSERT INTO conversations VALUES (1, 'user1')")
+    with sqlite3.connect(test_db) as db:
+        assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+    with patch.object(migration_016, "DATABASE_NAME", test_db):
+        assert "VACUUM" in await migration_016.upgrade()
+        assert "уже включен" in await migration_016.upgrade()
+
+    with sqlite3.connect(test_db) as db:
+        assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert db.execute("SELECT * FROM conversations").fetchall() == [(1, "user1")]
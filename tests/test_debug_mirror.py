@@ -0,0 +1,141 @@
+"""
+Тесты для пакетной пересылки сообщений в ADMIN чат.
+"""
+
+import importlib
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def debug_mirror():
+    """Импортирует сервис с замоканной конфигурацией (без файлов логов и .env)."""
+    with patch.dict("sys.modules", {"core.config": MagicMock()}):
+        mock_config = sys.modules["core.config"]
+        mock_config.ADMIN_CHAT = -100
+        mock_config.DEBUG_MIRROR_INTERVAL = 0.01
+        mock_config.DEBUG_MIRROR_MAX_PENDING = 4
+        mock_config.DEBUG_MIRROR_SAMPLE_EVERY = 3
+        mock_config.MESSAGES_LEVEL = 25
+        mock_config.logger._telegram_level = 25
+
+        sys.modules.pop("services.debug_mirror", None)
+        yield importlib.import_module("services.debug_mirror")
+
+
+def sent_calls(bot):
+    """Возвращает запросы к боту по порядку: (метод, чат, метка или ID сообщений)."""
+    calls = []
+    for name, args, kwargs in bot.mock_calls:
+        if name == "send_message":
+            calls.append((name, args[0], args[1]))
+        elif name == "forward_messages":
+            calls.append((name, kwargs["from_chat_id"], kwargs["message_ids"]))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_messages_are_batched_per_chat(debug_mirror):
+    """
+    Тест проверяет, что сообщения чата уходят одной меткой и одним
+    forward_messages, а при уровне выше MESSAGES ничего не пересылается.
+    """
+    bot = AsyncMock()
+    debug_mirror.forward_to_debug(1, 10)
+    debug_mirror.forward_to_debug(2, 5)
+    debug_mirror.forward_to_debug(1, 12)
+    debug_mirror.forward_to_debug(1, 11)
+
+    await debug_mirror.flush_debug_mirror(bot)
+
+    assert sent_calls(bot) == [
+        ("send_message", -100, "USER1"),
+        ("forward_messages", 1, [10, 11, 12]),
+        ("send_message", -100, "USER2"),
+        ("forward_messages", 2, [5]),
+    ]
+
+    debug_mirror.logger._telegram_level = 30
+    debug_mirror.forward_to_debug(1, 13)
+    await debug_mirror.flush_debug_mirror(bot)
+    assert len(sent_calls(bot)) == 4
+
+
+@pytest.mark.asyncio
+async def test_sampling_under_load(debug_mirror):
+    """
+    Тест проверяет, что при переполненной очереди пересылается только
+    каждое N-е сообщение, а пропущенные считаются в метке.
+    """
+    bot = AsyncMock()
+    for message_id in range(1, 11):
+        debug_mirror.forward_to_debug(1, message_id)
+
+    await debug_mirror.flush_debug_mirror(bot)
+
+    # 4 сообщения до заполнения очереди, затем каждое 3-е из оставшихся 6
+    assert sent_calls(bot) == [
+        ("send_message", -100, "USER1 (пропущено при нагрузке: 4)"),
+        ("forward_messages", 1, [1, 2, 3, 4, 7, 10]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_admin_chat_migration(debug_mirror):
+    """Тест проверяет, что после миграции ADMIN чата пересылка идет в новый чат."""
+    from aiogram.exceptions import TelegramMigrateToChat
+
+    bot = AsyncMock()
+    bot.send_message.side_effect = [
+        TelegramMigrateToChat(method=MagicMock(), message="", migrate_to_chat_id=-200),
+        None,
+        None,
+    ]
+    debug_mirror.forward_to_debug(1, 10)
+    await debug_mirror.flush_debug_mirror(bot)
+    debug_mirror.forward_to_debug(1, 11)
+    await debug_mirror.flush_debug_mirror(bot)
+
+    assert [call for call in sent_calls(bot) if call[0] == "send_message"] == [
+        ("send_message", -100, "USER1"),
+        ("send_message", -200, "USER1"),
+        ("send_message", -200, "USER1"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_resumes_from_failed_batch(debug_mirror):
+    """
+    Тест проверяет, что после TelegramRetryAfter посреди пересылки повторяется
+    только пачка, на которой она остановилась: метка и уже пересланные
+    пачки не дублируются.
+    """
+    from aiogram.exceptions import TelegramRetryAfter
+
+    bot = AsyncMock()
+    bot.forward_messages.side_effect = [
+        None,
+        TelegramRetryAfter(method=MagicMock(), message="", retry_after=0),
+        None,
+        None,
+    ]
+    debug_mirror.DEBUG_MIRROR_MAX_PENDING = 1000
+    message_ids = list(range(1, 251))
+    for message_id in message_ids:
+        debug_mirror.forward_to_debug(1, message_id)
+
+    await debug_mirror.flush_debug_mirror(bot)
+
+    assert sent_calls(bot) == [
+        ("send_message", -100, "USER1"),
+        ("forward_messages", 1, message_ids[:100]),
+        ("forward_messages", 1, message_ids[100:200]),
+        ("forward_messages", 1, message_ids[100:200]),
+        ("forward_messages", 1, message_ids[200:]),
+    ]
@@ -44,7 +44,28 @@ async def test_db():
                 user_id INTEGER NOT NULL,
                 role TEXT NOT NULL,
                 content TEXT NOT NULL,
-                timestamp TEXT NOT NULL
+                timestamp TEXT NOT NULL,
+                created_at INTEGER,
+                content_codec INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS activity_rollup (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day, hour)
+            ) WITHOUT ROWID
+        """)
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS chat_verifications (
+                chat_id INTEGER PRIMARY KEY,
+                verified_by_user_id INTEGER NOT NULL,
+                verified_at TEXT NOT NULL,
+                user_name TEXT
             )
         """)
 
@@ -208,3 +229,51 @@ async def test_get_ids_from_table_returns_all_users(test_db):
     assert 55555 in all_ids, "User1 должен быть в списке"
     assert 66666 in all_ids, "User2 должен быть в списке"
     assert 77777 in all_ids, "User3 должен быть в списке"
+
+
+@pytest.mark.asyncio
+async def test_iter_ids_pages_through_all_conversations(test_db):
+    """
+    Тест проверяет, что iter_ids обходит все беседы по возрастанию ID,
+    даже если их больше размера одной страницы.
+    """
+    ids = [-300, -100, 10, 20, 30, 40, 50]
+    for conversation_id in ids:
+        await Conversation(conversation_id).save_for_db()
+
+    collected = [cid async for cid in Conversation.iter_ids(chunk_size=2)]
+    assert collected == sorted(ids), "Должны получить все ID по возрастанию"
+
+    chunks = [chunk async for chunk in Conversation.iter_id_chunks(chunk_size=3)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1], "Страницы не больше chunk_size"
+
+
+@pytest.mark.asyncio
+async def test_iter_ids_min_id_filters_chats(test_db):
+    """
+    Тест проверяет, что min_id=0 отсекает групповые чаты (отрицательные ID) на стороне SQL.
+    """
+    for conversation_id in (-200, -1, 1, 2, 3):
+        await Conversation(conversation_id).save_for_db()
+
+    user_ids = [cid async for cid in Conversation.iter_ids(min_id=0, chunk_size=2)]
+    assert user_ids == [1, 2, 3], "Должны остаться только личные пользователи"
+
+
+@pytest.mark.asyncio
+async def test_iter_ids_tolerates_deletes_during_iteration(test_db):
+    """
+    Тест проверяет, что удаление бесед во время обхода (как при рассылке
+    заблокировавшим бота) не приводит к пропуску оставшихся ID.
+    """
+    for conversation_id in range(1, 8):
+        await Conversation(conversation_id).save_for_db()
+
+    visited = []
+    async for conversation_id in Conversation.iter_ids(chunk_size=2):
+        visited.append(conversation_id)
+        if conversation_id % 2 == 0:
+            await Conversation(conversation_id).delete_from_db()
+
+    assert visited == list(range(1, 8)), "Все ID должны быть обойдены"
+    assert await Conversation.get_ids_from_table() == [1, 3, 5, 7]
@@ -43,10 +43,22 @@ async def test_db():
                 user_id INTEGER NOT NULL,
                 role TEXT NOT NULL,
                 content TEXT NOT NULL,
-                timestamp TEXT NOT NULL
+                timestamp TEXT NOT NULL,
+                created_at INTEGER,
+                content_codec INTEGER NOT NULL DEFAULT 0
             )
         """)
 
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS activity_rollup (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day, hour)
+            ) WITHOUT ROWID
+        """)
+
         await db.commit()
 
     # Патчим DATABASE_NAME
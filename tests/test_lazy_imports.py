@@ -0,0 +1,55 @@
+"""
+Тесты для отложенной загрузки тяжелых зависимостей при запуске бота.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def run_python(code: str) -> str:
+    """Выполняет код в отдельном процессе и возвращает последнюю строку вывода."""
+    env = dict(os.environ)
+    env.setdefault("TG_TOKEN", "42:test")
+    env["FILE_LOG_LEVEL"] = "DISABLED"
+    env["TELEGRAM_LOG_LEVEL"] = "DISABLED"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_startup_does_not_import_heavy_modules():
+    """
+    Тест проверяет, что импорт приложения (app.py) не загружает matplotlib,
+    OpenCV и NumPy: они импортируются при первом построении графика или
+    обработке медиа.
+    """
+    code = (
+        "import sys, app; "
+        "print(sorted(m for m in ('matplotlib', 'cv2', 'numpy') if m in sys.modules))"
+    )
+
+    assert run_python(code) == "[]"
+
+
+def test_chart_worker_does_not_import_app():
+    """
+    Тест проверяет, что процесс пула графиков (spawn выполняет главный модуль
+    как __mp_main__) не импортирует приложение: бота, обработчики и логирование.
+    """
+    code = (
+        "import runpy, sys; "
+        "runpy.run_path('main.py', run_name='__mp_main__'); "
+        "print(sorted(m for m in ('app', 'aiogram', 'core.config') if m in sys.modules))"
+    )
+
+    assert run_python(code) == "[]"
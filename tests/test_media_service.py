@@ -0,0 +1,238 @@
+"""
+Тесты для сервиса обработки медиа вне event loop.
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def media_service():
+    """Импортирует сервис с замоканной конфигурацией (без файлов логов и .env)."""
+    with patch.dict("sys.modules", {"core.config": MagicMock()}):
+        mock_config = sys.modules["core.config"]
+        mock_config.MEDIA_WORKERS = 2
+        mock_config.MAX_VIDEO_SIZE_MB = 1
+        mock_config.MAX_VIDEO_DURATION = 60
+        mock_config.MAX_IMAGE_SIZE_MB = 1
+        mock_config.VIDEO_MIN_FRAMES = 3
+        mock_config.VIDEO_MAX_FRAMES = 6
+        mock_config.VIDEO_SECONDS_PER_FRAME = 10
+        mock_config.VIDEO_SAMPLE_FPS = 5
+        mock_config.VIDEO_SAMPLING_BUDGET = 10
+        mock_config.VISION_MAX_EDGE = 1024
+        mock_config.VISION_JPEG_QUALITY = 85
+
+        sys.modules.pop("services.media_service", None)
+        yield importlib.import_module("services.media_service")
+
+
+def make_video(frames: int, fps: int = 10, scenes: dict[int, tuple] | None = None) -> bytes:
+    """
+    Создает видео 64x64, залитое одним цветом в пределах сцены.
+
+    Args:
+        frames: Количество кадров
+        fps: Частота кадров
+        scenes: Словарь {номер первого кадра сцены: цвет BGR}
+    """
+    scenes = scenes or {0: (0, 0, 0)}
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video:
+        path = temp_video.name
+    try:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (64, 64))
+        color = scenes[0]
+        for i in range(frames):
+            color = scenes.get(i, color)
+            writer.write(np.full((64, 64, 3), color, dtype=np.uint8))
+        writer.release()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+def test_check_video_limits(media_service):
+    """
+    Тест проверяет отказ для слишком больших и длинных видео.
+    """
+    assert media_service.check_video_limits(1024, 10) is None
+    assert media_service.check_video_limits(None, None) is None
+    assert "МБ" in media_service.check_video_limits(2 * 1024 * 1024, 10)
+    assert "с" in media_service.check_video_limits(1024, 61)
+
+
+@pytest.mark.asyncio
+async def test_extract_key_frames_in_executor(media_service):
+    """
+    Тест проверяет, что кадры извлекаются в пуле потоков, а не в event loop,
+    и что поврежденное видео отклоняется с понятной причиной.
+    """
+    threads = []
+
+    def extract(video_bytes):
+        threads.append(threading.current_thread().name)
+        return media_service.extract_key_frames(video_bytes)
+
+    info = await media_service.run_in_media_executor(extract, make_video(21))
+
+    assert threads[0].startswith("media")
+    assert info["total_frames"] == 21
+    # Сцена одна - берутся равномерно расположенные кадры
+    assert info["frame_indices"] == [0, 10, 20]
+    assert all(frame.startswith(b"\xff\xd8") for frame in info["frames"])
+    assert info["duration"] == 2
+
+    with pytest.raises(media_service.VideoRejectedError):
+        await media_service.run_in_media_executor(
+            media_service.extract_key_frames, b"not a video"
+        )
+
+
+def test_key_frames_follow_scene_changes(media_service):
+    """
+    Тест проверяет, что ключевые кадры выбираются на сменах сцен,
+    а их количество растет с длительностью видео.
+    """
+    # 25 секунд: 3 кадра, сцены меняются на 60 и 180 кадрах (кратны шагу анализа)
+    video = make_video(
+        250, scenes={0: (0, 0, 0), 60: (255, 255, 255), 180: (0, 0, 255)}
+    )
+    info = media_service.extract_key_frames(video)
+
+    assert info["frame_indices"] == [0, 60, 180]
+    assert info["analyzed_frames"] < info["total_frames"]
+    assert info["truncated"] is False
+
+    assert media_service.get_frames_count(None) == 3
+    assert media_service.get_frames_count(45) == 5
+    assert media_service.get_frames_count(600) == 6
+
+
+def test_select_key_frames_keeps_distance(media_service):
+    """
+    Тест проверяет, что близкие смены сцен не выбираются вместе,
+    а недостающие кадры берутся из запасных.
+    """
+    selected = media_service.select_key_frames(
+        first=0,
+        scene_changes={50: 0.9, 52: 0.8, 90: 0.3},
+        fallback=[0, 25, 75, 99],
+        count=4,
+        min_gap=10,
+    )
+    assert selected == [0, 25, 50, 90]
+
+
+def test_prepare_image_for_vision(media_service):
+    """
+    Тест проверяет, что большое изображение уменьшается до VISION_MAX_EDGE
+    и перекодируется в JPEG, а нераспознанные байты возвращаются как есть.
+    """
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (1536, 2048, 3), dtype=np.uint8)
+    png_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+    prepared, image_key = media_service.prepare_image_for_vision(png_bytes)
+    decoded = cv2.imdecode(np.frombuffer(prepared, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    assert prepared.startswith(b"\xff\xd8")
+    assert decoded.shape == (768, 1024, 3)
+    assert len(prepared) < len(png_bytes)
+    # Хэш и размеры исходного изображения - ключ поиска в кэше описаний
+    assert image_key == (media_service.image_hash(image), 2048, 1536)
+
+    assert media_service.prepare_image_for_vision(b"not an image") == (
+        b"not an image",
+        None,
+    )
+
+    # Маленький сильно сжатый JPEG перекодировать невыгодно
+    quality = [cv2.IMWRITE_JPEG_QUALITY, 30]
+    small_jpeg = cv2.imencode(".jpg", image[:300, :400], quality)[1].tobytes()
+    assert media_service.prepare_image_for_vision(small_jpeg)[0] is small_jpeg
+
+
+def test_image_hash_survives_recompression(media_service):
+    """
+    Тест проверяет, что перцептивный хэш совпадает у пересжатой и уменьшенной
+    копии изображения и отличается у другого изображения.
+    """
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.circle(image, (200, 240), 120, (40, 200, 250), -1)
+    cv2.rectangle(image, (380, 80), (600, 400), (250, 80, 30), -1)
+    copy = cv2.imdecode(
+        cv2.imencode(".jpg", cv2.resize(image, (320, 240)), [cv2.IMWRITE_JPEG_QUALITY, 40])[1],
+        cv2.IMREAD_COLOR,
+    )
+
+    assert media_service.image_hash(image) == media_service.image_hash(copy)
+    assert media_service.image_hash(image) != media_service.image_hash(image[:, ::-1])
+    assert -(1 << 63) <= media_service.image_hash(image) < 1 << 63
+
+
+class FakeBot:
+    """Бот-заглушка: отдает файл чанками через download_file(destination=...)."""
+
+    def __init__(self, data: bytes, file_size: int | None):
+        self.data = data
+        self.file_size = file_size
+        self.downloaded = 0
+
+    async def get_file(self, file_id):
+        return SimpleNamespace(file_path="path", file_size=self.file_size)
+
+    async def download_file(self, file_path, destination):
+        for start in range(0, len(self.data), 1000):
+            destination.write(self.data[start : start + 1000])
+            self.downloaded += 1000
+        destination.seek(0)
+        return destination
+
+
+@pytest.mark.asyncio
+async def test_download_media_into_preallocated_buffer(media_service):
+    """
+    Тест проверяет, что файл скачивается в memoryview без копий (в том числе
+    если Telegram не сообщил размер), а слишком большой файл отклоняется
+    до скачивания или прерывается во время скачивания.
+    """
+    data = os.urandom(5500)
+
+    view = await media_service.download_media(FakeBot(data, len(data)), "id", 10_000)
+    assert isinstance(view, memoryview)
+    assert view == data
+
+    view = await media_service.download_media(FakeBot(data, None), "id", 10_000)
+    assert view == data
+
+    bot = FakeBot(data, len(data))
+    with pytest.raises(media_service.MediaTooLargeError):
+        await media_service.download_media(bot, "id", 5000)
+    assert bot.downloaded == 0
+
+    bot = FakeBot(data, 100)  # размер в get_file неверный
+    with pytest.raises(media_service.MediaTooLargeError):
+        await media_service.download_media(bot, "id", 3000)
+    assert bot.downloaded == 3000
+
+
+def test_extract_key_frames_from_memoryview(media_service):
+    """
+    Тест проверяет, что видео читается из memoryview (через файл в памяти).
+    """
+    info = media_service.extract_key_frames(memoryview(make_video(21)))
+    assert info["frame_indices"] == [0, 10, 20]
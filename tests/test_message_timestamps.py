@@ -0,0 +1,140 @@
+"""
+Тесты для времени сообщений в unix-формате (messages.created_at).
+"""
+
+import os
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import aiosqlite
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import database
+from migrations import migration_014_messages_created_at as migration_014
+
+OLD_MESSAGES_SCHEMA = """
+    CREATE TABLE messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    )
+"""
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_message_timestamps.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    with (
+        patch.object(database, "DATABASE_NAME", test_db_name),
+        patch.object(migration_014, "DATABASE_NAME", test_db_name),
+    ):
+        yield test_db_name
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+def epoch(timestamp: str) -> int:
+    return int(
+        datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        .replace(tzinfo=UTC)
+        .timestamp()
+    )
+
+
+async def index_names(db) -> set[str]:
+    cursor = await db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'messages'"
+    )
+    return {row[0] for row in await cursor.fetchall()}
+
+
+@pytest.mark.asyncio
+async def test_migration_backfills_in_chunks(test_db):
+    """
+    Тест проверяет, что миграция 014 заполняет created_at по текстовому
+    timestamp пачками (в том числе с пропусками ID), оставляет NULL для
+    некорректных значений, создает индекс и применяется повторно без ошибок.
+    """
+    timestamps = [f"2025-01-{day:02d} {day:02d}:30:15" for day in range(1, 11)]
+    async with aiosqlite.connect(test_db) as db:
+        await db.execute(OLD_MESSAGES_SCHEMA)
+        await db.executemany(
+            "INSERT INTO messages (user_id, role, content, timestamp) VALUES (1, 'user', '', ?)",
+            [(timestamp,) for timestamp in [*timestamps, "не дата"]],
+        )
+        await db.execute("DELETE FROM messages WHERE id IN (4, 5)")
+        await db.commit()
+
+    with patch.object(migration_014, "CHUNK_SIZE", 3):
+        await migration_014.upgrade()
+        await migration_014.upgrade()
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "SELECT timestamp, created_at FROM messages ORDER BY id"
+        )
+        rows = await cursor.fetchall()
+        assert len(rows) == 9
+        assert rows[-1] == ("не дата", None)
+        assert all(
+            created_at == epoch(timestamp) for timestamp, created_at in rows[:-1]
+        )
+
+        assert await index_names(db) == {"idx_messages_user_id_role_created_at"}
+
+
+@pytest.mark.asyncio
+async def test_last_activity_uses_created_at(test_db):
+    """
+    Тест проверяет, что update_prompt записывает created_at, а последняя
+    активность берется из покрывающего индекса без разбора строк: учитываются
+    только сообщения пользователя, сообщения без created_at пропускаются.
+    """
+    await database.check_db()
+    await migration_014.upgrade()
+
+    started = int(time.time())
+    conversation = database.Conversation(1, "user1")
+    await conversation.save_for_db()
+    await conversation.update_prompt("user", "привет")
+    await conversation.update_prompt("assistant", "ответ")
+
+    async with aiosqlite.connect(test_db) as db:
+        await db.executemany(
+            "INSERT INTO messages (user_id, role, content, timestamp, created_at) "
+            "VALUES (?, ?, '', '', ?)",
+            [(1, "user", started - 60), (2, "user", None), (3, "user", 1_700_000_000)],
+        )
+        await db.commit()
+
+        cursor = await db.execute(
+            "SELECT created_at FROM messages WHERE user_id = 1 ORDER BY id"
+        )
+        user_message, assistant_message, _ = [row[0] for row in await cursor.fetchall()]
+        assert started <= user_message <= assistant_message <= time.time()
+
+        cursor = await db.execute(
+            "EXPLAIN QUERY PLAN SELECT user_id, MAX(created_at) FROM messages "
+            "WHERE user_id IN (1, 2) AND role = 'user' GROUP BY user_id"
+        )
+        plan = " ".join(row[-1] for row in await cursor.fetchall())
+        assert "COVERING INDEX idx_messages_user_id_role_created_at" in plan
+
+    assert await database.Conversation.get_last_activity([1, 2, 3, 4]) == {
+        1: user_message,
+        3: 1_700_000_000,
+    }
@@ -0,0 +1,135 @@
+"""
+Тесты для массового удаления бесед (Conversation.delete_many) и фонового
+удаления после рассылки.
+"""
+
+import importlib
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import aiosqlite
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import database
+from core.database import ChatVerification, Conversation
+from core.verification_index import verification_index
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_purge_service.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    with patch.object(database, "DATABASE_NAME", test_db_name):
+        await database.check_db()
+        yield test_db_name
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+@pytest.fixture
+def purge_service(monkeypatch):
+    """Импортирует сервис с замоканной конфигурацией (без файлов логов и .env)."""
+    monkeypatch.setitem(sys.modules, "core.config", MagicMock())
+    sys.modules.pop("services.purge_service", None)
+    yield importlib.import_module("services.purge_service")
+    sys.modules.pop("services.purge_service", None)
+
+
+async def create_conversations(ids: list[int]):
+    for conversation_id in ids:
+        conversation = Conversation(conversation_id, f"user{conversation_id}")
+        await conversation.save_for_db()
+        await conversation.update_prompt("user", "привет")
+        await conversation.update_prompt("assistant", "ответ")
+
+
+async def count_by_id(db_name: str, table: str, column: str) -> dict[int, int]:
+    async with aiosqlite.connect(db_name) as db:
+        cursor = await db.execute(
+            f"SELECT {column}, COUNT(*) FROM {table} GROUP BY {column}"
+        )
+        return dict(await cursor.fetchall())
+
+
+@pytest.mark.asyncio
+async def test_delete_many_removes_all_data_in_chunks(test_db):
+    """
+    Тест проверяет, что delete_many удаляет пачками беседы, их сообщения
+    (в том числе без записи в conversations), счетчики activity_rollup
+    и верификацию чата, не трогая остальные беседы и общие счетчики бота,
+    и обновляет индекс верификации.
+    """
+    await create_conversations([-100, 1, 2, 3, 4, 5, 6])
+    await Conversation(99).update_prompt("user", "сообщение без беседы")
+    await ChatVerification(-100, 1, "2025-01-01 00:00:00", "user1").save_to_db()
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM activity_rollup WHERE user_id = ?",
+            (database.ACTIVITY_TOTAL_ID,),
+        )
+        total_rows = (await cursor.fetchone())[0]
+    await database.load_verification_index()
+    assert verification_index.is_chat_verified(-100)
+
+    deleted = await Conversation.delete_many({-100, 2, 3, 5, 99, 12345}, chunk_size=2)
+
+    assert deleted == 4
+    assert await Conversation.get_ids_from_table() == [1, 4, 6]
+    assert await count_by_id(test_db, "messages", "user_id") == {1: 2, 4: 2, 6: 2}
+    rollup = await count_by_id(test_db, "activity_rollup", "user_id")
+    assert rollup == {database.ACTIVITY_TOTAL_ID: total_rows, 1: 1, 4: 1, 6: 1}
+    assert await count_by_id(test_db, "chat_verifications", "chat_id") == {}
+    assert not verification_index.is_chat_verified(-100)
+    assert not verification_index.conversation_exists(2)
+    assert verification_index.conversation_exists(1)
+
+
+@pytest.mark.asyncio
+async def test_delete_many_runs_foreign_key_cascade(test_db):
+    """
+    Тест проверяет, что удаление выполняется с PRAGMA foreign_keys = ON:
+    строки таблиц с ON DELETE CASCADE удаляются вместе с беседой.
+    """
+    await create_conversations([1, 2])
+    async with aiosqlite.connect(test_db) as db:
+        await db.execute(
+            """
+            CREATE TABLE notes (
+                conversation_id INTEGER REFERENCES conversations (id) ON DELETE CASCADE
+            )
+            """
+        )
+        await db.executemany("INSERT INTO notes VALUES (?)", [(1,), (2,)])
+        await db.commit()
+
+    await Conversation(2).delete_from_db()
+
+    assert await count_by_id(test_db, "notes", "conversation_id") == {1: 1}
+
+
+@pytest.mark.asyncio
+async def test_schedule_purge_runs_in_background(purge_service, test_db):
+    """
+    Тест проверяет, что schedule_purge удаляет беседы фоновой задачей,
+    возвращает количество удаленных и wait_for_purges дожидается всех задач.
+    """
+    await create_conversations([1, 2, 3, 4])
+
+    first = purge_service.schedule_purge([1, 2], "Рассылка")
+    second = purge_service.schedule_purge([3, 42], "Рассылка")
+    assert not first.done()
+
+    await purge_service.wait_for_purges()
+    assert (first.result(), second.result()) == (2, 1)
+    assert not purge_service._jobs
+    assert await Conversation.get_ids_from_table() == [4]
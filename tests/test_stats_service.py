@@ -0,0 +1,348 @@
+"""
+Тесты для сервиса статистики (/stats).
+"""
+
+import importlib
+import os
+import random
+import sys
+from collections import defaultdict
+from datetime import UTC, date, datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiosqlite
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import database
+from migrations import migration_013_activity_rollup
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@pytest.fixture
+def stats_service(monkeypatch):
+    """
+    Импортирует сервис с замоканной конфигурацией (без файлов логов и .env).
+
+    Подменяется только core.config: модули, загруженные при импорте сервиса
+    (matplotlib, multiprocessing), должны остаться в sys.modules для пула
+    процессов.
+    """
+    mock_config = MagicMock()
+    mock_config.STATS_RENDER_WORKERS = 1
+    mock_config.STATS_CHART_CACHE_SIZE = 2
+    monkeypatch.setitem(sys.modules, "core.config", mock_config)
+
+    sys.modules.pop("services.stats_service", None)
+    stats_service = importlib.import_module("services.stats_service")
+    yield stats_service
+    stats_service.shutdown_chart_pool()
+    sys.modules.pop("services.stats_service", None)
+
+
+@pytest.fixture
+async def test_db(stats_service):
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_stats_service.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    with (
+        patch.object(database, "DATABASE_NAME", test_db_name),
+        patch.object(stats_service, "DATABASE_NAME", test_db_name),
+        patch.object(migration_013_activity_rollup, "DATABASE_NAME", test_db_name),
+        # День и час activity_rollup - как в timestamp (UTC)
+        patch.object(database, "TIMEZONE_OFFSET", 0),
+        patch.object(migration_013_activity_rollup, "TIMEZONE_OFFSET", 0),
+    ):
+        await database.check_db()
+        yield test_db_name
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+async def add_messages(db_name: str, rows: list[tuple[int, str, str]]):
+    """
+    Добавляет сообщения (user_id, role, timestamp) в БД напрямую и заполняет
+    activity_rollup по истории, как миграция 013.
+    """
+    async with aiosqlite.connect(db_name) as db:
+        await db.executemany(
+            "INSERT INTO messages (user_id, role, content, timestamp) VALUES (?, ?, '', ?)",
+            rows,
+        )
+        await db.commit()
+    await migration_013_activity_rollup.upgrade()
+
+
+def as_day_hour_counts(activity) -> dict[date, list[int]]:
+    """Переводит счетчики get_activity_counts в {дата: [сообщений в 0, ..., 23 час]}."""
+    day_hour_counts = {}
+    for day, hour, count in zip(*activity, strict=True):
+        day_hour_counts.setdefault(
+            date.fromordinal(EPOCH_ORDINAL + int(day)), [0] * 24
+        )[hour] = int(count)
+    return day_hour_counts
+
+
+@pytest.mark.asyncio
+async def test_activity_counts_from_rollup(stats_service, test_db):
+    """
+    Тест проверяет подсчет сообщений по дням и часам из activity_rollup,
+    заполненной по истории: учитываются только сообщения пользователей
+    с корректным timestamp, фильтр по пользователю.
+    """
+    await add_messages(
+        test_db,
+        [
+            (1, "user", "2025-01-06 10:15:00"),
+            (1, "user", "2025-01-06 10:45:00"),
+            (1, "assistant", "2025-01-06 10:46:00"),
+            (1, "user", "2025-01-07 23:59:59"),
+            (2, "user", "2025-01-06 00:00:01"),
+            (2, "user", "не дата"),
+        ],
+    )
+
+    counts = as_day_hour_counts(await stats_service.get_activity_counts())
+    assert set(counts) == {date(2025, 1, 6), date(2025, 1, 7)}
+    assert counts[date(2025, 1, 6)][10] == 2
+    assert counts[date(2025, 1, 6)][0] == 1
+    assert sum(counts[date(2025, 1, 6)]) == 3
+    assert counts[date(2025, 1, 7)][23] == 1
+
+    assert as_day_hour_counts(await stats_service.get_activity_counts(user_id=2)) == {
+        date(2025, 1, 6): [1] + [0] * 23
+    }
+
+    # Счетчики читаются по первичному ключу, без обращения к messages
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "EXPLAIN QUERY PLAN SELECT day, hour, count FROM activity_rollup "
+            "WHERE user_id = ?",
+            (database.ACTIVITY_TOTAL_ID,),
+        )
+        plan = " ".join(row[-1] for row in await cursor.fetchall())
+        assert "USING PRIMARY KEY (user_id=?)" in plan
+
+
+@pytest.mark.asyncio
+async def test_rollup_survives_history_trimming(stats_service, test_db):
+    """
+    Тест проверяет, что activity_rollup обновляется при записи сообщений
+    и статистика не меняется при удалении старых сообщений по MAX_STORAGE.
+    """
+    conversation = database.Conversation(1, "user1")
+    await conversation.save_for_db()
+    with patch.object(database, "MAX_STORAGE", 3):
+        for i in range(5):
+            await conversation.update_prompt("user", f"вопрос {i}")
+            await conversation.update_prompt("assistant", f"ответ {i}")
+    await database.Conversation(2, "user2").update_prompt("user", "привет")
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM messages WHERE user_id = 1")
+        assert (await cursor.fetchone())[0] == 3
+
+    _, _, user_counts = await stats_service.get_activity_counts(user_id=1)
+    assert user_counts.sum() == 5
+    total_counts = as_day_hour_counts(await stats_service.get_activity_counts())
+    assert sum(map(sum, total_counts.values())) == 6
+
+    # Удаление беседы убирает ее счетчики, общая активность бота сохраняется
+    await conversation.delete_from_db()
+    _, _, user_counts = await stats_service.get_activity_counts(user_id=1)
+    assert user_counts.size == 0
+    assert as_day_hour_counts(await stats_service.get_activity_counts()) == total_counts
+
+
+@pytest.mark.asyncio
+async def test_rollup_uses_timezone_offset(stats_service, test_db):
+    """
+    Тест проверяет, что день и час activity_rollup считаются в часовом поясе
+    TIMEZONE_OFFSET и при записи сообщения, и при заполнении по истории.
+    """
+    with patch.object(migration_013_activity_rollup, "TIMEZONE_OFFSET", 3):
+        await add_messages(test_db, [(1, "user", "2025-01-07 22:30:00")])
+
+    with (
+        patch.object(database, "TIMEZONE_OFFSET", 3),
+        patch.object(database, "datetime") as mock_datetime,
+    ):
+        mock_datetime.now.return_value = datetime(2025, 1, 7, 21, 30, tzinfo=UTC)
+        await database.Conversation(2, "user2").update_prompt("user", "привет")
+
+    assert as_day_hour_counts(await stats_service.get_activity_counts(user_id=1)) == {
+        date(2025, 1, 8): [0, 1] + [0] * 22
+    }
+    assert as_day_hour_counts(await stats_service.get_activity_counts(user_id=2)) == {
+        date(2025, 1, 8): [1] + [0] * 23
+    }
+
+
+@pytest.mark.asyncio
+async def test_user_stats_totals(stats_service, test_db):
+    """Тест проверяет общее количество сообщений и построение графиков."""
+    await add_messages(
+        test_db,
+        [(1, "user", f"2025-01-{day:02d} 12:00:00") for day in range(6, 13)],
+    )
+
+    stats = await stats_service.generate_user_stats(user_id=1)
+    hourly, weekly, total_messages, total_users = stats
+    assert total_messages == 7
+    assert total_users is None
+    assert hourly.getvalue().startswith(b"\x89PNG")
+    assert weekly.getvalue().startswith(b"\x89PNG")
+
+    assert await stats_service.generate_user_stats(user_id=3) == (None, None, 0, None)
+
+
+def reference_averages(day_hour_counts: dict[date, list[int]]):
+    """Прежний расчет средних для графиков в Python (для сравнения с NumPy)."""
+    num_days = len(day_hour_counts) if day_hour_counts else 1
+    hourly = [
+        sum(day_data[h] for day_data in day_hour_counts.values()) / num_days
+        for h in range(24)
+    ]
+
+    week_weekday_counts = defaultdict(lambda: defaultdict(int))
+    for day, day_data in day_hour_counts.items():
+        iso_year, iso_week, _ = day.isocalendar()
+        week_weekday_counts[(iso_year, iso_week)][day.weekday()] += sum(day_data)
+    weekday_totals = defaultdict(list)
+    for week_data in week_weekday_counts.values():
+        for weekday in range(7):
+            weekday_totals[weekday].append(week_data.get(weekday, 0))
+    num_weeks = len(week_weekday_counts) if week_weekday_counts else 1
+    weekly = [
+        sum(weekday_totals[d]) / num_weeks if weekday_totals[d] else 0 for d in range(7)
+    ]
+    return hourly, weekly
+
+
+@pytest.mark.asyncio
+async def test_averages_match_python_calculation(stats_service, test_db):
+    """
+    Тест проверяет, что средние по часам и дням недели, посчитанные NumPy,
+    в точности совпадают с прежним расчетом в Python (включая переход через
+    год и ISO недели на границе лет), для всех пользователей и для одного.
+    """
+    rng = random.Random(1)
+    first_day = date(2024, 12, 1)
+    rows = [
+        (
+            rng.randint(1, 5),
+            "user",
+            f"{date.fromordinal(first_day.toordinal() + rng.randint(0, 60))} "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+        )
+        for _ in range(3000)
+    ]
+    await add_messages(test_db, rows)
+
+    for user_id in (None, 3):
+        activity = await stats_service.get_activity_counts(user_id)
+        hourly, weekly = reference_averages(as_day_hour_counts(activity))
+        days, hours, counts = activity
+        assert stats_service.hourly_averages(days, hours, counts) == hourly
+        assert stats_service.weekday_averages(days, counts) == weekly
+
+    empty = await stats_service.get_activity_counts(user_id=42)
+    assert stats_service.hourly_averages(*empty) == [0.0] * 24
+    assert stats_service.weekday_averages(empty[0], empty[2]) == [0.0] * 7
+
+
+def reference_top_users(rows, names, limit):
+    """Прежний расчет топа в Python (для сравнения с SQL)."""
+    by_user = defaultdict(lambda: defaultdict(int))
+    for user_id, role, timestamp in rows:
+        if user_id > 0 and role == "user" and user_id in names:
+            by_user[user_id][timestamp[:10]] += 1
+
+    result = []
+    for user_id, days in by_user.items():
+        if len(days) < 5:
+            continue
+        total = sum(days.values())
+        avg = total / len(days)
+        result.append(
+            {
+                "user_id": user_id,
+                "username": names[user_id],
+                "total_messages": total,
+                "days_active": len(days),
+                "avg_messages_per_day": avg,
+                "max_messages_per_day": max(days.values()),
+                "score": avg * 0.6 + max(days.values()) * 0.4,
+            }
+        )
+    result.sort(key=lambda x: (-x["score"], x["user_id"]))
+    return result[:limit]
+
+
+@pytest.mark.asyncio
+async def test_top_active_users_single_query(stats_service, test_db):
+    """
+    Тест проверяет, что топ активных пользователей, посчитанный одним
+    SQL-запросом, совпадает с прежним расчетом в Python: только личные чаты,
+    минимум 5 дней активности, сортировка по баллу и LIMIT.
+    """
+    rng = random.Random(0)
+    names = {user_id: f"user{user_id}" for user_id in range(1, 40)}
+    names[-100] = "группа"
+    for user_id, name in names.items():
+        await database.Conversation(user_id, name).save_for_db()
+
+    rows = [
+        (
+            rng.choice([*names, 99]),
+            rng.choice(["user", "user", "assistant"]),
+            f"2025-02-{rng.randint(1, 9):02d} {rng.randint(0, 23):02d}:00:00",
+        )
+        for _ in range(2000)
+    ]
+    await add_messages(test_db, rows)
+
+    top_users = await stats_service.get_top_active_users(limit=10)
+
+    assert len(top_users) == 10
+    assert all(user["user_id"] > 0 for user in top_users)
+    assert top_users == pytest.approx(reference_top_users(rows, names, 10))
+
+
+@pytest.mark.asyncio
+async def test_charts_are_cached_until_activity_changes(stats_service, test_db):
+    """
+    Тест проверяет, что графики строятся в пуле процессов один раз и берутся
+    из кэша, пока счетчики activity_rollup не изменились.
+    """
+    conversation = database.Conversation(1, "user1")
+    await conversation.save_for_db()
+    await conversation.update_prompt("user", "привет")
+
+    render = AsyncMock(side_effect=stats_service.run_in_chart_pool)
+    with patch.object(stats_service, "run_in_chart_pool", render):
+        first = await stats_service.generate_user_stats(user_id=1)
+        second = await stats_service.generate_user_stats(user_id=1)
+        assert render.await_count == 2
+        assert second[0].getvalue() == first[0].getvalue()
+        assert second[1].getvalue() == first[1].getvalue()
+
+        # Новое сообщение меняет счетчики - графики перестраиваются
+        await conversation.update_prompt("user", "еще вопрос")
+        third = await stats_service.generate_user_stats(user_id=1)
+        assert render.await_count == 4
+        assert third[2] == 2
+
+    # Кэш ограничен STATS_CHART_CACHE_SIZE наборами, вытесняются давно запрошенные
+    stats_service._chart_cache.update({5: (0, b"", b""), 6: (0, b"", b"")})
+    await database.Conversation(2, "user2").update_prompt("user", "привет")
+    await stats_service.generate_user_stats(user_id=2)
+    assert list(stats_service._chart_cache) == [6, 2]
@@ -0,0 +1,327 @@
+"""
+Тесты для сервиса проверки подписок на обязательные каналы.
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aiosqlite
+from aiogram.exceptions import TelegramRetryAfter
+
+from core import database
+from core.database import ChatVerification, Conversation
+
+CHANNELS = ["@channel1", "@channel2"]
+
+
+class FakeBot:
+    """Бот-заглушка: отвечает на get_chat_member по заданной карте подписок."""
+
+    def __init__(self, subscriptions: dict[int, set[str]], delay: float = 0.01):
+        self.subscriptions = subscriptions
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        subscribed = chat_id in self.subscriptions.get(user_id, set())
+        return SimpleNamespace(status="member" if subscribed else "left")
+
+
+class FloodedBot:
+    """Бот-заглушка: на каждый get_chat_member отвечает TelegramRetryAfter."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        raise TelegramRetryAfter(MagicMock(), "Too Many Requests", retry_after=0)
+
+
+@pytest.fixture
+def subscription_service():
+    """Импортирует сервис с замоканной конфигурацией (без файлов логов и .env)."""
+    with patch.dict("sys.modules", {"core.config": MagicMock()}):
+        mock_config = sys.modules["core.config"]
+        mock_config.REQUIRED_CHANNELS = CHANNELS
+        mock_config.SUBSCRIPTION_CACHE_TTL = 600
+        mock_config.SUBSCRIPTION_CHECK_CONCURRENCY = 2
+        mock_config.SUBSCRIPTION_CHECK_INTERVAL = 1800
+        mock_config.SUBSCRIPTION_RECONCILE_INTERVAL = 86400
+        mock_config.SUBSCRIPTION_SCHEDULER_TICK = 10
+        mock_config.logger = MagicMock()
+
+        sys.modules.pop("services.subscription_service", None)
+        yield importlib.import_module("services.subscription_service")
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_subscription_service.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    original_db = database.DATABASE_NAME
+    database.DATABASE_NAME = test_db_name
+    await database.check_db()
+
+    yield test_db_name
+
+    database.DATABASE_NAME = original_db
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+@pytest.mark.asyncio
+async def test_checks_are_bounded_and_cached(subscription_service):
+    """
+    Тест проверяет, что каналы проверяются параллельно не больше
+    SUBSCRIPTION_CHECK_CONCURRENCY запросов одновременно, а повторная
+    проверка берется из кэша без обращения к Telegram.
+    """
+    bot = FakeBot({1: set(CHANNELS), 2: {"@channel1"}, 3: set()})
+
+    results = await asyncio.gather(
+        *(subscription_service.is_user_subscribed_to_all(bot, uid) for uid in (1, 2, 3))
+    )
+    assert results == [True, False, False]
+    assert bot.calls == 6, "Каждая пара (канал, пользователь) проверяется один раз"
+    assert bot.max_in_flight <= 2, "Одновременных запросов не больше лимита"
+
+    assert await subscription_service.is_user_subscribed_to_all(bot, 2) is False
+    assert bot.calls == 6, "Повторная проверка должна браться из кэша"
+
+    # Без кэша - всегда спрашиваем Telegram
+    bot.subscriptions[2] = set(CHANNELS)
+    assert (
+        await subscription_service.is_user_subscribed_to_all(bot, 2, use_cache=False)
+        is True
+    )
+    assert bot.calls == 8
+
+
+@pytest.mark.asyncio
+async def test_sweep_updates_changed_statuses(subscription_service, test_db):
+    """
+    Тест проверяет, что обход пользователей записывает изменившиеся статусы
+    и время следующей проверки, считает отписавшихся и не трогает групповые чаты.
+    """
+    await Conversation(1, subscription_verified=1).save_for_db()  # останется подписан
+    await Conversation(2, subscription_verified=1).save_for_db()  # отписался
+    await Conversation(3, subscription_verified=None).save_for_db()  # подписался
+    await Conversation(-100, subscription_verified=None).save_for_db()  # чат
+
+    bot = FakeBot({1: set(CHANNELS), 3: set(CHANNELS)})
+    now = 1_000_000
+    stats = await subscription_service.sweep_user_subscriptions(bot, now=now)
+
+    assert stats == {"checked": 3, "subscribed": 2, "not_subscribed": 1, "unsubscribed": 1}
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "SELECT id, subscription_verified, next_check_at FROM conversations ORDER BY id"
+        )
+        rows = await cursor.fetchall()
+
+    assert [row[:2] for row in rows] == [(-100, None), (1, 1), (2, 0), (3, 1)]
+    assert rows[0][2] is None
+    assert all(next_check_at > now for _, _, next_check_at in rows[1:])
+    # Планировщик не проверяет только что проверенных пользователей повторно
+    assert await Conversation.get_due_for_subscription_check(now, 10) == []
+
+
+@pytest.mark.asyncio
+async def test_sweep_removes_chat_verification(subscription_service, test_db):
+    """
+    Тест проверяет, что верификация чата удаляется, если верификатор отписался.
+    """
+    for chat_id, verifier_id in ((-1, 10), (-2, 20)):
+        await Conversation(chat_id).save_for_db()
+        await ChatVerification(chat_id, verifier_id, "2025-01-01 00:00:00", "U").save_to_db()
+
+    bot = FakeBot({10: set(CHANNELS)})
+    stats = await subscription_service.sweep_chat_verifications(bot)
+
+    assert stats == {"checked": 2, "verified": 1, "removed": 1}
+    assert await ChatVerification.is_chat_verified(-1) is True
+    assert await ChatVerification.is_chat_verified(-2) is False
+
+
+@pytest.mark.asyncio
+async def test_scheduler_checks_due_users_in_small_batches(subscription_service, test_db):
+    """
+    Тест проверяет, что планировщик проверяет за шаг только порцию пользователей,
+    начиная с никогда не проверявшихся, и сохраняет время следующей проверки.
+    """
+    now = 1_700_000_000
+    for user_id in range(1, 11):
+        await Conversation(user_id).save_for_db()
+
+    # Пользователь 1 недавно писал, остальные - нет
+    conversation = Conversation(1)
+    await conversation.update_prompt("user", "привет")
+
+    bot = FakeBot({uid: set(CHANNELS) for uid in range(1, 11)})
+
+    # 10 пользователей, интервал 100 сек, шаг 20 сек -> порция из 2 пользователей
+    checked = await subscription_service.check_due_subscriptions(
+        bot, base_interval=100, tick=20, now=now
+    )
+    assert checked == 2
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "SELECT id, subscription_verified, next_check_at FROM conversations "
+            "WHERE next_check_at IS NOT NULL ORDER BY id"
+        )
+        rows = await cursor.fetchall()
+
+    assert [row[0] for row in rows] == [1, 2]
+    assert all(row[1] == 1 for row in rows)
+
+    # Все остальные проверяются на следующих шагах, повторно никто не проверяется
+    for _ in range(4):
+        await subscription_service.check_due_subscriptions(
+            bot, base_interval=100, tick=20, now=now
+        )
+    assert (
+        await subscription_service.check_due_subscriptions(
+            bot, base_interval=100, tick=20, now=now
+        )
+        == 0
+    )
+
+
+def test_inactive_users_are_checked_less_often(subscription_service):
+    """
+    Тест проверяет, что давно неактивных пользователей проверяют реже активных.
+    """
+    now = 1_700_000_000
+    base = 1000
+
+    active = subscription_service.compute_next_check_at(now, now - 60, base)
+    week_idle = subscription_service.compute_next_check_at(now, now - 3 * 86400, base)
+    never = subscription_service.compute_next_check_at(now, None, base)
+
+    assert now + 0.9 * base <= active <= now + 1.1 * base
+    assert active < week_idle < never
+
+
+def test_match_required_channel(subscription_service):
+    """
+    Тест проверяет сопоставление чата из события с REQUIRED_CHANNELS.
+    """
+    assert subscription_service.match_required_channel(-1001, "Channel1") == "@channel1"
+    assert subscription_service.match_required_channel(-1002, "other") is None
+    assert subscription_service.match_required_channel(-1003, None) is None
+
+
+@pytest.mark.asyncio
+async def test_membership_event_updates_status_without_polling(
+    subscription_service, test_db
+):
+    """
+    Тест проверяет, что событие chat_member обновляет статус подписки,
+    а при отписке снимает верификацию чатов этого пользователя.
+    """
+    await Conversation(7, subscription_verified=None).save_for_db()
+    await Conversation(-5).save_for_db()
+    await ChatVerification(-5, 7, "2025-01-01 00:00:00", "U").save_to_db()
+
+    bot = FakeBot({7: set(CHANNELS)})
+
+    # Подписка на второй канал уже известна из кэша - Telegram не опрашиваем
+    subscription_service.remember_membership("@channel2", 7, True)
+    status = await subscription_service.apply_membership_change(
+        bot, "@channel1", 7, True
+    )
+    assert status == 1
+    assert bot.calls == 0
+
+    status = await subscription_service.apply_membership_change(
+        bot, "@channel2", 7, False
+    )
+    assert status == 0
+    assert await ChatVerification.is_chat_verified(-5) is False
+
+    conversation = Conversation(7)
+    await conversation.get_from_db()
+    assert conversation.subscription_verified == 0
+
+    # Пользователя нет в БД - событие пропускается
+    assert (
+        await subscription_service.apply_membership_change(bot, "@channel1", 999, False)
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_membership_event_of_unknown_user_is_ignored(
+    subscription_service, test_db
+):
+    """
+    Тест проверяет, что вступление в канал пользователя, который не пользуется
+    ботом, не вызывает запросов к Bot API и записи в БД.
+    """
+    bot = FakeBot({})
+
+    with patch.object(ChatVerification, "delete_by_verifier") as delete_by_verifier:
+        status = await subscription_service.apply_membership_change(
+            bot, "@channel1", 12345, True
+        )
+
+    assert status is None
+    assert bot.calls == 0
+    delete_by_verifier.assert_not_called()
+    assert subscription_service.get_cached_membership("@channel1", 12345) is None
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_keeps_subscription_status(subscription_service, test_db):
+    """
+    Тест проверяет, что если лимит запросов не снят за RETRY_AFTER_ATTEMPTS
+    попыток, подписчик не считается отписанным: обход и планировщик оставляют
+    статус как есть, а планировщик переносит проверку на базовый интервал.
+    """
+    now = 1_700_000_000
+    await Conversation(1, subscription_verified=1).save_for_db()
+    bot = FloodedBot()
+
+    with pytest.raises(TelegramRetryAfter):
+        await subscription_service.is_user_subscribed_to_all(bot, 1)
+    assert bot.calls == len(CHANNELS) * subscription_service.RETRY_AFTER_ATTEMPTS
+
+    stats = await subscription_service.sweep_user_subscriptions(bot)
+    assert stats["checked"] == 0
+
+    checked = await subscription_service.check_due_subscriptions(
+        bot, base_interval=100, tick=20, now=now
+    )
+    assert checked == 1
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute(
+            "SELECT subscription_verified, next_check_at FROM conversations"
+        )
+        assert await cursor.fetchall() == [(1, now + 100)]
@@ -0,0 +1,138 @@
+"""
+Тесты для пакетной отправки логов в Telegram.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def config():
+    """Импортирует конфигурацию без файлов логов и отправки в Telegram."""
+    env = {"FILE_LOG_LEVEL": "DISABLED", "TELEGRAM_LOG_LEVEL": "DISABLED"}
+    with patch.dict(os.environ, env), patch.dict("sys.modules"):
+        sys.modules.pop("core.config", None)
+        yield importlib.import_module("core.config")
+
+
+def make_handler(config, **kwargs):
+    """Создает handler с замоканным ботом."""
+    bot = AsyncMock()
+    handler = config.TelegramLogsHandler(bot, 123, **kwargs)
+    handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    return handler, bot
+
+
+def make_record(message, level=logging.ERROR):
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def sent_texts(bot):
+    return [call.args[1] for call in bot.send_message.await_args_list]
+
+
+@pytest.mark.asyncio
+async def test_repeated_records_are_collapsed(config):
+    """
+    Тест проверяет, что emit ничего не отправляет сам, а одинаковые записи
+    уходят одним сообщением с пометкой ×N.
+    """
+    handler, bot = make_handler(config)
+
+    for _ in range(37):
+        handler.handle(make_record("Connection timeout"))
+    handler.handle(make_record("Другая ошибка", logging.WARNING))
+    bot.send_message.assert_not_awaited()
+
+    await handler.flush_pending()
+
+    assert sent_texts(bot) == ["ERROR: Connection timeout ×37\nWARNING: Другая ошибка"]
+
+    # Очередь очищена - повторная отправка ничего не шлет
+    await handler.flush_pending()
+    assert bot.send_message.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_overflow_is_dropped_and_counted(config):
+    """Тест проверяет, что записи сверх размера очереди отбрасываются и считаются."""
+    handler, bot = make_handler(config, queue_size=3)
+
+    # emit можно вызывать из других потоков
+    threads = [
+        threading.Thread(target=handler.handle, args=(make_record(f"ошибка {i}"),))
+        for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Повтор уже стоящей в очереди записи не отбрасывается
+    first = next(iter(handler._pending)).split(": ", 1)[1]
+    handler.handle(make_record(first))
+
+    await handler.flush_pending()
+
+    (text,) = sent_texts(bot)
+    lines = text.split("\n")
+    assert len(lines) == 4
+    assert lines[0].endswith("×2")
+    assert lines[-1] == "⚠️ Пропущено записей лога (переполнение очереди): 7"
+    assert handler.dropped_total == 7
+
+
+def test_pack_messages_respects_limit(config):
+    """Тест проверяет склейку записей в сообщения и разбиение длинных записей."""
+    pack = config.TelegramLogsHandler.pack_messages
+
+    assert pack(["a" * 4, "b" * 4, "c" * 4], limit=10) == ["aaaa\nbbbb", "cccc"]
+    assert pack(["x" * 25], limit=10) == ["x" * 10, "x" * 10, "x" * 5]
+    assert all(len(m) <= 4096 for m in pack(["y" * 3000] * 5))
+
+
+@pytest.mark.asyncio
+async def test_background_flush_and_stop(config):
+    """
+    Тест проверяет, что фоновая задача отправляет записи по таймеру,
+    а stop() досылает оставшиеся.
+    """
+    handler, bot = make_handler(config, flush_interval=0.01)
+    handler.start()
+
+    handler.handle(make_record("первая"))
+    await asyncio.sleep(0.05)
+    assert sent_texts(bot) == ["ERROR: первая"]
+
+    handler.handle(make_record("последняя"))
+    await handler.stop()
+    assert sent_texts(bot) == ["ERROR: первая", "ERROR: последняя"]
+
+
+@pytest.mark.asyncio
+async def test_add_telegram_handler_replaces_previous(config):
+    """Тест проверяет, что перезапуск main не дублирует Telegram handler."""
+    logger = logging.getLogger("test_telegram_logs_handler")
+    logger._telegram_level = logging.ERROR
+
+    first = config.add_telegram_handler(logger, AsyncMock())
+    second = config.add_telegram_handler(logger, AsyncMock())
+    try:
+        handlers = [
+            h for h in logger.handlers if isinstance(h, config.TelegramLogsHandler)
+        ]
+        assert handlers == [second]
+    finally:
+        await first.stop()
+        await second.stop()
+        logger.removeHandler(second)
@@ -0,0 +1,110 @@
+"""
+Тесты для индекса верификации в памяти (SubscriptionMiddleware без запросов к БД).
+"""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import database
+from core.database import ChatVerification, Conversation
+from core.verification_index import verification_index
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД и индекса."""
+    test_db_name = "test_verification_index.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    original_db = database.DATABASE_NAME
+    database.DATABASE_NAME = test_db_name
+    await database.check_db()
+    await database.load_verification_index()
+
+    yield test_db_name
+
+    database.DATABASE_NAME = original_db
+    verification_index.replace({}, set())
+    verification_index.loaded = False
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+@pytest.mark.asyncio
+async def test_index_loads_existing_data(test_db):
+    """
+    Тест проверяет, что индекс загружается из БД при старте.
+    """
+    await Conversation(1, subscription_verified=0).save_for_db()
+    await Conversation(2, subscription_verified=1).save_for_db()
+    await Conversation(-10).save_for_db()
+    await ChatVerification(-10, 2, "2025-01-01 00:00:00", "U").save_to_db()
+
+    # Сбрасываем индекс и загружаем заново, как при перезапуске
+    verification_index.replace({}, set())
+    assert await database.load_verification_index() == (3, 1)
+
+    assert verification_index.conversation_exists(1)
+    assert verification_index.is_unsubscribed(1)
+    assert not verification_index.is_unsubscribed(2)
+    assert verification_index.is_chat_verified(-10)
+    assert not verification_index.conversation_exists(3)
+
+
+@pytest.mark.asyncio
+async def test_conversation_writes_update_index(test_db):
+    """
+    Тест проверяет, что регистрация, обновление статуса и удаление беседы
+    сразу отражаются в индексе.
+    """
+    conversation = Conversation(5, name="User")
+    await conversation.save_for_db()
+    assert verification_index.conversation_exists(5)
+    assert not verification_index.is_unsubscribed(5)
+
+    conversation.subscription_verified = 0
+    await conversation.update_in_db()
+    assert verification_index.is_unsubscribed(5)
+
+    await Conversation.update_subscription_statuses({5: 1})
+    assert not verification_index.is_unsubscribed(5)
+
+    await Conversation.update_subscription_schedule({5: (0, 123)})
+    assert verification_index.is_unsubscribed(5)
+
+    # Обновление несуществующей беседы не добавляет ее в индекс
+    await Conversation(404, subscription_verified=1).update_in_db()
+    assert not verification_index.conversation_exists(404)
+
+    await conversation.delete_from_db()
+    assert not verification_index.conversation_exists(5)
+    assert not verification_index.is_unsubscribed(5)
+
+
+@pytest.mark.asyncio
+async def test_chat_writes_update_index(test_db):
+    """
+    Тест проверяет, что верификация и удаление чата отражаются в индексе.
+    """
+    await Conversation(-20, name="Chat").save_for_db()
+    await ChatVerification(-20, 7, "2025-01-01 00:00:00", "U").save_to_db()
+    assert verification_index.is_chat_verified(-20)
+
+    await ChatVerification.delete_by_verifier(7)
+    assert not verification_index.is_chat_verified(-20)
+
+    await ChatVerification(-20, 7, "2025-01-01 00:00:00", "U").save_to_db()
+    with patch.dict("sys.modules", {"core.config": MagicMock()}):
+        await database.delete_chat_data(-20)
+
+    assert not verification_index.is_chat_verified(-20)
+    assert not verification_index.conversation_exists(-20)
@@ -0,0 +1,104 @@
+"""
+Тесты для описания кадров видео через vision модель.
+"""
+
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+FRAMES = [b"frame1", b"frame2", b"frame3"]
+LABELS = ["начало видео", "середина видео", "конец видео"]
+
+
+@pytest.fixture
+def llm_service():
+    """Импортирует сервис с замоканной конфигурацией (без файлов логов и .env)."""
+    with patch.dict("sys.modules", {"core.config": MagicMock()}):
+        mock_config = sys.modules["core.config"]
+        mock_config.MEDIA_WORKERS = 2
+        mock_config.VIDEO_VISION_MODE = "parallel"
+
+        for module in ("services.llm_service", "services.media_service"):
+            sys.modules.pop(module, None)
+        yield importlib.import_module("services.llm_service")
+
+
+@pytest.mark.asyncio
+async def test_frames_are_described_concurrently(llm_service):
+    """
+    Тест проверяет, что кадры описываются одновременно, а кадры,
+    которые не удалось описать, пропускаются без потери остальных.
+    """
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_vision(image_bytes, image_mime_type, prompt):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if image_bytes == b"frame2":
+            return None
+        return f"описание {image_bytes.decode()}"
+
+    with patch.object(llm_service, "send_image_to_vision_model", fake_vision):
+        descriptions = await llm_service.describe_video_frames(
+            1, FRAMES, LABELS, mode="parallel"
+        )
+
+    assert max_in_flight == 3
+    assert descriptions == [
+        "Начало видео: описание frame1",
+        "Конец видео: описание frame3",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_sends_one_request(llm_service):
+    """
+    Тест проверяет, что в режиме batch все кадры уходят одним запросом,
+    а при его ошибке кадры описываются по одному.
+    """
+    batch = MagicMock()
+
+    async def fake_batch(images, image_mime_type, prompt):
+        batch(images)
+        return "Кадр 1: ... Кадр 2: ... Кадр 3: ..."
+
+    async def fake_vision(image_bytes, image_mime_type, prompt):
+        raise AssertionError("Кадры не должны описываться по одному")
+
+    with (
+        patch.object(llm_service, "send_images_to_vision_model", fake_batch),
+        patch.object(llm_service, "send_image_to_vision_model", fake_vision),
+    ):
+        descriptions = await llm_service.describe_video_frames(
+            1, FRAMES, LABELS, mode="batch"
+        )
+
+    batch.assert_called_once_with(FRAMES)
+    assert descriptions == ["Кадр 1: ... Кадр 2: ... Кадр 3: ..."]
+
+    async def failing_batch(images, image_mime_type, prompt):
+        return None
+
+    async def single_vision(image_bytes, image_mime_type, prompt):
+        return "ок"
+
+    with (
+        patch.object(llm_service, "send_images_to_vision_model", failing_batch),
+        patch.object(llm_service, "send_image_to_vision_model", single_vision),
+    ):
+        descriptions = await llm_service.describe_video_frames(
+            1, FRAMES, LABELS, mode="batch"
+        )
+
+    assert len(descriptions) == 3
@@ -0,0 +1,134 @@
+"""
+Тесты для кэша описаний изображений от vision модели.
+"""
+
+import importlib
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import database
+from core.database import VisionCache
+
+
+@pytest.fixture
+async def test_db():
+    """Фикстура для создания и очистки тестовой БД."""
+    test_db_name = "test_vision_cache.db"
+
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+    original_db = database.DATABASE_NAME
+    database.DATABASE_NAME = test_db_name
+    await database.check_db()
+
+    yield test_db_name
+
+    database.DATABASE_NAME = original_db
+    if os.path.exists(test_db_name):
+        os.remove(test_db_name)
+
+
+@pytest.fixture
+def vision_cache():
+    """Импортирует сервис кэша с замоканной конфигурацией (без файлов логов и .env)."""
+    with patch.dict("sys.modules", {"core.config": MagicMock()}):
+        sys.modules.pop("services.vision_cache", None)
+        yield importlib.import_module("services.vision_cache")
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_lru(test_db):
+    """
+    Тест проверяет, что при переполнении удаляются дольше всего
+    не использовавшиеся записи, а использование продлевает жизнь записи.
+    """
+    with patch.object(database, "VISION_CACHE_SIZE", 2):
+        await VisionCache.save("a", "первое", 1, (1, 640, 480))
+        await VisionCache.save("b", "второе", 1, (2, 640, 480))
+
+        # "a" использовали позже, чем сохранили "b"
+        with patch.object(database, "datetime") as mock_datetime:
+            mock_datetime.now.return_value.timestamp.return_value = 4_000_000_000
+            assert await VisionCache.get("a") == "первое"
+
+        await VisionCache.save("c", "третье", 1, (3, 640, 480))
+
+    assert await VisionCache.get("b") is None
+    assert await VisionCache.get_by_hash(1, 1, 640, 480) == "первое"
+    assert await VisionCache.get_by_hash(1, 3, 640, 480) == "третье"
+    assert await VisionCache.get_stats() == {"entries": 2, "saved_calls": 3}
+
+
+@pytest.mark.asyncio
+async def test_hash_hit_in_same_chat(vision_cache, test_db):
+    """
+    Тест проверяет, что тот же мем, отправленный в тот же чат новым файлом,
+    находится по хэшу и размерам, новый file_unique_id при этом не
+    запоминается, а статистика считает попадания и промахи.
+    """
+    meme = (-42, 640, 480)
+    assert await vision_cache.lookup_by_file_id("meme1") is None
+    assert await vision_cache.lookup_by_hash(1, meme) is None
+    await vision_cache.store(1, "meme1", meme, "кот в очках")
+
+    # Тот же мем в другом чате, пересланный как есть
+    assert await vision_cache.lookup_by_file_id("meme1") == "кот в очках"
+
+    # Тот же мем, отправленный в тот же чат как новый файл
+    assert await vision_cache.lookup_by_file_id("meme2") is None
+    assert await vision_cache.lookup_by_hash(1, meme) == "кот в очках"
+    assert await vision_cache.lookup_by_file_id("meme2") is None
+
+    stats = await vision_cache.get_stats()
+    assert stats["file_hits"] == 1
+    assert stats["hash_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["entries"] == 1
+    assert stats["saved_calls"] == 2
+
+
+def text_image(lines: list[str]) -> np.ndarray:
+    """Рисует скриншот текста 640x480: черные строки на белом фоне."""
+    image = np.full((480, 640, 3), 255, dtype=np.uint8)
+    for i, line in enumerate(lines * 3):
+        cv2.putText(
+            image, line, (20, 40 + i * 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2
+        )
+    return image
+
+
+@pytest.mark.asyncio
+async def test_same_hash_of_different_images_is_not_shared(vision_cache, test_db):
+    """
+    Тест проверяет, что разные скриншоты текста с одинаковым aHash
+    не получают чужое описание: по хэшу ищутся только изображения
+    из того же чата и того же размера.
+    """
+    sys.modules["core.config"].MEDIA_WORKERS = 1
+    media_service = importlib.import_module("services.media_service")
+    invoice = text_image(["Invoice 12345", "Total: 100 USD", "Paid by card"])
+    meeting = text_image(["Meeting at 10", "Room 4, floor 2", "Bring laptops"])
+    meeting_small = cv2.resize(meeting, (320, 240), interpolation=cv2.INTER_AREA)
+    image_hash = media_service.image_hash(invoice)
+    assert media_service.image_hash(meeting) == image_hash
+    assert media_service.image_hash(meeting_small) == image_hash
+
+    await vision_cache.store(1, "invoice", (image_hash, 640, 480), "счет на 100 USD")
+
+    # Другой пользователь присылает другой скриншот с тем же хэшем
+    assert await vision_cache.lookup_by_file_id("meeting") is None
+    assert await vision_cache.lookup_by_hash(2, (image_hash, 640, 480)) is None
+    # Скриншот другого размера с тем же хэшем в том же чате
+    assert await vision_cache.lookup_by_hash(1, (image_hash, 320, 240)) is None
+    assert (await vision_cache.get_stats())["saved_calls"] == 0